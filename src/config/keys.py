@@ -7,6 +7,7 @@ Keep secrets only in the environment (e.g., GEMINI_STUDIO_API_KEY).
 # ---- Canonical Gemini model identifiers (match provider’s API model ids exactly)
 GEMINI_1_5_PRO   = "gemini-1.5-pro"
 GEMINI_2_5_PRO = "gemini-2.5-pro"
+GEMINI_2_5_FLASH = "gemini-2.5-flash"
 
 # ---- Environment variable names (secrets live in .env / Cloud Run)
 ENV_GEMINI_STUDIO_API_KEY = "GEMINI_STUDIO_API_KEY"   # required for Gemini 1.5 API mode
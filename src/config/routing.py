@@ -0,0 +1,63 @@
+# Project: braintransplant-ai — File: src/config/routing.py
+"""
+Model routing rules for llm/adapter.py.
+Each task maps to a model and an output-token cap; auxiliary tasks always follow their rule.
+Chat answers are routed only with LLM_ROUTING=on (off by default): they can step down to a
+fast model for simple questions over small contexts. Any routed call falls back when its
+model's observed p95 latency exceeds the rule's latency budget.
+"""
+from config.keys import GEMINI_2_5_FLASH, GEMINI_2_5_PRO
+
+# ---- Task types (call_llm(task=...)) ----
+TASK_CHAT = "chat"            # user-facing answer over retrieved context
+TASK_RERANK = "rerank"        # snippet relevance scoring (JSON numbers)
+TASK_SUMMARIZE = "summarize"  # conversation-memory folding
+TASK_AGGREGATE = "aggregate"  # merging fan-out answers
+TASKS = (TASK_CHAT, TASK_RERANK, TASK_SUMMARIZE, TASK_AGGREGATE)
+
+FAST_MODEL = GEMINI_2_5_FLASH  # default for auxiliary calls
+
+# model: None means LLM_MODEL from the environment.
+# simple_model: used instead for chat questions judged simple (see SIMPLE_* below).
+# fallback / latency_budget_s: switch to `fallback` while the model's rolling p95 exceeds the budget.
+# max_output_tokens: gemini-2.5 models spend thinking tokens out of this cap, so caps leave
+# room for thinking on top of the visible answer (a tight cap returns empty/truncated text).
+ROUTES = {
+    TASK_CHAT: {
+        "model": None,
+        "simple_model": FAST_MODEL,
+        "max_output_tokens": 65536,
+        "fallback": FAST_MODEL,
+        "latency_budget_s": 45.0,
+    },
+    TASK_RERANK: {
+        "model": FAST_MODEL,
+        "max_output_tokens": 8192,
+        "fallback": None,
+        "latency_budget_s": None,
+    },
+    TASK_SUMMARIZE: {
+        "model": FAST_MODEL,
+        "max_output_tokens": 16384,
+        "fallback": None,
+        "latency_budget_s": None,
+    },
+    TASK_AGGREGATE: {
+        "model": GEMINI_2_5_PRO,
+        "max_output_tokens": 65536,
+        "fallback": FAST_MODEL,
+        "latency_budget_s": 60.0,
+    },
+}
+
+# ---- Chat complexity: all must hold for the simple_model ----
+SIMPLE_MAX_QUESTION_WORDS = 25
+SIMPLE_MAX_PROMPT_TOKENS = 12_000   # retrieved context + history + question
+COMPLEX_MARKERS = (
+    "compare", "difference", "why", "explain", "analy", "step by step", "in a table", "as a table", "tabulate", "summar",
+    "pros and cons", "trade-off", "tradeoff", "versus", " vs", "impact", "root cause",
+)
+
+# ---- Latency feedback ----
+ROUTE_MIN_SAMPLES = 20   # p95 is trusted only after this many observed calls
+ROUTE_PERCENTILE = 95
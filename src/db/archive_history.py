@@ -0,0 +1,182 @@
+# Project: braintransplant-ai — File: src/db/archive_history.py
+import os
+import sys
+import gzip
+import json
+import argparse
+import datetime
+import traceback
+from typing import List, Optional, Tuple
+
+import db.connection  # uses env: DB_HOST, POSTGRES_DB, POSTGRES_USER, POSTGRES_PASSWORD, DB_PORT
+
+# ---- Explicit constants (no defaults) ----
+ARCHIVE_DIR = "/app/outputs/archive"
+KEEP_MONTHS = 6            # partitions whose whole month is older than this get archived
+PARTITIONS_AHEAD = 3       # future monthly partitions kept pre-created
+FETCH_SIZE = 500           # rows per server-side cursor round trip
+PARTITION_PREFIX = "chat_history_"
+DEFAULT_PARTITION = "chat_history_default"
+
+ARCHIVE_COLUMNS = ["id", "user_id", "session_id", "user_query", "retrieved_context", "model_response", "ts"]
+
+
+def monthly_partitions(conn) -> List[Tuple[str, datetime.date]]:
+    """(partition_name, first_day_of_month) for every chat_history_YYYYMM partition."""
+    sql = """
+        SELECT c.relname
+        FROM pg_inherits i
+        JOIN pg_class c ON c.oid = i.inhrelid
+        WHERE i.inhparent = 'chat_history'::regclass
+    """
+    out = []
+    with conn.cursor() as cur:
+        cur.execute(sql)
+        for (name,) in cur.fetchall():
+            suffix = name[len(PARTITION_PREFIX):]
+            if name.startswith(PARTITION_PREFIX) and len(suffix) == 6 and suffix.isdigit():
+                out.append((name, datetime.date(int(suffix[:4]), int(suffix[4:]), 1)))
+    return sorted(out, key=lambda p: p[1])
+
+
+def _is_partitioned(conn) -> bool:
+    with conn.cursor() as cur:
+        cur.execute("SELECT EXISTS (SELECT 1 FROM pg_partitioned_table WHERE partrelid = 'chat_history'::regclass)")
+        return cur.fetchone()[0]
+
+
+def _add_months(d: datetime.date, months: int) -> datetime.date:
+    y, m = divmod(d.month - 1 + months, 12)
+    return datetime.date(d.year + y, m + 1, 1)
+
+
+def _export_rows(conn, path: str, start: Optional[datetime.date], end: datetime.date) -> int:
+    """Stream turns with start <= ts < end (context reconstructed) into a gzip JSONL file; returns rows."""
+    os.makedirs(ARCHIVE_DIR, exist_ok=True)
+    tmp = path + ".tmp"
+    sql = f"""
+        SELECT {', '.join(ARCHIVE_COLUMNS)}
+        FROM chat_history_full
+        WHERE ts >= %s AND ts < %s
+        ORDER BY ts, id
+    """
+    rows = 0
+    with gzip.open(tmp, "wt", encoding="utf-8") as f:
+        with conn.cursor(name="archive_export") as cur:  # server-side: constant memory
+            cur.itersize = FETCH_SIZE
+            cur.execute(sql, (start or "-infinity", end))
+            for rec in cur:
+                f.write(json.dumps(dict(zip(ARCHIVE_COLUMNS, rec)), ensure_ascii=False, default=str) + "\n")
+                rows += 1
+    os.replace(tmp, path)
+    return rows
+
+
+def _export_partition(conn, name: str, month: datetime.date) -> Tuple[str, int]:
+    """Stream one month into ARCHIVE_DIR/<partition>.jsonl.gz; returns (path, rows)."""
+    path = os.path.join(ARCHIVE_DIR, f"{name}.jsonl.gz")
+    return path, _export_rows(conn, path, month, _add_months(month, 1))
+
+
+def _archive_default(conn, cutoff: datetime.date) -> Tuple[Optional[str], int]:
+    """
+    Export and delete rows older than cutoff that landed in the default partition (months
+    without a partition at write time). Run after the old monthly partitions are dropped, so
+    only default-partition rows are left below the cutoff. Returns (path or None, rows).
+    """
+    with conn.cursor() as cur:
+        cur.execute(f"SELECT EXISTS (SELECT 1 FROM {DEFAULT_PARTITION} WHERE ts < %s)", (cutoff,))
+        if not cur.fetchone()[0]:
+            return None, 0
+    stamp = datetime.datetime.now().strftime("%Y%m%d%H%M%S")
+    path = os.path.join(ARCHIVE_DIR, f"{DEFAULT_PARTITION}_before_{cutoff:%Y%m}_{stamp}.jsonl.gz")
+    rows = _export_rows(conn, path, None, cutoff)
+    with conn.cursor() as cur:
+        cur.execute(f"DELETE FROM {DEFAULT_PARTITION} WHERE ts < %s", (cutoff,))
+        if cur.rowcount != rows:
+            raise RuntimeError(f"{DEFAULT_PARTITION}: exported {rows} rows but {cur.rowcount} matched the delete")
+    return path, rows
+
+
+def _gc_snippets(conn) -> int:
+    """
+    Delete snippets no longer referenced by any remaining turn. save_chat_turn() inserts
+    snippets (ON CONFLICT DO NOTHING) and the turn referencing them in one transaction; the
+    SHARE ROW EXCLUSIVE lock waits for those in flight and holds off new ones, so a snippet
+    cannot be deleted between a turn's snippet insert and its commit. Call in its own
+    transaction and commit right after (chat saves wait meanwhile).
+    """
+    sql = """
+        DELETE FROM context_snippets s
+        WHERE NOT EXISTS (
+            SELECT 1 FROM chat_history h WHERE h.context_hashes @> ARRAY[s.hash]
+        )
+    """
+    with conn.cursor() as cur:
+        cur.execute("LOCK TABLE context_snippets IN SHARE ROW EXCLUSIVE MODE")
+        cur.execute(sql)
+        return cur.rowcount
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """
+    Archive old chat_history partitions.
+
+    Behavior:
+    - Pre-creates the next PARTITIONS_AHEAD monthly partitions (a month whose rows already
+      landed in the default partition is skipped and archived from there once past the cutoff).
+    - For each monthly partition older than --keep-months, streams its rows (with the
+      retrieved context reconstructed) to ARCHIVE_DIR/<partition>.jsonl.gz, then detaches
+      and drops the partition.
+    - Rows older than the cutoff in the default partition are exported the same way to
+      ARCHIVE_DIR/chat_history_default_before_<YYYYMM>_<run>.jsonl.gz and deleted.
+    - With --gc-snippets, deletes context_snippets rows no longer referenced.
+    - --dry-run only lists what would be archived.
+    """
+    parser = argparse.ArgumentParser(description="Archive old chat_history partitions to compressed JSONL.")
+    parser.add_argument("--keep-months", type=int, default=KEEP_MONTHS)
+    parser.add_argument("--gc-snippets", action="store_true")
+    parser.add_argument("--dry-run", action="store_true")
+    args = parser.parse_args(argv)
+
+    cutoff = _add_months(datetime.date.today().replace(day=1), -args.keep_months)
+    try:
+        with db.connection.get_connection() as conn:
+            with conn.cursor() as cur:
+                cur.execute("SELECT chat_history_ensure_partitions(0, %s)", (PARTITIONS_AHEAD,))
+            conn.commit()
+
+            old = [(n, m) for n, m in monthly_partitions(conn) if _add_months(m, 1) <= cutoff]
+            print(f"[archive_history] cutoff={cutoff} | partitions to archive: {[n for n, _ in old]}")
+            if args.dry_run:
+                return 0
+
+            for name, month in old:
+                path, rows = _export_partition(conn, name, month)
+                conn.commit()  # end the cursor's transaction before DDL
+                with conn.cursor() as cur:
+                    cur.execute(f'ALTER TABLE chat_history DETACH PARTITION "{name}"')
+                    cur.execute(f'DROP TABLE "{name}"')
+                conn.commit()
+                print(f"[archive_history] {name}: {rows} rows -> {path}; partition dropped")
+
+            if _is_partitioned(conn):
+                path, rows = _archive_default(conn, cutoff)
+                conn.commit()
+                if path:
+                    print(f"[archive_history] {DEFAULT_PARTITION}: {rows} rows before {cutoff} -> {path}; deleted")
+
+            if args.gc_snippets:
+                deleted = _gc_snippets(conn)
+                conn.commit()
+                print(f"[archive_history] snippets garbage-collected: {deleted}")
+        return 0
+
+    except Exception as e:
+        print(f"[archive_history] ERROR: {e}", file=sys.stderr)
+        traceback.print_exc(file=sys.stderr)
+        return 1
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,86 @@
+# Project: braintransplant-ai — File: src/db/audit_reports.py
+import datetime
+from typing import Any, Dict, List, Optional
+
+from db.connection import pooled_connection
+
+# Query API over the logs_pkm rollups (maintained per ingest batch by db/ingest/rollups.py).
+# Rollups commit together with the raw rows, so they are always complete: every report here
+# scans O(days × dimension values), never the raw event table.
+
+DEFAULT_LIMIT = 20
+
+
+def _fetch(sql: str, params: tuple) -> List[Dict[str, Any]]:
+    with pooled_connection() as conn:
+        with conn.cursor() as cur:
+            cur.execute(sql, params)
+            cols = [d.name for d in cur.description]
+            return [dict(zip(cols, row)) for row in cur.fetchall()]
+
+
+def events_per_day(
+    start: datetime.date,
+    end: datetime.date,
+    username: Optional[str] = None,
+    action: Optional[str] = None,
+) -> List[Dict[str, Any]]:
+    """Event counts per day in [start, end], optionally for one user and/or action."""
+    sql = """
+        SELECT day, sum(events)::bigint AS events
+        FROM logs_pkm_daily_user_action
+        WHERE day BETWEEN %s AND %s
+          AND (%s::text IS NULL OR username = %s)
+          AND (%s::text IS NULL OR action_derived = %s)
+        GROUP BY day
+        ORDER BY day
+    """
+    return _fetch(sql, (start, end, username, username, action, action))
+
+
+def actions_by_user(start: datetime.date, end: datetime.date, limit: int = DEFAULT_LIMIT) -> List[Dict[str, Any]]:
+    """Most active (user, action) pairs in [start, end]."""
+    sql = """
+        SELECT username, action_derived, sum(events)::bigint AS events
+        FROM logs_pkm_daily_user_action
+        WHERE day BETWEEN %s AND %s
+        GROUP BY username, action_derived
+        ORDER BY events DESC
+        LIMIT %s
+    """
+    return _fetch(sql, (start, end, limit))
+
+
+def recipe_material_activity(
+    start: datetime.date,
+    end: datetime.date,
+    recipe_id: Optional[str] = None,
+    material_id: Optional[str] = None,
+    limit: int = DEFAULT_LIMIT,
+) -> List[Dict[str, Any]]:
+    """Busiest recipe/material combinations in [start, end], optionally filtered."""
+    sql = """
+        SELECT recipe_id, max(recipe_name) AS recipe_name,
+               material_id, max(material_name) AS material_name,
+               sum(events)::bigint AS events
+        FROM logs_pkm_daily_recipe_material
+        WHERE day BETWEEN %s AND %s
+          AND (%s::text IS NULL OR recipe_id = %s)
+          AND (%s::text IS NULL OR material_id = %s)
+        GROUP BY recipe_id, material_id
+        ORDER BY events DESC
+        LIMIT %s
+    """
+    return _fetch(sql, (start, end, recipe_id, recipe_id, material_id, material_id, limit))
+
+
+def session_duration_histogram(start: datetime.date, end: datetime.date) -> List[Dict[str, Any]]:
+    """Number of distinct sessions per duration bucket (lower edge in seconds) in [start, end]."""
+    sql = """
+        SELECT bucket_start_s, sum(sessions)::bigint AS sessions
+        FROM logs_pkm_daily_session_duration
+        WHERE day BETWEEN %s AND %s
+        GROUP BY bucket_start_s
+        ORDER BY bucket_start_s
+    """
+    return _fetch(sql, (start, end))
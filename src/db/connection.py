@@ -1,21 +1,70 @@
 # Project: braintransplant-ai — File: src/db/connection.py
 import os
+import threading
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator
+
 import psycopg  # psycopg v3
 
+# ---- Explicit constants ----
+POOL_MIN_SIZE = int(os.getenv("DB_POOL_MIN_SIZE", "1"))
+POOL_MAX_SIZE = int(os.getenv("DB_POOL_MAX_SIZE", "8"))
+POOL_TIMEOUT_S = 10.0        # wait for a free pooled connection before raising
+POOL_WARMUP_TIMEOUT_S = 10.0
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def _conninfo() -> Dict[str, Any]:
+    required = ["DB_HOST", "POSTGRES_DB", "POSTGRES_USER", "POSTGRES_PASSWORD", "DB_PORT"]
+    missing = [k for k in required if os.getenv(k) is None]
+    if missing:
+        raise RuntimeError(f"Missing required DB env vars: {', '.join(missing)}")
+    return {
+        "host": os.getenv("DB_HOST"),
+        "dbname": os.getenv("POSTGRES_DB"),
+        "user": os.getenv("POSTGRES_USER"),
+        "password": os.getenv("POSTGRES_PASSWORD"),
+        "port": os.getenv("DB_PORT"),
+    }
+
+
 def get_connection() -> psycopg.Connection:
     """
     Open a new PostgreSQL connection using environment variables provided by docker-compose.
     Required: DB_HOST, POSTGRES_DB, POSTGRES_USER, POSTGRES_PASSWORD, DB_PORT
+    Use for jobs and scripts; request paths in the web app use pooled_connection().
     """
-    required = ["DB_HOST", "POSTGRES_DB", "POSTGRES_USER", "POSTGRES_PASSWORD", "DB_PORT"]
-    missing = [k for k in required if os.getenv(k) is None]
-    if missing:
-        raise RuntimeError(f"Missing required DB env vars: {', '.join(missing)}")
+    return psycopg.connect(**_conninfo())
+
 
-    return psycopg.connect(
-        host=os.getenv("DB_HOST"),
-        dbname=os.getenv("POSTGRES_DB"),
-        user=os.getenv("POSTGRES_USER"),
-        password=os.getenv("POSTGRES_PASSWORD"),
-        port=os.getenv("DB_PORT"),
-    )
+def get_pool(wait: bool = False):
+    """Process-wide psycopg_pool.ConnectionPool, created on first use (wait=True blocks until min_size are open)."""
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                from psycopg_pool import ConnectionPool
+
+                _pool = ConnectionPool(
+                    kwargs=_conninfo(),
+                    min_size=POOL_MIN_SIZE,
+                    max_size=POOL_MAX_SIZE,
+                    timeout=POOL_TIMEOUT_S,
+                    name="btai",
+                    open=True,
+                )
+    if wait:
+        _pool.wait(timeout=POOL_WARMUP_TIMEOUT_S)
+    return _pool
+
+
+@contextmanager
+def pooled_connection() -> Iterator[psycopg.Connection]:
+    """
+    Borrow a connection from the pool. Same transaction semantics as `with get_connection()`:
+    commit on clean exit, rollback on exception; the connection goes back to the pool.
+    """
+    with get_pool().connection() as conn:
+        yield conn
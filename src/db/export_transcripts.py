@@ -0,0 +1,198 @@
+# Project: braintransplant-ai — File: src/db/export_transcripts.py
+import os
+import re
+import sys
+import gzip
+import json
+import hashlib
+import argparse
+import datetime
+import traceback
+from typing import IO, Any, Dict, List, Optional, Tuple
+
+import db.connection  # uses env: DB_HOST, POSTGRES_DB, POSTGRES_USER, POSTGRES_PASSWORD, DB_PORT
+from db.archive_history import ARCHIVE_DIR, monthly_partitions
+
+# ---- Explicit constants (no defaults) ----
+EXPORT_DIR = "/app/outputs/transcripts"
+FETCH_SIZE = 200           # rows per server-side cursor round trip (rows may carry ~120k chars of context)
+FORMATS = ("jsonl", "md")
+
+EXPORT_COLUMNS = ["id", "user_id", "session_id", "user_query", "model_response", "ts"]
+
+_UNSAFE = re.compile(r"[^A-Za-z0-9._-]+")
+_BACKTICK_RUNS = re.compile(r"`+")
+
+
+def _file_stem(session_id: str) -> str:
+    """Filesystem-safe name plus a short hash, so ids that sanitise alike never share a file."""
+    digest = hashlib.sha256(session_id.encode("utf-8")).hexdigest()[:8]
+    return f"{_UNSAFE.sub('_', session_id) or 'session'}-{digest}"
+
+
+def _fence(text: str) -> str:
+    """A Markdown code fence longer than any backtick run inside text."""
+    return "`" * max(3, max((len(run) for run in _BACKTICK_RUNS.findall(text)), default=0) + 1)
+
+
+def _oldest_live_month(conn) -> Optional[datetime.date]:
+    """First day of the oldest monthly partition still in chat_history (older ones were archived)."""
+    partitions = monthly_partitions(conn)
+    return partitions[0][1] if partitions else None
+
+
+def _query(include_context: bool, sessions: List[str], user: Optional[str],
+           since: Optional[datetime.date], until: Optional[datetime.date]) -> Tuple[str, List[Any]]:
+    """
+    Turns in (session_id, ts, id) order, walking idx_chat_history_session_ts. The context is
+    reconstructed (chat_history_full) only when it is exported.
+    """
+    columns = EXPORT_COLUMNS + (["retrieved_context"] if include_context else [])
+    where, params = ["TRUE"], []
+    if sessions:
+        where.append("session_id = ANY(%s)")
+        params.append(sessions)
+    if user:
+        where.append("user_id = %s")
+        params.append(user)
+    if since:
+        where.append("ts >= %s")
+        params.append(since)
+    if until:
+        where.append("ts < %s")
+        params.append(until + datetime.timedelta(days=1))
+    sql = f"""
+        SELECT {', '.join(columns)}
+        FROM {'chat_history_full' if include_context else 'chat_history'}
+        WHERE {' AND '.join(where)}
+        ORDER BY session_id, ts, id
+    """
+    return sql, params
+
+
+class _SessionWriter:
+    """Open files for the session being streamed; one session at a time keeps memory constant."""
+
+    def __init__(self, out_dir: str, session_id: str, formats: List[str], compress: bool) -> None:
+        self.turns = 0
+        self.files: Dict[str, IO[str]] = {}
+        self.tmp_paths: Dict[str, Tuple[str, str]] = {}
+        name = _file_stem(session_id)
+        for fmt in formats:
+            path = os.path.join(out_dir, f"{name}.{fmt}" + (".gz" if compress else ""))
+            tmp = path + ".tmp"
+            self.files[fmt] = gzip.open(tmp, "wt", encoding="utf-8") if compress else open(tmp, "w", encoding="utf-8")
+            self.tmp_paths[fmt] = (tmp, path)
+        if "md" in self.files:
+            self.files["md"].write(f"# Chat transcript — session {session_id}\n")
+
+    def write(self, turn: Dict[str, Any]) -> None:
+        self.turns += 1
+        if "jsonl" in self.files:
+            self.files["jsonl"].write(json.dumps(turn, ensure_ascii=False, default=str) + "\n")
+        if "md" in self.files:
+            md = self.files["md"]
+            if self.turns == 1 and turn.get("user_id"):
+                md.write(f"\nUser: {turn['user_id']}\n")
+            md.write(f"\n## Turn {self.turns} — {turn['ts']:%Y-%m-%d %H:%M:%S %Z}\n\n")
+            md.write(f"**User:** {turn['user_query']}\n\n**Assistant:**\n\n{turn['model_response']}\n")
+            if turn.get("retrieved_context"):
+                fence = _fence(turn["retrieved_context"])
+                md.write(f"\n<details><summary>Retrieved context</summary>\n\n{fence}\n{turn['retrieved_context']}\n{fence}\n\n</details>\n")
+
+    def close(self) -> List[str]:
+        paths = []
+        for fmt, f in self.files.items():
+            f.close()
+            tmp, path = self.tmp_paths[fmt]
+            os.replace(tmp, path)
+            paths.append(path)
+        return paths
+
+
+def export_transcripts(conn, out_dir: str, formats: List[str], compress: bool, include_context: bool,
+                       sessions: List[str], user: Optional[str],
+                       since: Optional[datetime.date], until: Optional[datetime.date]) -> Tuple[int, int]:
+    """Stream matching turns to one transcript per session and format; returns (sessions, turns)."""
+    os.makedirs(out_dir, exist_ok=True)
+    sql, params = _query(include_context, sessions, user, since, until)
+    columns = EXPORT_COLUMNS + (["retrieved_context"] if include_context else [])
+    writer: Optional[_SessionWriter] = None
+    current, n_sessions, n_turns = None, 0, 0
+    try:
+        with conn.cursor(name="export_transcripts") as cur:  # server-side: constant memory
+            cur.itersize = FETCH_SIZE
+            cur.execute(sql, params)
+            for rec in cur:
+                turn = dict(zip(columns, rec))
+                if turn["session_id"] != current:
+                    if writer is not None:
+                        writer.close()
+                    current = turn["session_id"]
+                    writer = _SessionWriter(out_dir, current, formats, compress)
+                    n_sessions += 1
+                writer.write(turn)
+                n_turns += 1
+        if writer is not None:
+            writer.close()
+            writer = None
+    finally:
+        if writer is not None:  # failed mid-session: drop the partial files
+            for f in writer.files.values():
+                f.close()
+            for tmp, _ in writer.tmp_paths.values():
+                if os.path.exists(tmp):
+                    os.remove(tmp)
+    return n_sessions, n_turns
+
+
+def _date(value: str) -> datetime.date:
+    return datetime.date.fromisoformat(value)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """
+    Export chat transcripts from chat_history.
+
+    Behavior:
+    - Writes one file per session and format (JSONL and/or Markdown) to --out-dir,
+      optionally gzip-compressed, named <session>-<short hash of the session id>.
+    - Only live history is exported: months removed by archive_history are in
+      ARCHIVE_DIR/chat_history_YYYYMM.jsonl.gz (a warning is printed when --since reaches them).
+    - Rows are streamed through a server-side cursor in session order, so memory stays
+      constant whatever the number or size of turns.
+    - Filters: --session (repeatable), --user, --since/--until (inclusive dates, UTC).
+    - --no-context leaves out the retrieved context (and skips reconstructing it).
+    """
+    parser = argparse.ArgumentParser(description="Stream chat transcripts to JSONL/Markdown files.")
+    parser.add_argument("--out-dir", default=EXPORT_DIR)
+    parser.add_argument("--format", choices=FORMATS + ("both",), default="both")
+    parser.add_argument("--gzip", action="store_true")
+    parser.add_argument("--no-context", action="store_true")
+    parser.add_argument("--session", action="append", default=[])
+    parser.add_argument("--user")
+    parser.add_argument("--since", type=_date, help="YYYY-MM-DD")
+    parser.add_argument("--until", type=_date, help="YYYY-MM-DD (inclusive)")
+    args = parser.parse_args(argv)
+
+    formats = list(FORMATS) if args.format == "both" else [args.format]
+    try:
+        with db.connection.get_connection() as conn:
+            oldest = _oldest_live_month(conn)
+            if args.since and oldest and args.since < oldest:
+                print(f"[export_transcripts] WARNING: history before {oldest} was archived; "
+                      f"those months are in {ARCHIVE_DIR}/ and are not exported.", file=sys.stderr)
+            n_sessions, n_turns = export_transcripts(
+                conn, args.out_dir, formats, args.gzip, not args.no_context,
+                args.session, args.user, args.since, args.until,
+            )
+        print(f"[export_transcripts] {n_sessions} sessions, {n_turns} turns -> {args.out_dir}")
+        return 0
+    except Exception as e:
+        print(f"[export_transcripts] ERROR: {e}", file=sys.stderr)
+        traceback.print_exc(file=sys.stderr)
+        return 1
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -1,8 +1,57 @@
 # Project: braintransplant-ai — File: src/db/history.py
+import re
+import hashlib
+import datetime
 import traceback
-from typing import Optional
+from typing import Any, Dict, List, Optional, Tuple
+
+from db.connection import pooled_connection
+
+# ---- Explicit constants ----
+CACHED_ANSWER_MAX_AGE_DAYS = 30  # degraded-mode answers older than this are not served
+
+SNIPPET_INSERT_SQL = "INSERT INTO context_snippets (hash, body) VALUES (%s, %s) ON CONFLICT (hash) DO NOTHING"
+TURN_COUNT_SQL = """
+    INSERT INTO chat_memory (session_id, total_turns) VALUES (%s, 1)
+    ON CONFLICT (session_id) DO UPDATE SET total_turns = chat_memory.total_turns + 1
+"""
+
+# Context built by rag.vertex_client is one "[n] snippet" line per snippet.
+_SNIPPET_LINE = re.compile(r"\[(\d+)\] (.*)")
+
+
+def _split_context(context: str) -> List[Tuple[Optional[int], str]]:
+    """
+    Split a retrieved context into (label, body) snippets so each body can be stored once.
+    Anything not in the "[n] snippet" line format is kept as a single unlabelled body,
+    so chat_history_full always reconstructs the exact original string.
+    """
+    lines = context.split("\n")
+    if context.endswith("\n"):
+        matches = [_SNIPPET_LINE.fullmatch(line) for line in lines[:-1]]
+        if matches and all(matches):
+            return [(int(m.group(1)), m.group(2)) for m in matches]
+    return [(None, context)]
+
+
+def _snippet_hash(body: str) -> str:
+    return hashlib.sha256(body.encode("utf-8")).hexdigest()
+
+
+def content_address(
+    retrieved_context: Optional[str],
+) -> Tuple[Optional[List[str]], Optional[List[Optional[int]]], Dict[str, str]]:
+    """
+    (context_hashes, context_labels, {hash: body}) for a retrieved context, as stored by
+    save_chat_turn(); (None, None, {}) when there is no context.
+    """
+    if not retrieved_context:
+        return None, None, {}
+    parts = _split_context(retrieved_context)
+    hashes = [_snippet_hash(body) for _, body in parts]
+    labels = [label for label, _ in parts]
+    return hashes, labels, {h: body for h, (_, body) in zip(hashes, parts)}
 
-from db.connection import get_connection
 
 def save_chat_turn(
     session_id: str,
@@ -13,25 +62,112 @@ def save_chat_turn(
 ) -> None:
     """
     Saves a single turn of a conversation to the chat_history table.
+    The retrieved context is stored content-addressed: each snippet once in
+    context_snippets, the turn keeping only the ordered hash list (see chat_history_full).
+    The session's turn count (chat_memory.total_turns) is bumped in the same transaction.
     """
     sql = """
         INSERT INTO chat_history
-            (user_id, session_id, user_query, model_response, retrieved_context)
+            (user_id, session_id, user_query, model_response, retrieved_context, context_hashes, context_labels)
         VALUES
-            (%s, %s, %s, %s, %s)
+            (%s, %s, %s, %s, %s, %s, %s)
     """
+    hashes, labels, snippets = content_address(retrieved_context)
+    inline_context = None if hashes else retrieved_context
+
     try:
-        with get_connection() as conn:
+        with pooled_connection() as conn:
             with conn.cursor() as cur:
+                if snippets:
+                    # Sorted so concurrent writers lock snippet rows in the same order
+                    cur.executemany(SNIPPET_INSERT_SQL, sorted(snippets.items()))
                 cur.execute(sql, (
                     user_id,
                     session_id,
                     user_query,
                     model_response,
-                    retrieved_context
+                    inline_context,
+                    hashes,
+                    labels,
                 ))
+                cur.execute(TURN_COUNT_SQL, (session_id,))
             conn.commit()
     except Exception:
         # For an MVP, printing the error is sufficient.
         # In production, you would use a structured logger.
         traceback.print_exc()
+
+
+def find_cached_answer(user_query: str, session_id: str, user_id: Optional[str] = None) -> Optional[str]:
+    """
+    Degraded-mode fallback: the caller's own most recent stored answer to the same question
+    (case/whitespace-insensitive), given after the last corpus change and within
+    CACHED_ANSWER_MAX_AGE_DAYS. Answers depend on the conversation they were given in, so
+    only the user's own turns are searched (anonymous users: this session's turns).
+    Returns None if none exists or the DB is unavailable.
+    """
+    owner = "user_id = %s" if user_id else "session_id = %s AND user_id IS NULL"
+    sql = f"""
+        SELECT model_response
+        FROM chat_history
+        WHERE md5(lower(btrim(user_query))) = md5(lower(btrim(%s)))
+          AND {owner}
+          AND ts >= NOW() - make_interval(days => %s)
+          AND ts >= COALESCE((SELECT changed_at FROM corpus_state), '-infinity')
+        ORDER BY ts DESC
+        LIMIT 1
+    """
+    try:
+        with pooled_connection() as conn:
+            with conn.cursor() as cur:
+                cur.execute(sql, (user_query, user_id or session_id, CACHED_ANSWER_MAX_AGE_DAYS))
+                row = cur.fetchone()
+        return row[0] if row else None
+    except Exception:
+        traceback.print_exc()
+        return None
+
+
+# Keyset cursor for load_session_turns(): (ts, id) of the oldest turn already loaded.
+TurnCursor = Tuple[datetime.datetime, int]
+
+
+def load_session_turns(
+    session_id: str,
+    limit: int,
+    before: Optional[TurnCursor] = None,
+    user_id: Optional[str] = None,
+) -> Tuple[List[Dict[str, Any]], Optional[TurnCursor]]:
+    """
+    Load up to `limit` turns of a session, newest page first, using keyset pagination on
+    (ts, id) so each page is one range scan of idx_chat_history_session_ts.
+    Only turns saved by user_id are returned (None: anonymous turns), so a session URL
+    does not expose another user's conversation.
+    Returns (turns oldest-first as {"id", "ts", "user", "assistant"}, cursor for the next
+    older page or None when the start of the session has been reached).
+    Context is not loaded. Returns ([], None) if the DB is unavailable.
+    """
+    keyset = "AND (ts, id) < (%s, %s)" if before else ""
+    sql = f"""
+        SELECT id, ts, user_query, model_response
+        FROM chat_history
+        WHERE session_id = %s AND user_id IS NOT DISTINCT FROM %s {keyset}
+        ORDER BY ts DESC, id DESC
+        LIMIT %s
+    """
+    params = (session_id, user_id, *(before or ()), limit + 1)
+    try:
+        with pooled_connection() as conn:
+            with conn.cursor() as cur:
+                cur.execute(sql, params)
+                rows = cur.fetchall()
+    except Exception:
+        traceback.print_exc()
+        return [], None
+
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    turns = [{"id": r[0], "ts": r[1], "user": r[2], "assistant": r[3]} for r in reversed(rows)]
+    cursor = (rows[-1][1], rows[-1][0]) if has_more else None
+    return turns, cursor
+
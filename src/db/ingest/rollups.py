@@ -0,0 +1,103 @@
+# Project: braintransplant-ai — File: src/db/ingest/rollups.py
+import typing
+import psycopg
+
+# Explicit constants (no defaults)
+RAW_TABLE = "logs_pkm"
+ROLLUP_TABLES = [
+    "logs_pkm_daily_user_action",
+    "logs_pkm_daily_recipe_material",
+    "logs_pkm_daily_session_duration",
+    "logs_pkm_sessions",
+]
+# Lower edges (seconds) of the session-duration histogram buckets: <1m, 1-5m, 5-15m, 15-30m, 30-60m, 1-2h, 2-4h, 4h+
+DURATION_BUCKETS_S: typing.List[int] = [0, 60, 300, 900, 1800, 3600, 7200, 14400]
+
+# Each statement aggregates only the raw rows matched by {where} and adds them onto the rollup.
+_DAILY_USER_ACTION_SQL = f"""
+    INSERT INTO logs_pkm_daily_user_action AS r (day, username, action_derived, events)
+    SELECT (audit_time AT TIME ZONE 'UTC')::date, COALESCE(username, ''), COALESCE(action_derived, ''), count(*)
+    FROM {RAW_TABLE}
+    WHERE {{where}} AND audit_time IS NOT NULL
+    GROUP BY 1, 2, 3
+    ON CONFLICT (day, username, action_derived) DO UPDATE SET events = r.events + EXCLUDED.events
+"""
+
+_DAILY_RECIPE_MATERIAL_SQL = f"""
+    INSERT INTO logs_pkm_daily_recipe_material AS r (day, recipe_id, material_id, recipe_name, material_name, events)
+    SELECT (audit_time AT TIME ZONE 'UTC')::date, COALESCE(recipe_id, ''), COALESCE(material_id, ''),
+           max(recipe_name), max(material_name), count(*)
+    FROM {RAW_TABLE}
+    WHERE {{where}} AND audit_time IS NOT NULL
+      AND (recipe_id IS NOT NULL OR material_id IS NOT NULL)
+    GROUP BY 1, 2, 3
+    ON CONFLICT (day, recipe_id, material_id) DO UPDATE
+    SET events = r.events + EXCLUDED.events,
+        recipe_name = COALESCE(EXCLUDED.recipe_name, r.recipe_name),
+        material_name = COALESCE(EXCLUDED.material_name, r.material_name)
+"""
+
+_BUCKETS = "ARRAY[" + ",".join(str(b) for b in DURATION_BUCKETS_S) + "]"
+_SESSION_DURATION_SQL = f"""
+    WITH new_sessions AS (
+        INSERT INTO logs_pkm_sessions (username, session_start, session_duration)
+        SELECT COALESCE(username, ''), session_start, max(session_duration)
+        FROM {RAW_TABLE}
+        WHERE {{where}} AND session_start IS NOT NULL AND session_duration IS NOT NULL
+        GROUP BY 1, 2
+        ON CONFLICT (username, session_start) DO NOTHING
+        RETURNING session_start, session_duration
+    )
+    INSERT INTO logs_pkm_daily_session_duration AS r (day, bucket_start_s, sessions)
+    SELECT (session_start AT TIME ZONE 'UTC')::date,
+           ({_BUCKETS})[width_bucket(GREATEST(session_duration, 0), {_BUCKETS})],
+           count(*)
+    FROM new_sessions
+    GROUP BY 1, 2
+    ON CONFLICT (day, bucket_start_s) DO UPDATE SET sessions = r.sessions + EXCLUDED.sessions
+"""
+
+
+def next_batch_id(conn: psycopg.Connection) -> int:
+    with conn.cursor() as cur:
+        cur.execute("SELECT nextval('logs_pkm_ingest_batch_seq')")
+        return cur.fetchone()[0]
+
+
+def _apply(conn: psycopg.Connection, where: str, params: typing.Tuple[typing.Any, ...]) -> None:
+    with conn.cursor() as cur:
+        for sql in (_DAILY_USER_ACTION_SQL, _DAILY_RECIPE_MATERIAL_SQL, _SESSION_DURATION_SQL):
+            cur.execute(sql.format(where=where), params)
+
+
+def refresh_rollups_for_batch(conn: psycopg.Connection, batch_id: int) -> None:
+    """
+    Add one ingest batch onto the rollups: cost is O(rows in the batch), not O(table).
+    Call in the same transaction as the batch insert so raw table and rollups commit together.
+    """
+    _apply(conn, "ingest_batch = %s", (batch_id,))
+
+
+def rebuild_rollups(conn: psycopg.Connection) -> None:
+    """
+    Full recomputation from the raw table (backfill, or after manual edits to logs_pkm).
+    Caller commits.
+    """
+    with conn.cursor() as cur:
+        cur.execute(f"TRUNCATE {', '.join(ROLLUP_TABLES)}")
+    _apply(conn, "TRUE", ())
+
+
+def main() -> int:
+    """Rebuild all logs_pkm rollups from the raw table (python -m db.ingest.rollups)."""
+    from db.connection import get_connection
+
+    with get_connection() as conn:
+        rebuild_rollups(conn)
+        conn.commit()
+    print("[rollups] rebuilt from logs_pkm.")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -6,6 +6,7 @@ import typing
 import pandas as pd
 import psycopg
 from db.connection import get_connection
+from db.ingest.rollups import next_batch_id, refresh_rollups_for_batch
 
 # Explicit constants (no defaults)
 UPLOAD_DIR = "/app/data/uploads"
@@ -34,13 +35,14 @@ def _rows_from_df(df: pd.DataFrame) -> typing.Iterable[typing.Tuple[typing.Any,
     for _, row in ordered.iterrows():
         yield tuple(None if pd.isna(v) else v for v in row.tolist())
 
-def _insert_rows(conn: psycopg.Connection, rows: typing.Iterable[typing.Tuple[typing.Any, ...]]) -> int:
-    sql = f"INSERT INTO {TABLE_NAME} ({', '.join(COLUMNS)}) VALUES ({', '.join(['%s'] * len(COLUMNS))})"
+def _insert_rows(conn: psycopg.Connection, rows: typing.Iterable[typing.Tuple[typing.Any, ...]], batch_id: int) -> int:
+    cols = COLUMNS + ["ingest_batch"]
+    sql = f"INSERT INTO {TABLE_NAME} ({', '.join(cols)}) VALUES ({', '.join(['%s'] * len(cols))})"
     inserted = 0
     with conn.cursor() as cur:
         batch: typing.List[typing.Tuple[typing.Any, ...]] = []
         for r in rows:
-            batch.append(r)
+            batch.append(r + (batch_id,))
             if len(batch) >= BATCH_SIZE:
                 cur.executemany(sql, batch)
                 inserted += len(batch)
@@ -67,7 +69,10 @@ def ingest_file(conn: psycopg.Connection, path: str) -> int:
     _coerce_datetime(df, "session_end")
     _coerce_int(df, "session_duration")
     rows_iter = _rows_from_df(df)
-    inserted = _insert_rows(conn, rows_iter)
+    batch_id = next_batch_id(conn)
+    inserted = _insert_rows(conn, rows_iter, batch_id)
+    # Rollups for this file only, committed atomically with its raw rows
+    refresh_rollups_for_batch(conn, batch_id)
     conn.commit()
     return inserted
 
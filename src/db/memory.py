@@ -0,0 +1,45 @@
+# Project: braintransplant-ai — File: src/db/memory.py
+import traceback
+from typing import Any, Dict, Optional
+
+from db.connection import pooled_connection
+
+
+def load_memory(session_id: str) -> Optional[Dict[str, Any]]:
+    """
+    Load the stored conversation memory for a session (with total_turns, the number of
+    stored turns), or None if there is none (or the DB is unavailable).
+    """
+    sql = "SELECT summary, summarized_turns, total_turns FROM chat_memory WHERE session_id = %s"
+    try:
+        with pooled_connection() as conn:
+            with conn.cursor() as cur:
+                cur.execute(sql, (session_id,))
+                row = cur.fetchone()
+        if row is None:
+            return None
+        return {"summary": row[0], "summarized_turns": row[1], "total_turns": row[2]}
+    except Exception:
+        traceback.print_exc()
+        return None
+
+
+def save_memory(session_id: str, summary: str, summarized_turns: int) -> None:
+    """
+    Upsert the conversation memory for a session.
+    """
+    sql = """
+        INSERT INTO chat_memory (session_id, summary, summarized_turns, updated_at)
+        VALUES (%s, %s, %s, NOW())
+        ON CONFLICT (session_id) DO UPDATE
+        SET summary = EXCLUDED.summary,
+            summarized_turns = EXCLUDED.summarized_turns,
+            updated_at = NOW()
+    """
+    try:
+        with pooled_connection() as conn:
+            with conn.cursor() as cur:
+                cur.execute(sql, (session_id, summary, summarized_turns))
+            conn.commit()
+    except Exception:
+        traceback.print_exc()
@@ -0,0 +1,155 @@
+# Project: braintransplant-ai — File: src/db/migrate_history.py
+import sys
+import argparse
+import datetime
+import traceback
+from typing import List, Optional
+
+import db.connection  # uses env: DB_HOST, POSTGRES_DB, POSTGRES_USER, POSTGRES_PASSWORD, DB_PORT
+from db.history import SNIPPET_INSERT_SQL, content_address
+from db.init_db import SCHEMA_PATH
+
+# ---- Explicit constants (no defaults) ----
+LEGACY_TABLE = "chat_history_legacy"
+FETCH_SIZE = 500           # rows per server-side cursor round trip / insert batch
+PARTITIONS_AHEAD = 3
+
+LEGACY_COLUMNS = [
+    "id", "user_id", "session_id", "user_query", "retrieved_context", "model_response",
+    "context_hashes", "context_labels", "ts",
+]
+
+
+def _is_partitioned(conn) -> bool:
+    with conn.cursor() as cur:
+        cur.execute("SELECT EXISTS (SELECT 1 FROM pg_partitioned_table WHERE partrelid = 'chat_history'::regclass)")
+        return cur.fetchone()[0]
+
+
+def _rename_legacy(conn) -> None:
+    """chat_history -> chat_history_legacy, with its indexes and id sequence, freeing the names for schema.sql."""
+    with conn.cursor() as cur:
+        cur.execute(f'ALTER TABLE chat_history RENAME TO "{LEGACY_TABLE}"')
+        cur.execute(
+            "SELECT c.relname FROM pg_index i JOIN pg_class c ON c.oid = i.indexrelid WHERE i.indrelid = %s::regclass",
+            (LEGACY_TABLE,),
+        )
+        for (name,) in cur.fetchall():
+            cur.execute(f'ALTER INDEX "{name}" RENAME TO "{name[:55]}_legacy"')
+        cur.execute("SELECT pg_get_serial_sequence(%s, 'id')", (LEGACY_TABLE,))
+        seq = cur.fetchone()[0]
+        if seq:
+            cur.execute(f"ALTER SEQUENCE {seq} RENAME TO {LEGACY_TABLE}_id_seq")
+
+
+def _months_back(conn) -> int:
+    with conn.cursor() as cur:
+        cur.execute(f'SELECT min(ts) FROM "{LEGACY_TABLE}"')
+        oldest = cur.fetchone()[0]
+    if oldest is None:
+        return 0
+    today = datetime.date.today()
+    return max(0, (today.year - oldest.year) * 12 + today.month - oldest.month)
+
+
+def _copy_rows(conn) -> int:
+    """Copy every legacy row, moving inline context into context_snippets; returns rows copied."""
+    insert_sql = """
+        INSERT INTO chat_history
+            (id, user_id, session_id, user_query, retrieved_context, model_response, context_hashes, context_labels, ts)
+        VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)
+    """
+    select_sql = f'SELECT {", ".join(LEGACY_COLUMNS)} FROM "{LEGACY_TABLE}" ORDER BY id'
+    copied = 0
+    rows: List[tuple] = []
+    snippets: dict = {}
+
+    def flush() -> None:
+        with conn.cursor() as cur:
+            if snippets:
+                cur.executemany(SNIPPET_INSERT_SQL, sorted(snippets.items()))
+            cur.executemany(insert_sql, rows)
+        rows.clear()
+        snippets.clear()
+
+    with conn.cursor(name="migrate_history") as src:  # server-side: constant memory
+        src.itersize = FETCH_SIZE
+        src.execute(select_sql)
+        for rec in src:
+            row = dict(zip(LEGACY_COLUMNS, rec))
+            if row["retrieved_context"] and not row["context_hashes"]:
+                hashes, labels, bodies = content_address(row["retrieved_context"])
+                row.update(retrieved_context=None, context_hashes=hashes, context_labels=labels)
+                snippets.update(bodies)
+            rows.append(tuple(row[c] for c in LEGACY_COLUMNS))
+            copied += 1
+            if len(rows) >= FETCH_SIZE:
+                flush()
+    if rows:
+        flush()
+    return copied
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """
+    Migrate a chat_history created before partitioning to the partitioned, content-addressed layout.
+
+    Behavior:
+    - No-op when chat_history is already partitioned.
+    - In one transaction (writers wait on the table lock; readers of chat_history too):
+      renames the old table to chat_history_legacy, applies db/schema.sql (partitioned
+      chat_history, view, indexes), creates monthly partitions back to the oldest row,
+      copies every row with its inline context split into context_snippets, keeps ids and
+      moves the id sequence past them, checks the row counts, recounts chat_memory.total_turns,
+      then drops the legacy table (kept with --keep-legacy).
+    """
+    parser = argparse.ArgumentParser(description="Migrate chat_history to the partitioned layout.")
+    parser.add_argument("--keep-legacy", action="store_true", help=f"keep the old table as {LEGACY_TABLE}")
+    args = parser.parse_args(argv)
+
+    try:
+        with db.connection.get_connection() as conn:
+            if _is_partitioned(conn):
+                print("[migrate_history] chat_history is already partitioned; nothing to do.")
+                return 0
+
+            with conn.cursor() as cur:
+                cur.execute("LOCK TABLE chat_history IN ACCESS EXCLUSIVE MODE")
+            _rename_legacy(conn)
+            with open(SCHEMA_PATH, "r", encoding="utf-8") as f:
+                schema_sql = f.read()
+            with conn.cursor() as cur:
+                cur.execute(schema_sql)
+                cur.execute("SELECT chat_history_ensure_partitions(%s, %s)", (_months_back(conn), PARTITIONS_AHEAD))
+
+            copied = _copy_rows(conn)
+            with conn.cursor() as cur:
+                cur.execute("""
+                    SELECT setval(pg_get_serial_sequence('chat_history', 'id'),
+                                  (SELECT COALESCE(max(id), 0) + 1 FROM chat_history), false)
+                """)
+                cur.execute(f'SELECT (SELECT count(*) FROM "{LEGACY_TABLE}"), (SELECT count(*) FROM chat_history)')
+                legacy_rows, new_rows = cur.fetchone()
+                if legacy_rows != new_rows:
+                    raise RuntimeError(f"row count mismatch: legacy={legacy_rows} partitioned={new_rows}")
+                cur.execute("""
+                    INSERT INTO chat_memory (session_id, total_turns)
+                    SELECT session_id, count(*) FROM chat_history GROUP BY session_id
+                    ON CONFLICT (session_id) DO UPDATE SET total_turns = EXCLUDED.total_turns
+                """)
+                if not args.keep_legacy:
+                    cur.execute(f'DROP TABLE "{LEGACY_TABLE}"')
+            conn.commit()
+
+        kept = f"; old table kept as {LEGACY_TABLE}" if args.keep_legacy else ""
+        print(f"[migrate_history] {copied} rows migrated to the partitioned chat_history{kept}.")
+        return 0
+
+    except Exception as e:
+        print(f"[migrate_history] ERROR (nothing changed): {e}", file=sys.stderr)
+        traceback.print_exc(file=sys.stderr)
+        return 1
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,115 @@
+# Project: braintransplant-ai — File: src/db/precomputed.py
+import re
+import traceback
+from typing import Any, Dict, Optional, Set
+
+from db.connection import pooled_connection
+
+_TRAILING_PUNCT = re.compile(r"[\s?.!]+$")
+
+
+def normalise_question(question: str) -> str:
+    """Case-, whitespace- and trailing-punctuation-insensitive key for a question."""
+    return _TRAILING_PUNCT.sub("", " ".join(question.lower().split()))
+
+
+def corpus_generation() -> Optional[int]:
+    """Current RAG corpus generation, or None if the DB is unavailable."""
+    try:
+        with pooled_connection() as conn:
+            with conn.cursor() as cur:
+                cur.execute("SELECT generation FROM corpus_state")
+                row = cur.fetchone()
+        return row[0] if row else 0
+    except Exception:
+        traceback.print_exc()
+        return None
+
+
+def bump_corpus_generation() -> Optional[int]:
+    """
+    Mark the corpus as changed (document import/delete). Every precomputed answer stops
+    being served until it is rebuilt for the new generation. Returns the new generation.
+    """
+    sql = """
+        INSERT INTO corpus_state (id, generation, changed_at) VALUES (TRUE, 1, NOW())
+        ON CONFLICT (id) DO UPDATE
+        SET generation = corpus_state.generation + 1, changed_at = NOW()
+        RETURNING generation
+    """
+    try:
+        with pooled_connection() as conn:
+            with conn.cursor() as cur:
+                cur.execute(sql)
+                generation = cur.fetchone()[0]
+            conn.commit()
+        return generation
+    except Exception:
+        traceback.print_exc()
+        return None
+
+
+def load_precomputed_answer(question: str) -> Optional[Dict[str, Any]]:
+    """
+    The stored answer for this question if it was built against the current corpus
+    generation, else None (also when the DB is unavailable).
+    """
+    sql = """
+        SELECT p.question, p.answer, p.retrieved_context, p.corpus_generation, p.built_at
+        FROM precomputed_answers p
+        JOIN corpus_state c ON c.generation = p.corpus_generation
+        WHERE p.question_key = %s
+    """
+    try:
+        with pooled_connection() as conn:
+            with conn.cursor() as cur:
+                cur.execute(sql, (normalise_question(question),))
+                row = cur.fetchone()
+        if row is None:
+            return None
+        return {
+            "question": row[0],
+            "answer": row[1],
+            "retrieved_context": row[2],
+            "corpus_generation": row[3],
+            "built_at": row[4],
+        }
+    except Exception:
+        traceback.print_exc()
+        return None
+
+
+def save_precomputed_answer(question: str, answer: str, retrieved_context: str, generation: int) -> None:
+    """Upsert the answer for one curated question, tagged with the generation it was built against."""
+    sql = """
+        INSERT INTO precomputed_answers (question_key, question, answer, retrieved_context, corpus_generation, built_at)
+        VALUES (%s, %s, %s, %s, %s, NOW())
+        ON CONFLICT (question_key) DO UPDATE
+        SET question = EXCLUDED.question,
+            answer = EXCLUDED.answer,
+            retrieved_context = EXCLUDED.retrieved_context,
+            corpus_generation = EXCLUDED.corpus_generation,
+            built_at = NOW()
+    """
+    with pooled_connection() as conn:
+        with conn.cursor() as cur:
+            cur.execute(sql, (normalise_question(question), question, answer, retrieved_context, generation))
+        conn.commit()
+
+
+def current_question_keys(generation: int) -> Set[str]:
+    """Question keys that already have an answer for this generation."""
+    with pooled_connection() as conn:
+        with conn.cursor() as cur:
+            cur.execute("SELECT question_key FROM precomputed_answers WHERE corpus_generation = %s", (generation,))
+            return {row[0] for row in cur.fetchall()}
+
+
+def delete_precomputed_except(question_keys: Set[str]) -> int:
+    """Drop answers for questions no longer in the curated list. Returns rows deleted."""
+    with pooled_connection() as conn:
+        with conn.cursor() as cur:
+            cur.execute("DELETE FROM precomputed_answers WHERE NOT (question_key = ANY(%s))", (list(question_keys),))
+            deleted = cur.rowcount
+        conn.commit()
+    return deleted
@@ -0,0 +1,48 @@
+# Project: braintransplant-ai — File: src/db/rag_chunks.py
+from typing import Dict, List, Tuple
+
+from db.connection import pooled_connection
+
+# (chunk_id, chunk_index, chars, gcs_uri)
+ChunkRow = Tuple[str, int, int, str]
+
+
+def load_document_chunks(document: str) -> Dict[str, str]:
+    """chunk_id -> gcs_uri for the chunks of a document currently in the corpus."""
+    with pooled_connection() as conn:
+        with conn.cursor() as cur:
+            cur.execute("SELECT chunk_id, gcs_uri FROM rag_chunks WHERE document = %s", (document,))
+            return {row[0]: row[1] for row in cur.fetchall()}
+
+
+def save_document_chunks(document: str, rows: List[ChunkRow], removed: List[str]) -> None:
+    """Upsert the document's current chunks (new positions included) and drop the removed ones."""
+    upsert = """
+        INSERT INTO rag_chunks (document, chunk_id, chunk_index, chars, gcs_uri)
+        VALUES (%s, %s, %s, %s, %s)
+        ON CONFLICT (document, chunk_id) DO UPDATE SET chunk_index = EXCLUDED.chunk_index
+    """
+    with pooled_connection() as conn:
+        with conn.cursor() as cur:
+            if removed:
+                cur.execute(
+                    "DELETE FROM rag_chunks WHERE document = %s AND chunk_id = ANY(%s)", (document, removed)
+                )
+            cur.executemany(upsert, [(document, *row) for row in rows])
+        conn.commit()
+
+
+def chunk_counts() -> Dict[str, int]:
+    """document -> number of chunks in the corpus."""
+    with pooled_connection() as conn:
+        with conn.cursor() as cur:
+            cur.execute("SELECT document, count(*) FROM rag_chunks GROUP BY document ORDER BY document")
+            return {row[0]: row[1] for row in cur.fetchall()}
+
+
+def clear_chunks() -> None:
+    """Forget every chunk (after the corpus was emptied)."""
+    with pooled_connection() as conn:
+        with conn.cursor() as cur:
+            cur.execute("TRUNCATE rag_chunks")
+        conn.commit()
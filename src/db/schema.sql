@@ -2,8 +2,10 @@
 -- Final schema for user-aware, persistent chat history.
 
 -- Stores a complete record of every user interaction for analytics and history.
+-- Range-partitioned by month on ts (see chat_history_ensure_partitions below); old
+-- partitions are exported and dropped by db/archive_history.py.
 CREATE TABLE IF NOT EXISTS chat_history (
-    id SERIAL PRIMARY KEY,
+    id BIGSERIAL,
 
     -- The user's account ID (e.g., 'user.name@roche.com'), passed from the parent application.
     -- This is the key for retrieving a user's continuous conversation history.
@@ -15,13 +17,228 @@ CREATE TABLE IF NOT EXISTS chat_history (
 
     -- The core conversation data
     user_query TEXT NOT NULL,
+    -- Legacy inline context; new rows store it content-addressed (context_hashes) instead.
     retrieved_context TEXT,
     model_response TEXT NOT NULL,
 
+    -- Content-addressed context: context_snippets.hash per snippet in prompt order, and the
+    -- snippet's "[n]" label (NULL = stored verbatim, no label). Read via chat_history_full.
+    context_hashes TEXT[],
+    context_labels INTEGER[],
+
     -- Timestamp for ordering the conversation
-    ts TIMESTAMPTZ DEFAULT NOW()
+    ts TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+
+    PRIMARY KEY (id, ts)
+) PARTITION BY RANGE (ts);
+
+-- Catch-all for rows outside the pre-created monthly partitions (archived with the months
+-- past the cutoff). Databases created before partitioning keep their plain table until
+-- db/migrate_history.py moves them over; make sure the new columns exist meanwhile.
+DO $$
+BEGIN
+    IF EXISTS (SELECT 1 FROM pg_partitioned_table WHERE partrelid = 'chat_history'::regclass) THEN
+        CREATE TABLE IF NOT EXISTS chat_history_default PARTITION OF chat_history DEFAULT;
+    END IF;
+END
+$$;
+ALTER TABLE chat_history ADD COLUMN IF NOT EXISTS context_hashes TEXT[];
+ALTER TABLE chat_history ADD COLUMN IF NOT EXISTS context_labels INTEGER[];
+
+-- Retrieved snippets stored once, keyed by sha256(body); shared across turns and users.
+CREATE TABLE IF NOT EXISTS context_snippets (
+    hash TEXT PRIMARY KEY,
+    body TEXT NOT NULL,
+    created_at TIMESTAMPTZ DEFAULT NOW()
 );
 
+-- Creates monthly partitions chat_history_YYYYMM from months_back to months_ahead around now.
+-- Run ahead of time (init_db, archive job): a month cannot be split off the default partition
+-- once rows for it have landed there, so such months are skipped with a NOTICE; their rows
+-- stay in chat_history_default and are archived from there (db/archive_history.py).
+CREATE OR REPLACE FUNCTION chat_history_ensure_partitions(months_back INTEGER, months_ahead INTEGER)
+RETURNS VOID LANGUAGE plpgsql AS $$
+DECLARE
+    m DATE;
+    occupied BOOLEAN;
+BEGIN
+    IF NOT EXISTS (SELECT 1 FROM pg_partitioned_table WHERE partrelid = 'chat_history'::regclass) THEN
+        RAISE NOTICE 'chat_history is not partitioned (created before partitioning); skipping';
+        RETURN;
+    END IF;
+    FOR i IN -months_back..months_ahead LOOP
+        m := (date_trunc('month', NOW()) + make_interval(months => i))::date;
+        occupied := FALSE;
+        IF to_regclass('chat_history_' || to_char(m, 'YYYYMM')) IS NULL
+           AND to_regclass('chat_history_default') IS NOT NULL THEN
+            EXECUTE 'SELECT EXISTS (SELECT 1 FROM chat_history_default WHERE ts >= $1 AND ts < $2)'
+                INTO occupied USING m, (m + INTERVAL '1 month')::date;
+        END IF;
+        IF occupied THEN
+            RAISE NOTICE 'rows for % are already in chat_history_default; partition skipped', to_char(m, 'YYYY-MM');
+            CONTINUE;
+        END IF;
+        EXECUTE format(
+            'CREATE TABLE IF NOT EXISTS %I PARTITION OF chat_history FOR VALUES FROM (%L) TO (%L)',
+            'chat_history_' || to_char(m, 'YYYYMM'), m, (m + INTERVAL '1 month')::date
+        );
+    END LOOP;
+END
+$$;
+
+SELECT chat_history_ensure_partitions(1, 3);
+
+-- Compatibility view: chat_history with retrieved_context reconstructed from snippets.
+CREATE OR REPLACE VIEW chat_history_full AS
+SELECT
+    h.id,
+    h.user_id,
+    h.session_id,
+    h.user_query,
+    COALESCE(h.retrieved_context, (
+        SELECT string_agg(
+            CASE WHEN c.label IS NULL THEN s.body ELSE '[' || c.label || '] ' || s.body || E'\n' END,
+            '' ORDER BY c.pos
+        )
+        FROM unnest(h.context_hashes, h.context_labels) WITH ORDINALITY AS c(hash, label, pos)
+        JOIN context_snippets s ON s.hash = c.hash
+    )) AS retrieved_context,
+    h.model_response,
+    h.ts
+FROM chat_history h;
+
 -- Essential indexes for performance
 CREATE INDEX IF NOT EXISTS idx_chat_history_user_id ON chat_history (user_id);
-CREATE INDEX IF NOT EXISTS idx_chat_history_session_id ON chat_history (session_id);
+-- Session resume: keyset pagination over (ts, id) within a session (db.history.load_session_turns)
+DROP INDEX IF EXISTS idx_chat_history_session_id;  -- superseded by the composite index below
+CREATE INDEX IF NOT EXISTS idx_chat_history_session_ts ON chat_history (session_id, ts DESC, id DESC);
+-- Snippet garbage collection after archival (which snippets are still referenced)
+CREATE INDEX IF NOT EXISTS idx_chat_history_context_hashes ON chat_history USING GIN (context_hashes);
+
+-- Degraded-mode answer lookup by normalised question (db.history.find_cached_answer)
+CREATE INDEX IF NOT EXISTS idx_chat_history_query_md5 ON chat_history (md5(lower(btrim(user_query))));
+
+-- Rolling conversation memory per session: an incrementally updated summary of the turns
+-- older than the verbatim window (see memory/conversation.py). One row per session.
+CREATE TABLE IF NOT EXISTS chat_memory (
+    session_id TEXT PRIMARY KEY,
+    summary TEXT NOT NULL DEFAULT '',
+    -- Number of leading turns of the session already folded into summary
+    summarized_turns INTEGER NOT NULL DEFAULT 0,
+    updated_at TIMESTAMPTZ DEFAULT NOW()
+);
+
+-- Stored turns per session, kept by db.history.save_chat_turn so a resume knows how many turns
+-- precede the loaded page without counting the session. Backfilled once when the column is added.
+DO $$
+BEGIN
+    IF NOT EXISTS (
+        SELECT 1 FROM information_schema.columns WHERE table_name = 'chat_memory' AND column_name = 'total_turns'
+    ) THEN
+        ALTER TABLE chat_memory ADD COLUMN total_turns INTEGER NOT NULL DEFAULT 0;
+        INSERT INTO chat_memory (session_id, total_turns)
+        SELECT session_id, count(*) FROM chat_history GROUP BY session_id
+        ON CONFLICT (session_id) DO UPDATE SET total_turns = EXCLUDED.total_turns;
+    END IF;
+END
+$$;
+
+-- RAG corpus generation (single row): bumped by the admin panel on every document import or
+-- delete, so answers built against an older corpus are never served.
+CREATE TABLE IF NOT EXISTS corpus_state (
+    id BOOLEAN PRIMARY KEY DEFAULT TRUE CHECK (id),
+    generation BIGINT NOT NULL DEFAULT 0,
+    changed_at TIMESTAMPTZ DEFAULT NOW()
+);
+INSERT INTO corpus_state (id) VALUES (TRUE) ON CONFLICT (id) DO NOTHING;
+
+-- Answers to the curated example questions, built by rag/precompute.py against one corpus
+-- generation and served on a normalised-question match while that generation is current.
+CREATE TABLE IF NOT EXISTS precomputed_answers (
+    question_key TEXT PRIMARY KEY,   -- db.precomputed.normalise_question(question)
+    question TEXT NOT NULL,
+    answer TEXT NOT NULL,
+    retrieved_context TEXT,
+    corpus_generation BIGINT NOT NULL,
+    built_at TIMESTAMPTZ DEFAULT NOW()
+);
+
+-- Chunks imported into the RAG corpus by the admin panel (rag/chunking.py): one GCS text file
+-- and one RAG file per chunk, so a re-ingested document only adds/removes changed chunks.
+CREATE TABLE IF NOT EXISTS rag_chunks (
+    document TEXT NOT NULL,          -- staging file name
+    chunk_id TEXT NOT NULL,          -- sha256 of the chunk text (truncated)
+    chunk_index INTEGER NOT NULL,    -- position in the current version of the document
+    chars INTEGER NOT NULL,
+    gcs_uri TEXT NOT NULL,
+    imported_at TIMESTAMPTZ DEFAULT NOW(),
+    PRIMARY KEY (document, chunk_id)
+);
+
+-- Raw audit events loaded by db/ingest/xlsx2db.py (one row per event).
+CREATE TABLE IF NOT EXISTS logs_pkm (
+    user_id TEXT,
+    id TEXT,
+    subseq_id TEXT,
+    message TEXT,
+    audit_time TIMESTAMPTZ,
+    action_raw TEXT,
+    type TEXT,
+    label TEXT,
+    version TEXT,
+    recipe_id TEXT,
+    recipe_name TEXT,
+    material_name TEXT,
+    material_id TEXT,
+    name1 TEXT,
+    name2 TEXT,
+    username TEXT,
+    action_derived TEXT,
+    session_start TIMESTAMPTZ,
+    session_end TIMESTAMPTZ,
+    session_duration BIGINT,
+    -- Ingest batch (one per file) used to refresh the rollups incrementally
+    ingest_batch BIGINT
+);
+ALTER TABLE logs_pkm ADD COLUMN IF NOT EXISTS ingest_batch BIGINT;
+CREATE SEQUENCE IF NOT EXISTS logs_pkm_ingest_batch_seq;
+
+-- Events arrive roughly in time order: BRIN keeps time-range scans cheap at a tiny index size.
+CREATE INDEX IF NOT EXISTS idx_logs_pkm_audit_time_brin ON logs_pkm USING BRIN (audit_time);
+CREATE INDEX IF NOT EXISTS idx_logs_pkm_ingest_batch ON logs_pkm (ingest_batch);
+
+-- Rollups maintained per ingest batch (db/ingest/rollups.py); read by db/audit_reports.py.
+-- Empty string stands for a missing dimension value so it can be part of the key.
+CREATE TABLE IF NOT EXISTS logs_pkm_daily_user_action (
+    day DATE NOT NULL,
+    username TEXT NOT NULL,
+    action_derived TEXT NOT NULL,
+    events BIGINT NOT NULL,
+    PRIMARY KEY (day, username, action_derived)
+);
+
+CREATE TABLE IF NOT EXISTS logs_pkm_daily_recipe_material (
+    day DATE NOT NULL,
+    recipe_id TEXT NOT NULL,
+    material_id TEXT NOT NULL,
+    recipe_name TEXT,
+    material_name TEXT,
+    events BIGINT NOT NULL,
+    PRIMARY KEY (day, recipe_id, material_id)
+);
+
+-- Distinct sessions seen so far (events repeat session fields), so each session is counted once.
+CREATE TABLE IF NOT EXISTS logs_pkm_sessions (
+    username TEXT NOT NULL,
+    session_start TIMESTAMPTZ NOT NULL,
+    session_duration BIGINT,
+    PRIMARY KEY (username, session_start)
+);
+
+-- Session-duration histogram; bucket_start_s is the lower edge of the bucket in seconds.
+CREATE TABLE IF NOT EXISTS logs_pkm_daily_session_duration (
+    day DATE NOT NULL,
+    bucket_start_s INTEGER NOT NULL,
+    sessions BIGINT NOT NULL,
+    PRIMARY KEY (day, bucket_start_s)
+);
@@ -1,20 +1,85 @@
 import os
-import requests
-from typing import List, Dict, Any
-
-import vertexai
-from vertexai.generative_models import GenerativeModel
+import time
+import asyncio
+import functools
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from typing import TYPE_CHECKING, Awaitable, List, Dict, Any, Deque, Optional, Tuple, TypeVar
 
 from utils.logger import get_logger
+from utils.vertex import init_vertex
+from llm.admission import INTERACTIVE, MAX_CONCURRENT_CALLS, OUTPUT_TOKENS_ESTIMATE, get_admission_controller
+from llm.latency import get_window, record_latency
+from utils.tokens import estimate_tokens
+from utils.circuit_breaker import CircuitBreaker, get_breaker
 
 from config.keys import (
     GEMINI_1_5_PRO,
     GEMINI_2_5_PRO,  # Add this import
+    GEMINI_2_5_FLASH,
     ENV_GEMINI_STUDIO_API_KEY,
 )
+if TYPE_CHECKING:  # SDK/HTTP clients are imported on first use (cold start)
+    import requests
+    from vertexai.generative_models import GenerativeModel
+
+from config.routing import (
+    COMPLEX_MARKERS,
+    ROUTE_MIN_SAMPLES,
+    ROUTE_PERCENTILE,
+    ROUTES,
+    SIMPLE_MAX_PROMPT_TOKENS,
+    SIMPLE_MAX_QUESTION_WORDS,
+    TASK_CHAT,
+)
+
+MAX_OUTPUT_TOKENS = 65536  # explicit constant (chat cap when routing is off)
+SUPPORTED_MODELS = [GEMINI_1_5_PRO, GEMINI_2_5_PRO, GEMINI_2_5_FLASH]  # Add this list
+VERTEX_LOCATION = "europe-west4"
+GEMINI_REST_BASE_URL = "https://generativelanguage.googleapis.com/v1beta/models"
+VERTEX_MODELS = {GEMINI_2_5_PRO, GEMINI_2_5_FLASH}  # served via Vertex AI; everything else via the Gemini REST API
+VERTEX_MODEL_CACHE_SIZE = 32  # GenerativeModel per (model, system prompt); keeps its gRPC client warm
+# The sync Vertex SDK call takes no timeout: it runs on this pool and the caller stops waiting
+# after timeout_s. Extra workers absorb calls abandoned after a timeout (they still finish).
+VERTEX_SYNC_WORKERS = 2 * MAX_CONCURRENT_CALLS
+
+# ---- Routing (rules in config/routing.py) ----
+# Auxiliary tasks (rerank, summarize, aggregate) always follow their route. Chat answers:
+# on: model + output cap by complexity/observed latency; off: LLM_MODEL and MAX_OUTPUT_TOKENS.
+ROUTING_ENABLED = os.getenv("LLM_ROUTING", "off").strip().lower() in ("1", "on", "true", "yes")
+
+# ---- Hedged requests (tail latency) ----
+# When enabled, a call still running after the rolling p95 for its backend/model gets a
+# duplicate request (on the other endpoint when available); the first success wins.
+HEDGE_ENABLED = os.getenv("LLM_HEDGE", "off").strip().lower() in ("1", "on", "true", "yes")
+HEDGE_PERCENTILE = 95
+HEDGE_MIN_SAMPLES = 20       # below this, use HEDGE_DEFAULT_DELAY_S instead of the percentile
+HEDGE_DEFAULT_DELAY_S = 30.0
+HEDGE_MIN_DELAY_S = 3.0      # never hedge earlier than this
+HEDGE_MAX_RATE = 0.10        # at most 10% of recent calls may be hedged (bounds extra cost)
+HEDGE_RATE_WINDOW = 200      # calls considered for HEDGE_MAX_RATE
+
+# ---- Circuit breakers (one per backend: "llm.vertex", "llm.rest") ----
+LLM_BREAKER_SETTINGS = {
+    "window_s": 120.0,
+    "min_calls": 6,
+    "error_rate": 0.5,
+    "slow_call_s": 45.0,
+    "slow_rate": 0.6,
+    "open_s": 30.0,
+}
 
-MAX_OUTPUT_TOKENS = 65536  # explicit constant
-SUPPORTED_MODELS = [GEMINI_1_5_PRO, GEMINI_2_5_PRO]  # Add this list
+_hedge_lock = threading.Lock()
+_hedge_history: Deque[bool] = deque(maxlen=HEDGE_RATE_WINDOW)
+_http_session_obj: Optional["requests.Session"] = None
+_http_session_lock = threading.Lock()
+_vertex_pool: Optional[ThreadPoolExecutor] = None
+_vertex_pool_lock = threading.Lock()
+_async_loop: Optional[asyncio.AbstractEventLoop] = None
+_async_loop_lock = threading.Lock()
+
+T = TypeVar("T")
 
 
 def _req(name: str) -> str:
@@ -36,50 +101,74 @@ def _extract_text(resp_json: Dict[str, Any]) -> str:
             texts.append(t)
     return "\n".join(texts).strip()
 
-def call_llm(system_prompt: str, user_query: str, timeout_s: int = 30) -> str:
-    logger = get_logger("btai.llm.adapter")
+
+def _resolve_model(logger, model_id: Optional[str] = None) -> str:
+    """
+    Validate LLM_PROVIDER and return the model id: the explicit override when given
+    (fan-out, routing), else LLM_MODEL from the environment.
+    """
     provider = _req("LLM_PROVIDER").strip().lower()
     if provider != "gemini":
         raise RuntimeError(f"Unsupported LLM_PROVIDER='{provider}'.")
 
-    model_id = _req("LLM_MODEL").strip()
+    model_id = (model_id or _req("LLM_MODEL")).strip()
 
     logger.info(f"Using model_id: {model_id}...")
 
     if model_id not in SUPPORTED_MODELS:
         raise RuntimeError(f"Unsupported LLM_MODEL='{model_id}'. Supported models: {', '.join(SUPPORTED_MODELS)}")
+    return model_id
 
-    if model_id == GEMINI_2_5_PRO:
-        logger.info("Using Vertex AI to call the model.")
-        
-        project_id = os.getenv("GCP_PROJECT_ID", "fresh-myth-471317-j9")
-        location = "europe-west4"
-        
-        vertexai.init(project=project_id, location=location)
-
-        model = GenerativeModel(
-            model_name=model_id,
-            system_instruction=system_prompt,
-        )
-        response = model.generate_content(
-            contents=[{"role": "user", "parts": [{"text": user_query}]}],
-            generation_config={
-                "temperature": 0,
-                "max_output_tokens": MAX_OUTPUT_TOKENS,
-            },
-        )
-        logger.info(f"Vertex AI response: {str(response)[:200]}")
-        return response.text
 
-    # Fallback to REST API for other supported models
-    logger.info("Using Gemini API (REST) to call the model.")
-    api_key = _req(ENV_GEMINI_STUDIO_API_KEY)
+def vertex_project() -> str:
+    return os.getenv("GCP_PROJECT_ID", "fresh-myth-471317-j9")
 
-    url = f"https://generativelanguage.googleapis.com/v1beta/models/{model_id}:generateContent?key={api_key}"
 
-    logger.info(f"Calling Gemini API with url: {url}...")
+def _new_vertex_model(model_id: str, system_prompt: str) -> "GenerativeModel":
+    from vertexai.generative_models import GenerativeModel
+
+    init_vertex(get_logger("btai.llm.adapter"), vertex_project(), VERTEX_LOCATION)
+    return GenerativeModel(
+        model_name=model_id,
+        system_instruction=system_prompt,
+    )
+
+
+@functools.lru_cache(maxsize=VERTEX_MODEL_CACHE_SIZE)
+def _vertex_model(model_id: str, system_prompt: str) -> "GenerativeModel":
+    """Cached for the sync path only: async gRPC clients are bound to the loop that created them."""
+    return _new_vertex_model(model_id, system_prompt)
+
+
+def http_session() -> "requests.Session":
+    """Shared keep-alive session for sync REST calls (saves a TLS handshake per call)."""
+    global _http_session_obj
+    if _http_session_obj is None:
+        with _http_session_lock:
+            if _http_session_obj is None:
+                import requests
+
+                _http_session_obj = requests.Session()
+    return _http_session_obj
+
+
+def _vertex_contents(user_query: str) -> List[Dict[str, Any]]:
+    return [{"role": "user", "parts": [{"text": user_query}]}]
+
+
+def _vertex_generation_config(max_output_tokens: int) -> Dict[str, Any]:
+    return {
+        "temperature": 0,
+        "max_output_tokens": max_output_tokens,
+    }
+
+
+def _rest_url(model_id: str, api_key: str) -> str:
+    return f"{GEMINI_REST_BASE_URL}/{model_id}:generateContent?key={api_key}"
+
 
-    payload = {
+def _rest_payload(system_prompt: str, user_query: str, max_output_tokens: int) -> Dict[str, Any]:
+    return {
         "systemInstruction": {
             "role": "system",
             "parts": [{"text": system_prompt}]
@@ -92,14 +181,12 @@ def call_llm(system_prompt: str, user_query: str, timeout_s: int = 30) -> str:
         ],
         "generationConfig": {
             "temperature": 0,
-            "maxOutputTokens": MAX_OUTPUT_TOKENS
+            "maxOutputTokens": max_output_tokens
         }
     }
 
-    r = requests.post(url, json=payload, timeout=timeout_s)
-    r.raise_for_status()
-    data = r.json()
 
+def _parse_rest_response(logger, data: Dict[str, Any]) -> str:
     logger.info(f"Gemini API response: {str(data)[:100]}")
 
     if "error" in data:
@@ -107,3 +194,356 @@ def call_llm(system_prompt: str, user_query: str, timeout_s: int = 30) -> str:
         raise RuntimeError(f"Gemini API error: {error_msg}")
 
     return _extract_text(data)
+
+
+def _latency_key(backend: str, model_id: str) -> str:
+    return f"{backend}:{model_id}"
+
+
+def _primary_backend(model_id: str) -> str:
+    return "vertex" if model_id in VERTEX_MODELS else "rest"
+
+
+def _breaker(backend: str) -> CircuitBreaker:
+    return get_breaker(f"llm.{backend}", **LLM_BREAKER_SETTINGS)
+
+
+def _observed_p95(model_id: str) -> Optional[float]:
+    window = get_window(_latency_key(_primary_backend(model_id), model_id))
+    if window.count() < ROUTE_MIN_SAMPLES:
+        return None
+    return window.percentile(ROUTE_PERCENTILE)
+
+
+def _is_simple_question(question: str, prompt_tokens: int) -> bool:
+    q = f" {question.lower()} "
+    return (
+        len(question.split()) <= SIMPLE_MAX_QUESTION_WORDS
+        and prompt_tokens <= SIMPLE_MAX_PROMPT_TOKENS
+        and not any(marker in q for marker in COMPLEX_MARKERS)
+    )
+
+
+def route_model(
+    logger,
+    task: str,
+    system_prompt: str,
+    user_query: str,
+    question: Optional[str] = None,
+    model_id: Optional[str] = None,
+) -> Tuple[str, int]:
+    """
+    (model_id, max_output_tokens) for one call. Auxiliary tasks always use their route;
+    chat answers are routed only with LLM_ROUTING=on (else LLM_MODEL, MAX_OUTPUT_TOKENS).
+    An explicit model_id wins over the rules but still gets the task's output cap; chat
+    answers use the route's simple_model when the question (or, without one, the whole
+    prompt) looks simple; a model whose observed p95 exceeds the route's latency budget is
+    swapped for the route's fallback.
+    """
+    if task not in ROUTES:
+        raise RuntimeError(f"Unknown LLM task '{task}'. Known tasks: {', '.join(ROUTES)}")
+    if task == TASK_CHAT and not ROUTING_ENABLED:
+        return _resolve_model(logger, model_id), MAX_OUTPUT_TOKENS
+    route = ROUTES[task]
+    cap = route["max_output_tokens"]
+    if model_id:
+        return _resolve_model(logger, model_id), cap
+
+    reason = "rule"
+    chosen = route["model"]
+    if task == TASK_CHAT and route.get("simple_model"):
+        prompt_tokens = estimate_tokens(system_prompt, user_query)
+        if _is_simple_question(question or user_query, prompt_tokens):
+            chosen, reason = route["simple_model"], "simple"
+    chosen = _resolve_model(logger, chosen)
+
+    budget, fallback = route.get("latency_budget_s"), route.get("fallback")
+    if budget and fallback and fallback != chosen:
+        p95 = _observed_p95(chosen)
+        if p95 is not None and p95 > budget:
+            logger.info(f"route | {chosen} p95={p95:.1f}s over budget {budget:.0f}s -> {fallback}")
+            chosen, reason = _resolve_model(logger, fallback), "latency"
+
+    logger.info(f"route | task={task} | model={chosen} | max_output_tokens={cap} | reason={reason}")
+    return chosen, cap
+
+
+def warm_up(logger) -> None:
+    """Process-start warm-up: SDK import, vertexai.init and the REST keep-alive session."""
+    model_id = os.getenv("LLM_MODEL", "").strip()
+    if model_id in VERTEX_MODELS or not model_id:
+        from vertexai.generative_models import GenerativeModel  # noqa: F401  (import cost only)
+
+        init_vertex(logger, vertex_project(), VERTEX_LOCATION)
+    http_session()
+
+
+def llm_degraded() -> bool:
+    """True when the backend serving LLM_MODEL is tripped or trending towards tripping."""
+    model_id = os.getenv("LLM_MODEL", "").strip()
+    return _breaker(_primary_backend(model_id)).is_degraded()
+
+
+def _hedge_backend(primary: str) -> str:
+    """The other endpoint when it is usable, else a duplicate on the same one."""
+    if primary == "vertex" and os.getenv(ENV_GEMINI_STUDIO_API_KEY):
+        return "rest"
+    if primary == "rest":
+        return "vertex"
+    return primary
+
+
+def _hedge_delay(backend: str, model_id: str) -> float:
+    window = get_window(_latency_key(backend, model_id))
+    if window.count() < HEDGE_MIN_SAMPLES:
+        return HEDGE_DEFAULT_DELAY_S
+    return max(HEDGE_MIN_DELAY_S, window.percentile(HEDGE_PERCENTILE) or HEDGE_DEFAULT_DELAY_S)
+
+
+def _take_hedge_budget() -> bool:
+    """Reserve a hedge if the recent hedge rate is under HEDGE_MAX_RATE; records the decision."""
+    with _hedge_lock:
+        hedged = sum(_hedge_history)
+        allowed = (hedged + 1) <= HEDGE_MAX_RATE * max(len(_hedge_history) + 1, 1 / HEDGE_MAX_RATE)
+        _hedge_history.append(allowed)
+        return allowed
+
+
+def _note_unhedged_call() -> None:
+    with _hedge_lock:
+        _hedge_history.append(False)
+
+
+def _vertex_executor() -> ThreadPoolExecutor:
+    global _vertex_pool
+    if _vertex_pool is None:
+        with _vertex_pool_lock:
+            if _vertex_pool is None:
+                _vertex_pool = ThreadPoolExecutor(max_workers=VERTEX_SYNC_WORKERS, thread_name_prefix="vertex")
+    return _vertex_pool
+
+
+def _shared_loop() -> asyncio.AbstractEventLoop:
+    """Process-wide event loop on a daemon thread; async clients stay bound to one loop."""
+    global _async_loop
+    with _async_loop_lock:
+        if _async_loop is None:
+            loop = asyncio.new_event_loop()
+            threading.Thread(target=loop.run_forever, name="llm-async", daemon=True).start()
+            _async_loop = loop
+        return _async_loop
+
+
+def run_async(coro: Awaitable[T]) -> T:
+    """
+    Blocking entry to the async LLM path for threads without an event loop (Streamlit, jobs):
+    runs coro on the shared loop instead of a fresh asyncio.run() loop per call.
+    If the caller is interrupted, the coroutine is cancelled.
+    """
+    future = asyncio.run_coroutine_threadsafe(coro, _shared_loop())
+    try:
+        return future.result()
+    except BaseException:
+        future.cancel()
+        raise
+
+
+def _call_vertex(logger, model_id: str, system_prompt: str, user_query: str, timeout_s: float, max_output_tokens: int) -> str:
+    """Raises TimeoutError after timeout_s (inside the caller's breaker guard, so it counts as a failure)."""
+    logger.info("Using Vertex AI to call the model.")
+
+    model = _vertex_model(model_id, system_prompt)
+    future = _vertex_executor().submit(
+        model.generate_content,
+        contents=_vertex_contents(user_query),
+        generation_config=_vertex_generation_config(max_output_tokens),
+    )
+    try:
+        response = future.result(timeout=timeout_s)
+    except FutureTimeoutError:
+        future.cancel()
+        raise TimeoutError(f"Vertex AI call timed out after {timeout_s}s")
+    logger.info(f"Vertex AI response: {str(response)[:200]}")
+    return response.text
+
+
+def _call_rest(logger, model_id: str, system_prompt: str, user_query: str, timeout_s: float, max_output_tokens: int) -> str:
+    logger.info("Using Gemini API (REST) to call the model.")
+    api_key = _req(ENV_GEMINI_STUDIO_API_KEY)
+
+    url = _rest_url(model_id, api_key)
+
+    logger.info(f"Calling Gemini API with url: {url}...")
+
+    r = http_session().post(url, json=_rest_payload(system_prompt, user_query, max_output_tokens), timeout=timeout_s)
+    r.raise_for_status()
+    return _parse_rest_response(logger, r.json())
+
+
+def call_llm(
+    system_prompt: str,
+    user_query: str,
+    timeout_s: int = 30,
+    hedge: Optional[bool] = None,
+    session_id: Optional[str] = None,
+    priority: str = INTERACTIVE,
+    model_id: Optional[str] = None,
+    task: str = TASK_CHAT,
+    question: Optional[str] = None,
+) -> str:
+    """
+    Blocking LLM call, admitted through the process-wide admission controller
+    (session_id for fair queueing, priority "interactive" or "background").
+    hedge=None follows LLM_HEDGE; a hedged call runs the async implementation on the
+    shared event loop (run_async) so the duplicate request can be raced/cancelled.
+    task/question drive the model router (route_model); model_id pins the model instead.
+    """
+    if HEDGE_ENABLED if hedge is None else hedge:
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            return run_async(acall_llm(
+                system_prompt, user_query, timeout_s=timeout_s, hedge=True,
+                session_id=session_id, priority=priority, model_id=model_id,
+                task=task, question=question,
+            ))
+
+    logger = get_logger("btai.llm.adapter")
+    model_id, max_tokens = route_model(logger, task, system_prompt, user_query, question, model_id)
+    backend = _primary_backend(model_id)
+    est_tokens = estimate_tokens(system_prompt, user_query) + min(OUTPUT_TOKENS_ESTIMATE, max_tokens)
+
+    with get_admission_controller().admit(session_id, priority, est_tokens):
+        t0 = time.perf_counter()
+        with _breaker(backend).guard():
+            if backend == "vertex":
+                text = _call_vertex(logger, model_id, system_prompt, user_query, timeout_s, max_tokens)
+            else:
+                # Fallback to REST API for other supported models
+                text = _call_rest(logger, model_id, system_prompt, user_query, timeout_s, max_tokens)
+        record_latency(_latency_key(backend, model_id), time.perf_counter() - t0)
+    return text
+
+
+# ========== Async variants ==========
+async def _acall_vertex(logger, model_id: str, system_prompt: str, user_query: str, max_output_tokens: int) -> str:
+    logger.info("Using Vertex AI (async) to call the model.")
+    model = _new_vertex_model(model_id, system_prompt)
+    response = await model.generate_content_async(
+        contents=_vertex_contents(user_query),
+        generation_config=_vertex_generation_config(max_output_tokens),
+    )
+    logger.info(f"Vertex AI response: {str(response)[:200]}")
+    return response.text
+
+
+async def _acall_rest(logger, model_id: str, system_prompt: str, user_query: str, timeout_s: float, max_output_tokens: int) -> str:
+    logger.info("Using Gemini API (REST, async) to call the model.")
+    api_key = _req(ENV_GEMINI_STUDIO_API_KEY)
+    import httpx
+
+    async with httpx.AsyncClient(timeout=timeout_s) as client:
+        r = await client.post(_rest_url(model_id, api_key), json=_rest_payload(system_prompt, user_query, max_output_tokens))
+    r.raise_for_status()
+    return _parse_rest_response(logger, r.json())
+
+
+async def _acall_backend(logger, backend: str, model_id: str, system_prompt: str, user_query: str, timeout_s: float, max_output_tokens: int) -> str:
+    """
+    One request, bounded by timeout_s inside the breaker guard: a timeout is recorded as a
+    failure of this backend (a cancellation from outside is not).
+    """
+    t0 = time.perf_counter()
+    with _breaker(backend).guard():
+        if backend == "vertex":
+            call = _acall_vertex(logger, model_id, system_prompt, user_query, max_output_tokens)
+        else:
+            call = _acall_rest(logger, model_id, system_prompt, user_query, timeout_s, max_output_tokens)
+        text = await asyncio.wait_for(call, timeout=timeout_s)
+    record_latency(_latency_key(backend, model_id), time.perf_counter() - t0)
+    return text
+
+
+async def _acall_hedged(logger, model_id: str, system_prompt: str, user_query: str, timeout_s: float, max_output_tokens: int) -> str:
+    """
+    Start the primary request; if it is still running after the adaptive delay and the hedge
+    budget allows, start a duplicate and return the first successful result. The loser (and
+    both requests, if the caller is cancelled) is cancelled. Both requests end by the same
+    deadline (timeout_s after the primary started), each timing out inside its own breaker.
+    """
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + timeout_s
+    backend = _primary_backend(model_id)
+    primary = asyncio.ensure_future(
+        _acall_backend(logger, backend, model_id, system_prompt, user_query, timeout_s, max_output_tokens)
+    )
+    hedge: Optional[asyncio.Future] = None
+    try:
+        delay = _hedge_delay(backend, model_id)
+        done, _ = await asyncio.wait({primary}, timeout=delay)
+        if done:
+            _note_unhedged_call()
+            return primary.result()
+        remaining = deadline - loop.time()
+        if remaining <= 0 or not _take_hedge_budget():
+            logger.info(f"Hedge skipped (rate cap or no time left) | model={model_id} | delay={delay:.2f}s")
+            return await primary
+
+        hedge_backend = _hedge_backend(backend)
+        logger.info(f"Hedging LLM call | model={model_id} | primary={backend} | hedge={hedge_backend} | delay={delay:.2f}s")
+        hedge = asyncio.ensure_future(
+            _acall_backend(logger, hedge_backend, model_id, system_prompt, user_query, remaining, max_output_tokens)
+        )
+
+        pending = {primary, hedge}
+        first_error: Optional[BaseException] = None
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if task.exception() is None:
+                    logger.info(f"Hedge race won by {'hedge' if task is hedge else 'primary'} | model={model_id}")
+                    return task.result()
+                first_error = first_error or task.exception()
+                logger.error(f"Hedged request failed: {task.exception()!r}")
+        raise first_error
+    finally:
+        for task in (primary, hedge):
+            if task is not None and not task.done():
+                task.cancel()
+
+
+async def acall_llm(
+    system_prompt: str,
+    user_query: str,
+    timeout_s: float = 30,
+    hedge: Optional[bool] = None,
+    session_id: Optional[str] = None,
+    priority: str = INTERACTIVE,
+    model_id: Optional[str] = None,
+    task: str = TASK_CHAT,
+    question: Optional[str] = None,
+) -> str:
+    """
+    Async counterpart of call_llm(): same model selection and admission control, no worker
+    thread held while waiting. The call itself (not the queue wait) is bounded by timeout_s
+    (raises asyncio.TimeoutError, counted by the backend's breaker); cancelling the awaiting
+    task cancels the in-flight request(s). hedge=None follows LLM_HEDGE; task/question/model_id
+    as in call_llm().
+    """
+    logger = get_logger("btai.llm.adapter")
+    model_id, max_tokens = route_model(logger, task, system_prompt, user_query, question, model_id)
+    est_tokens = estimate_tokens(system_prompt, user_query) + min(OUTPUT_TOKENS_ESTIMATE, max_tokens)
+
+    async with get_admission_controller().aadmit(session_id, priority, est_tokens):
+        if HEDGE_ENABLED if hedge is None else hedge:
+            coro = _acall_hedged(logger, model_id, system_prompt, user_query, timeout_s, max_tokens)
+        else:
+            coro = _acall_backend(
+                logger, _primary_backend(model_id), model_id, system_prompt, user_query, timeout_s, max_tokens
+            )
+
+        try:
+            return await coro
+        except asyncio.TimeoutError:
+            logger.error(f"LLM call timed out after {timeout_s}s | model={model_id}")
+            raise
@@ -0,0 +1,208 @@
+# Project: braintransplant-ai — File: src/llm/admission.py
+import os
+import time
+import asyncio
+import threading
+from collections import OrderedDict, deque
+from contextlib import asynccontextmanager, contextmanager
+from typing import AsyncIterator, Callable, Deque, Dict, Iterator, Optional
+
+from llm.latency import get_window, record_latency
+from utils.logger import get_logger
+
+# ---- Priority lanes ----
+INTERACTIVE = "interactive"  # chat answers a user is waiting for
+BACKGROUND = "background"    # reranking, summaries, batch jobs
+LANES = (INTERACTIVE, BACKGROUND)
+
+# ---- Explicit constants ----
+MAX_CONCURRENT_CALLS = int(os.getenv("LLM_MAX_CONCURRENCY", "8"))
+INTERACTIVE_RESERVED_SLOTS = 2          # slots background work may never take
+TOKENS_PER_MINUTE = int(os.getenv("LLM_TOKENS_PER_MINUTE", "1000000"))  # keep under project quota
+OUTPUT_TOKENS_ESTIMATE = 1024           # added to the prompt estimate when reserving tokens
+ADMISSION_TIMEOUT_S = 120.0             # max queue wait before giving up
+POLL_S = 0.25                           # re-check cadence while waiting for token refill
+SLOW_WAIT_LOG_S = 1.0
+
+
+class AdmissionTimeout(RuntimeError):
+    """Raised when a call waited longer than ADMISSION_TIMEOUT_S for a slot."""
+
+
+class _Waiter:
+    __slots__ = ("session", "lane", "tokens", "enqueued_at", "granted", "notify")
+
+    def __init__(self, session: str, lane: str, tokens: int, notify: Callable[[], None]) -> None:
+        self.session = session
+        self.lane = lane
+        self.tokens = tokens
+        self.enqueued_at = time.monotonic()
+        self.granted = False
+        self.notify = notify
+
+
+class AdmissionController:
+    """
+    Process-wide gate in front of LLM calls:
+    - at most max_concurrent calls in flight, with reserved_interactive slots that the
+      background lane can never occupy;
+    - a token bucket refilled at tokens_per_minute (estimated prompt + output tokens);
+    - interactive waiters are always served before background ones; within a lane,
+      sessions are served round-robin so one busy session cannot starve the others.
+    Works for both threads (admit) and coroutines (aadmit).
+    """
+
+    def __init__(
+        self,
+        max_concurrent: int = MAX_CONCURRENT_CALLS,
+        reserved_interactive: int = INTERACTIVE_RESERVED_SLOTS,
+        tokens_per_minute: int = TOKENS_PER_MINUTE,
+    ) -> None:
+        self.max_concurrent = max_concurrent
+        self.reserved_interactive = min(reserved_interactive, max_concurrent - 1)
+        self.capacity = float(tokens_per_minute)
+        self.refill_per_s = tokens_per_minute / 60.0
+
+        self._lock = threading.Lock()
+        self._queues: Dict[str, "OrderedDict[str, Deque[_Waiter]]"] = {lane: OrderedDict() for lane in LANES}
+        self._in_flight = 0
+        self._tokens = self.capacity
+        self._refilled_at = time.monotonic()
+        self._logger = get_logger("btai.llm.admission")
+
+    # ----- internals (call with self._lock held) -----
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._refilled_at) * self.refill_per_s)
+        self._refilled_at = now
+
+    def _lane_has_slot(self, lane: str) -> bool:
+        limit = self.max_concurrent if lane == INTERACTIVE else self.max_concurrent - self.reserved_interactive
+        return self._in_flight < limit
+
+    def _dispatch(self) -> None:
+        self._refill()
+        while True:
+            for lane in LANES:
+                queue = self._queues[lane]
+                if queue and self._lane_has_slot(lane):
+                    break
+            else:
+                return
+            session, waiters = next(iter(queue.items()))
+            waiter = waiters[0]
+            # Oversized requests may proceed on a full bucket rather than wait forever.
+            if self._tokens < min(waiter.tokens, self.capacity):
+                return  # head-of-line waits for refill; keeps priority order intact
+            waiters.popleft()
+            if waiters:
+                queue.move_to_end(session)  # round-robin across sessions
+            else:
+                del queue[session]
+            self._tokens -= waiter.tokens
+            self._in_flight += 1
+            waiter.granted = True
+            waiter.notify()
+
+    def _enqueue(self, waiter: _Waiter) -> None:
+        self._queues[waiter.lane].setdefault(waiter.session, deque()).append(waiter)
+        self._dispatch()
+
+    def _withdraw(self, waiter: _Waiter) -> None:
+        waiters = self._queues[waiter.lane].get(waiter.session)
+        if waiters and waiter in waiters:
+            waiters.remove(waiter)
+            if not waiters:
+                del self._queues[waiter.lane][waiter.session]
+
+    def _record_wait(self, waiter: _Waiter) -> None:
+        waited = time.monotonic() - waiter.enqueued_at
+        record_latency(f"queue:{waiter.lane}", waited)
+        if waited >= SLOW_WAIT_LOG_S:
+            self._logger.info(f"admission wait | lane={waiter.lane} | session={waiter.session} | waited={waited:.2f}s")
+
+    def _release(self) -> None:
+        with self._lock:
+            self._in_flight -= 1
+            self._dispatch()
+
+    # ----- public API -----
+    @contextmanager
+    def admit(self, session_id: Optional[str], priority: str = INTERACTIVE, est_tokens: int = 0) -> Iterator[None]:
+        """Block the calling thread until the call may proceed; release the slot on exit."""
+        event = threading.Event()
+        waiter = _Waiter(session_id or "-", priority, est_tokens, event.set)
+        deadline = waiter.enqueued_at + ADMISSION_TIMEOUT_S
+        with self._lock:
+            self._enqueue(waiter)
+        while not event.wait(POLL_S):
+            with self._lock:
+                self._dispatch()
+                if not waiter.granted and time.monotonic() >= deadline:
+                    self._withdraw(waiter)
+                    raise AdmissionTimeout(f"LLM admission timed out after {ADMISSION_TIMEOUT_S:.0f}s ({priority})")
+        self._record_wait(waiter)
+        try:
+            yield
+        finally:
+            self._release()
+
+    @asynccontextmanager
+    async def aadmit(self, session_id: Optional[str], priority: str = INTERACTIVE, est_tokens: int = 0) -> AsyncIterator[None]:
+        """Coroutine variant of admit(): waits on a future, never blocks the event loop."""
+        loop = asyncio.get_running_loop()
+        fut: asyncio.Future = loop.create_future()
+
+        def _notify() -> None:
+            loop.call_soon_threadsafe(lambda: fut.done() or fut.set_result(None))
+
+        waiter = _Waiter(session_id or "-", priority, est_tokens, _notify)
+        deadline = waiter.enqueued_at + ADMISSION_TIMEOUT_S
+        with self._lock:
+            self._enqueue(waiter)
+        try:
+            while True:
+                try:
+                    await asyncio.wait_for(asyncio.shield(fut), POLL_S)
+                    break
+                except asyncio.TimeoutError:
+                    with self._lock:
+                        self._dispatch()
+                        if waiter.granted:
+                            continue
+                        if time.monotonic() >= deadline:
+                            self._withdraw(waiter)
+                            raise AdmissionTimeout(f"LLM admission timed out after {ADMISSION_TIMEOUT_S:.0f}s ({priority})")
+        except asyncio.CancelledError:
+            with self._lock:
+                granted = waiter.granted
+                self._withdraw(waiter)
+            if granted:
+                self._release()
+            raise
+        self._record_wait(waiter)
+        try:
+            yield
+        finally:
+            self._release()
+
+    def snapshot(self) -> Dict[str, object]:
+        """Current load plus queue-wait percentiles per lane (for logs / admin display)."""
+        with self._lock:
+            self._refill()
+            queued = {lane: sum(len(w) for w in q.values()) for lane, q in self._queues.items()}
+            state = {"in_flight": self._in_flight, "queued": queued, "tokens_available": int(self._tokens)}
+        state["queue_wait"] = {lane: get_window(f"queue:{lane}").snapshot() for lane in LANES}
+        return state
+
+
+_controller: Optional[AdmissionController] = None
+_controller_lock = threading.Lock()
+
+
+def get_admission_controller() -> AdmissionController:
+    global _controller
+    with _controller_lock:
+        if _controller is None:
+            _controller = AdmissionController()
+        return _controller
@@ -0,0 +1,142 @@
+# Project: braintransplant-ai — File: src/llm/fanout.py
+import os
+import time
+import asyncio
+from typing import Any, Dict, List, Optional
+
+from config.keys import GEMINI_1_5_PRO, GEMINI_2_5_PRO
+from config.routing import TASK_AGGREGATE
+from llm.adapter import SUPPORTED_MODELS, acall_llm, run_async
+from llm.admission import INTERACTIVE
+from llm.latency import record_latency
+from utils.logger import get_logger
+
+# ---- Explicit constants ----
+# "off":       single-model call_llm (LLM_MODEL);
+# "first":     send the prompt to every FANOUT_MODELS entry, return the first acceptable answer;
+# "aggregate": wait for FANOUT_MIN_ANSWERS acceptable answers (or the deadline), then merge them.
+FANOUT_POLICY = os.getenv("LLM_FANOUT", "off").strip().lower()
+FANOUT_MODELS = [
+    m.strip() for m in os.getenv("LLM_FANOUT_MODELS", f"{GEMINI_2_5_PRO},{GEMINI_1_5_PRO}").split(",") if m.strip()
+]
+FANOUT_DEADLINE_S = float(os.getenv("LLM_FANOUT_DEADLINE_S", "60"))
+FANOUT_MIN_ANSWERS = int(os.getenv("LLM_FANOUT_MIN_ANSWERS", "2"))
+AGGREGATE_TIMEOUT_S = 60
+MIN_ACCEPTABLE_CHARS = 20   # shorter (or empty) answers don't count as acceptable
+
+AGGREGATE_SYSTEM_PROMPT = (
+    "You merge answers that several models gave to the same question. Produce one answer that keeps "
+    "every point supported by the answers, resolves contradictions in favour of the better-supported "
+    "claim, and drops repetition. Keep any citations exactly as written. Output only the merged answer."
+)
+
+
+def _acceptable(text: str) -> bool:
+    return len((text or "").strip()) >= MIN_ACCEPTABLE_CHARS
+
+
+def _aggregate_prompt(question: str, answers: List[Dict[str, Any]]) -> str:
+    """The question and the candidate answers only: the retrieved context is not resent."""
+    blocks = [f"ANSWER {i} (model {a['model']}):\n{a['text']}" for i, a in enumerate(answers, 1)]
+    return f"QUESTION:\n{question}\n\n" + "\n\n".join(blocks)
+
+
+async def _timed_call(model_id: str, system_prompt: str, user_query: str, timeout_s: float,
+                      session_id: Optional[str], priority: str) -> Dict[str, Any]:
+    """One model's answer with provenance; per-model latency goes to the "fanout:<model>" window."""
+    t0 = time.perf_counter()
+    text = await acall_llm(
+        system_prompt, user_query, timeout_s=timeout_s, hedge=False,
+        session_id=session_id, priority=priority, model_id=model_id,
+    )
+    latency = time.perf_counter() - t0
+    record_latency(f"fanout:{model_id}", latency)
+    return {"model": model_id, "text": text, "latency_s": round(latency, 3)}
+
+
+async def afan_out(
+    system_prompt: str,
+    user_query: str,
+    policy: Optional[str] = None,
+    models: Optional[List[str]] = None,
+    deadline_s: float = FANOUT_DEADLINE_S,
+    min_answers: int = FANOUT_MIN_ANSWERS,
+    session_id: Optional[str] = None,
+    priority: str = INTERACTIVE,
+    question: Optional[str] = None,
+) -> Dict[str, Any]:
+    """
+    Send one prompt to several models concurrently (each admitted like any other LLM call).
+    question is the user's question alone; "aggregate" merges the answers against it (the
+    full prompt when not given).
+    Returns {"text", "policy", "answers": [{"model", "text", "latency_s"}], "errors": {model: error}}.
+    Models still running when the policy is satisfied or the deadline passes are cancelled.
+    Raises the first model error if no acceptable answer arrived at all.
+    """
+    logger = get_logger("btai.llm.fanout")
+    policy = (policy or FANOUT_POLICY).strip().lower()
+    if policy not in ("first", "aggregate"):
+        raise ValueError(f"Unsupported fan-out policy '{policy}' (expected 'first' or 'aggregate').")
+    models = list(dict.fromkeys(models or FANOUT_MODELS))
+    unknown = [m for m in models if m not in SUPPORTED_MODELS]
+    if unknown or not models:
+        raise RuntimeError(f"Unsupported fan-out models {unknown or models}. Supported models: {', '.join(SUPPORTED_MODELS)}")
+    wanted = 1 if policy == "first" else max(1, min(min_answers, len(models)))
+
+    tasks = {
+        asyncio.ensure_future(_timed_call(m, system_prompt, user_query, deadline_s, session_id, priority)): m
+        for m in models
+    }
+    answers: List[Dict[str, Any]] = []
+    errors: Dict[str, str] = {}
+    first_error: Optional[BaseException] = None
+    loop = asyncio.get_running_loop()
+    stop_at = loop.time() + deadline_s
+    try:
+        pending = set(tasks)
+        while pending and len(answers) < wanted:
+            remaining = stop_at - loop.time()
+            if remaining <= 0:
+                break
+            done, pending = await asyncio.wait(pending, timeout=remaining, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                model_id = tasks[task]
+                if task.exception() is not None:
+                    first_error = first_error or task.exception()
+                    errors[model_id] = repr(task.exception())
+                    logger.error(f"fan-out | model={model_id} failed: {task.exception()!r}")
+                elif not _acceptable(task.result()["text"]):
+                    errors[model_id] = "unacceptable answer"
+                    logger.warning(f"fan-out | model={model_id} answer rejected ({len(task.result()['text'])} chars)")
+                else:
+                    answers.append(task.result())
+        for task in pending:
+            errors[tasks[task]] = "cancelled"
+    finally:
+        for task in tasks:
+            if not task.done():
+                task.cancel()
+
+    summary = " | ".join(f"{a['model']}={a['latency_s']:.2f}s" for a in answers)
+    logger.info(f"fan-out | policy={policy} | answers={len(answers)}/{len(models)} | {summary} | errors={errors}")
+    if not answers:
+        if first_error is not None:
+            raise first_error
+        raise RuntimeError(f"No acceptable answer from {', '.join(models)} within {deadline_s}s ({errors}).")
+
+    text = answers[0]["text"]
+    if policy == "aggregate" and len(answers) > 1:
+        try:
+            text = await acall_llm(
+                AGGREGATE_SYSTEM_PROMPT, _aggregate_prompt(question or user_query, answers),
+                timeout_s=AGGREGATE_TIMEOUT_S, session_id=session_id, priority=priority,
+                task=TASK_AGGREGATE,
+            )
+        except Exception as e:
+            logger.error(f"fan-out | aggregation failed, returning the fastest answer: {e!r}")
+    return {"text": text, "policy": policy, "answers": answers, "errors": errors}
+
+
+def fan_out(system_prompt: str, user_query: str, **kwargs: Any) -> Dict[str, Any]:
+    """Blocking afan_out() on the shared LLM event loop (for Streamlit and scripts)."""
+    return run_async(afan_out(system_prompt, user_query, **kwargs))
@@ -0,0 +1,71 @@
+# Project: braintransplant-ai — File: src/llm/latency.py
+import threading
+from collections import deque
+from typing import Deque, Dict, Optional
+
+# ---- Explicit constants (no defaults) ----
+WINDOW_SIZE = 200  # samples kept per key (rolling)
+
+# Internal registry state
+_lock = threading.Lock()
+_windows: Dict[str, "LatencyWindow"] = {}
+
+
+class LatencyWindow:
+    """
+    Thread-safe rolling window of the last WINDOW_SIZE latencies (seconds) for one key,
+    e.g. "vertex:gemini-2.5-pro". Percentiles are computed on demand (nearest-rank).
+    """
+
+    def __init__(self, size: int = WINDOW_SIZE) -> None:
+        self._samples: Deque[float] = deque(maxlen=size)
+        self._lock = threading.Lock()
+
+    def record(self, seconds: float) -> None:
+        with self._lock:
+            self._samples.append(seconds)
+
+    def count(self) -> int:
+        with self._lock:
+            return len(self._samples)
+
+    def percentile(self, p: float) -> Optional[float]:
+        with self._lock:
+            if not self._samples:
+                return None
+            ordered = sorted(self._samples)
+        idx = min(len(ordered) - 1, max(0, int(round(p / 100.0 * len(ordered))) - 1))
+        return ordered[idx]
+
+    def snapshot(self) -> Dict[str, Optional[float]]:
+        with self._lock:
+            samples = list(self._samples)
+        if not samples:
+            return {"n": 0, "mean": None, "p50": None, "p95": None, "p99": None}
+        return {
+            "n": len(samples),
+            "mean": round(sum(samples) / len(samples), 3),
+            "p50": self.percentile(50),
+            "p95": self.percentile(95),
+            "p99": self.percentile(99),
+        }
+
+
+def get_window(key: str) -> LatencyWindow:
+    """Return (creating on first use) the process-wide window for key."""
+    with _lock:
+        w = _windows.get(key)
+        if w is None:
+            w = _windows[key] = LatencyWindow()
+        return w
+
+
+def record_latency(key: str, seconds: float) -> None:
+    get_window(key).record(seconds)
+
+
+def latency_snapshot() -> Dict[str, Dict[str, Optional[float]]]:
+    """Percentile summary for every key seen so far (for logs / admin display)."""
+    with _lock:
+        items = list(_windows.items())
+    return {k: w.snapshot() for k, w in sorted(items)}
@@ -0,0 +1,26 @@
+# Project: braintransplant-ai — File: src/llm/prompts.py
+from typing import List, Tuple
+
+# Shared by the chat page and the precompute job, so precomputed answers match live ones.
+CHAT_SYSTEM_PROMPT = (
+    "You are a helpful assistant named 'BC2 AI Assistant'. Based ONLY on the provided context snippets, "
+    "answer the user's question in sufficient detail so that user probably wouldn't even go to the source file, including breakdowns and explanations where needed and relevant. "
+    "Be comprehensive enough so users have enough information without needing to open sources—provide tables or lists if data allows. "
+    "If the context does not contain the answer, state that you do not have enough information from the provided documents. "
+    "Use the conversation so far only to understand what follow-up questions refer to."
+)
+
+
+def chat_prompt(context: str, question: str, history_block: str = "") -> str:
+    prompt = f"CONTEXT:\n{context}\n\nUSER QUESTION:\n{question}"
+    if history_block:
+        prompt = f"CONVERSATION SO FAR:\n{history_block}\n\n{prompt}"
+    return prompt
+
+
+def sources_block(answer: str, citations: List[str]) -> Tuple[str, str]:
+    """(answer with a Sources list appended, the appended markdown) unless the answer already cites them."""
+    if citations and not any(c in answer for c in citations):
+        sources_md = "\n\n**Sources:**\n" + "\n".join(f"- {c}" for c in sorted(citations))
+        return answer + sources_md, sources_md
+    return answer, ""
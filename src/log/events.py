@@ -1,29 +1,40 @@
 # Project: logs-ai-reporting-model-train — File: src/log/events.py
-import datetime
-import json
+import threading
 from pathlib import Path
-from typing import List
-
-from nl_sql.utils import fmt_elapsed  # reuse the human formatter
-
-LOG_PATH = Path("outputs/logs/chat_sql.log")
-SQL_LATEST_PATH = Path("outputs/logs/chat_sql_last.sql")
-SQL_HISTORY_PATH = Path("outputs/logs/chat_sql_history.sql")
-
-def _write_sql_files(user_q: str, sql: str) -> None:
-    try:
-        if not sql:
-            return
-        SQL_LATEST_PATH.parent.mkdir(parents=True, exist_ok=True)
-        sql_pretty = sql.strip()
-        if not sql_pretty.endswith(";"):
-            sql_pretty += ";"
-        header = f"-- {datetime.datetime.utcnow().isoformat()}Z | {user_q}\n"
-        SQL_LATEST_PATH.write_text(header + sql_pretty + "\n", encoding="utf-8")
-        with SQL_HISTORY_PATH.open("a", encoding="utf-8") as hf:
-            hf.write(header + sql_pretty + "\n\n")
-    except Exception:
-        pass
+from typing import Any, Dict, Iterator, List, Optional
+
+from log.sink import EventSink, read_events as _read_segments
+
+EVENTS_DIR = Path("outputs/logs/events")  # rotating, indexed JSONL segments (see log/sink.py)
+
+_sink: Optional[EventSink] = None
+_sink_lock = threading.Lock()
+
+
+def _get_sink() -> EventSink:
+    global _sink
+    if _sink is None:
+        with _sink_lock:
+            if _sink is None:
+                _sink = EventSink(EVENTS_DIR)
+    return _sink
+
+
+def fmt_elapsed(seconds: float) -> str:
+    """Human formatter: 0.42s, 12.3s, 2m 05s, 1h 02m."""
+    if seconds < 60:
+        return f"{seconds:.2f}s" if seconds < 10 else f"{seconds:.1f}s"
+    minutes, secs = divmod(int(round(seconds)), 60)
+    if minutes < 60:
+        return f"{minutes}m {secs:02d}s"
+    hours, minutes = divmod(minutes, 60)
+    return f"{hours}h {minutes:02d}m"
+
+
+def log_event(kind: str, **fields: Any) -> None:
+    """Buffer one event; written by the sink's background thread, never blocks on disk."""
+    _get_sink().emit({"kind": kind, **fields})
+
 
 def log_sql_event(
     user_q: str,
@@ -36,25 +47,24 @@ def log_sql_event(
     raw_b: str | None = None,
     elapsed_total: float | None = None,
 ) -> None:
-    """Append JSONL event and write copy-pasteable .sql files for the last query."""
-    try:
-        LOG_PATH.parent.mkdir(parents=True, exist_ok=True)
-        event = {
-            "ts": datetime.datetime.utcnow().isoformat() + "Z",
-            "user_query": user_q,
-            "sql": sql,  # JSON escapes newlines; use .sql files to copy paste
-            "columns": cols or [],
-            "row_count": total_rows if total_rows is not None else 0,
-            "rows_sample": rows_sample or [],
-            "error": error or "",
-            "model_raw_phase_a": raw_a or "",
-            "model_raw_phase_b": raw_b or "",
-            "elapsed_human": fmt_elapsed(elapsed_total or 0.0),
-            "elapsed_seconds": round(elapsed_total or 0.0, 3),
-        }
-        with LOG_PATH.open("a", encoding="utf-8") as f:
-            f.write(json.dumps(event, ensure_ascii=False) + "\n")
-    except Exception:
-        pass
-    # Always try to persist pretty SQL files
-    _write_sql_files(user_q, sql or "")
\ No newline at end of file
+    """Record one NL→SQL exchange (the SQL text is in the event; use read_events to pull it back)."""
+    log_event(
+        "sql",
+        user_query=user_q,
+        sql=sql,
+        columns=cols or [],
+        row_count=total_rows if total_rows is not None else 0,
+        rows_sample=rows_sample or [],
+        error=error or "",
+        model_raw_phase_a=raw_a or "",
+        model_raw_phase_b=raw_b or "",
+        elapsed_human=fmt_elapsed(elapsed_total or 0.0),
+        elapsed_seconds=round(elapsed_total or 0.0, 3),
+    )
+
+
+def read_events(start: float, end: float, kind: Optional[str] = None) -> Iterator[Dict[str, Any]]:
+    """Events with start <= ts (epoch seconds) <= end, optionally of one kind."""
+    for event in _read_segments(EVENTS_DIR, start, end):
+        if kind is None or event.get("kind") == kind:
+            yield event
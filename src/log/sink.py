@@ -0,0 +1,275 @@
+# Project: braintransplant-ai — File: src/log/sink.py
+import os
+import gzip
+import json
+import fcntl
+import atexit
+import bisect
+import datetime
+import threading
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from utils.logger import get_logger
+
+# ---- Explicit constants ----
+FLUSH_INTERVAL_S = 1.0              # background flush cadence
+FLUSH_MAX_EVENTS = 500              # flush early once this many events are buffered
+MAX_BUFFERED_EVENTS = 20_000        # beyond this the oldest buffered events are dropped
+MAX_SEGMENT_BYTES = 32 * 1024 * 1024
+INDEX_EVERY_BYTES = 64 * 1024       # sparse index: one (ts, offset) entry per ~64 KiB block
+REORDER_SLACK_S = 5.0               # events from concurrent emitters may be this far out of order
+
+SEGMENT_PREFIX = "seg-"
+ACTIVE_SUFFIX = ".jsonl"
+SEALED_SUFFIX = ".jsonl.gz"
+INDEX_SUFFIX = ".idx"
+
+# Segment layout (one directory per sink):
+#   seg-<first_ts_ms>-<pid>-<n>.jsonl        active, plain JSON lines
+#   seg-<first_ts_ms>-<pid>-<n>.jsonl.gz     sealed: one gzip member per index block, so a
+#                                            reader can seek straight to a block
+#   <segment>.idx                            "<ts_epoch> <byte_offset>" per block start;
+#                                            sealed segments end with "end <last_ts_epoch>"
+# The writing process holds an exclusive flock on its active segment; an active segment
+# nobody holds was left by a process that died, and is sealed by the next sink to start.
+
+
+def event_epoch(event: Dict[str, Any]) -> float:
+    return datetime.datetime.fromisoformat(event["ts"].replace("Z", "+00:00")).timestamp()
+
+
+class EventSink:
+    """
+    Append-only JSONL event sink. emit() only appends to an in-memory buffer; a daemon
+    thread writes the buffer every FLUSH_INTERVAL_S (or at FLUSH_MAX_EVENTS), maintains a
+    sparse timestamp index per segment, and seals segments (gzip, seekable per block) once
+    they exceed MAX_SEGMENT_BYTES, on close(), and (for dead processes' leftovers) at start.
+    Events carry an ISO "ts" and are written in emit order.
+    """
+
+    def __init__(self, directory: Path) -> None:
+        self.directory = Path(directory)
+        self._lock = threading.Lock()
+        self._wakeup = threading.Condition(self._lock)
+        self._buffer: List[Tuple[float, str]] = []
+        self._dropped = 0
+        self._closed = False
+        self._seq = 0
+        self._active: Optional[Path] = None
+        self._active_fd: Optional[int] = None  # holds the flock marking the segment as live
+        self._active_size = 0
+        self._last_indexed = -INDEX_EVERY_BYTES
+        self._logger = get_logger("btai.events")
+        self._thread = threading.Thread(target=self._run, name=f"event-sink-{self.directory.name}", daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    # ----- producer side -----
+    def emit(self, event: Dict[str, Any]) -> None:
+        event = dict(event)
+        event.setdefault("ts", datetime.datetime.now(datetime.timezone.utc).isoformat().replace("+00:00", "Z"))
+        line = json.dumps(event, ensure_ascii=False, default=str) + "\n"
+        with self._lock:
+            if self._closed:
+                return
+            self._buffer.append((event_epoch(event), line))
+            if len(self._buffer) > MAX_BUFFERED_EVENTS:
+                del self._buffer[0]
+                self._dropped += 1
+            if len(self._buffer) >= FLUSH_MAX_EVENTS:
+                self._wakeup.notify()
+
+    def close(self) -> None:
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            self._wakeup.notify()
+        self._thread.join(timeout=10)
+
+    # ----- writer thread -----
+    def _run(self) -> None:
+        try:
+            seal_abandoned_segments(self.directory)
+        except Exception as e:
+            self._logger.error(f"event sink {self.directory}: sealing abandoned segments failed: {e}")
+        while True:
+            with self._lock:
+                if not self._closed and len(self._buffer) < FLUSH_MAX_EVENTS:
+                    self._wakeup.wait(FLUSH_INTERVAL_S)
+                pending, self._buffer = self._buffer, []
+                dropped, self._dropped = self._dropped, 0
+                closing = self._closed
+            try:
+                if dropped:
+                    self._logger.warning(f"event sink {self.directory}: dropped {dropped} events (buffer full)")
+                if pending:
+                    self._write(pending)
+            except Exception as e:
+                self._logger.error(f"event sink {self.directory}: write failed, {len(pending)} events lost: {e}")
+            if closing:
+                try:
+                    self._seal_active()
+                except Exception as e:
+                    self._logger.error(f"event sink {self.directory}: sealing {self._active} failed: {e}")
+                return
+
+    def _open_segment(self, first_ts: float) -> None:
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self._seq += 1
+        name = f"{SEGMENT_PREFIX}{int(first_ts * 1000):013d}-{os.getpid()}-{self._seq}{ACTIVE_SUFFIX}"
+        self._active = self.directory / name
+        self._active_fd = os.open(self._active, os.O_WRONLY | os.O_CREAT | os.O_APPEND, 0o644)
+        fcntl.flock(self._active_fd, fcntl.LOCK_EX)
+        self._active_size = 0
+        self._last_indexed = -INDEX_EVERY_BYTES
+
+    def _seal_active(self) -> None:
+        if self._active is None:
+            return
+        if self._active_size:
+            seal_segment(self._active)
+        else:
+            self._active.unlink()
+        os.close(self._active_fd)  # releases the flock
+        self._active, self._active_fd = None, None
+
+    def _write(self, pending: List[Tuple[float, str]]) -> None:
+        if self._active is None:
+            self._open_segment(pending[0][0])
+        index_lines: List[str] = []
+        with self._active.open("ab") as f:
+            for ts, line in pending:
+                if self._active_size - self._last_indexed >= INDEX_EVERY_BYTES:
+                    index_lines.append(f"{ts:.6f} {self._active_size}\n")
+                    self._last_indexed = self._active_size
+                data = line.encode("utf-8")
+                f.write(data)
+                self._active_size += len(data)
+        if index_lines:
+            with Path(str(self._active) + INDEX_SUFFIX).open("a", encoding="utf-8") as idx:
+                idx.writelines(index_lines)
+        if self._active_size >= MAX_SEGMENT_BYTES:
+            self._seal_active()
+
+
+def _read_index(path: Path) -> Tuple[List[Tuple[float, int]], Optional[float]]:
+    """(block starts as (ts, offset), last_ts or None for an active segment)."""
+    blocks: List[Tuple[float, int]] = []
+    last_ts: Optional[float] = None
+    idx = Path(str(path) + INDEX_SUFFIX)
+    if not idx.exists():
+        return blocks, last_ts
+    for line in idx.read_text(encoding="utf-8").splitlines():
+        a, b = line.split()
+        if a == "end":
+            last_ts = float(b)
+        else:
+            blocks.append((float(a), int(b)))
+    return blocks, last_ts
+
+
+def seal_segment(active: Path) -> Path:
+    """
+    Compress an active segment into a sealed one, one gzip member per index block, and
+    rewrite the index with compressed offsets plus the segment's last timestamp.
+    """
+    blocks, _ = _read_index(active)
+    sealed = Path(str(active)[: -len(ACTIVE_SUFFIX)] + SEALED_SUFFIX)
+    raw = active.read_bytes()
+    starts = [off for _, off in blocks] or [0]
+    ends = starts[1:] + [len(raw)]
+    index_lines: List[str] = []
+    with sealed.open("wb") as out:
+        for (ts, _), start, end in zip(blocks or [(0.0, 0)], starts, ends):
+            index_lines.append(f"{ts:.6f} {out.tell()}\n")
+            with gzip.GzipFile(fileobj=out, mode="wb") as gz:
+                gz.write(raw[start:end])
+    last_ts = _last_event_epoch(raw)
+    index_lines.append(f"end {last_ts:.6f}\n")
+    Path(str(sealed) + INDEX_SUFFIX).write_text("".join(index_lines), encoding="utf-8")
+    active_index = Path(str(active) + INDEX_SUFFIX)
+    if active_index.exists():
+        active_index.unlink()
+    active.unlink()
+    return sealed
+
+
+def _last_event_epoch(raw: bytes) -> float:
+    """ts of the last complete event (a dead writer may have left a torn last line)."""
+    for line in reversed(raw.splitlines()):
+        try:
+            return event_epoch(json.loads(line))
+        except (ValueError, KeyError):
+            continue
+    return 0.0
+
+
+def seal_abandoned_segments(directory: Path) -> List[Path]:
+    """
+    Seal active segments whose writer is gone (no flock held on them: the process exited
+    without close(), e.g. killed on redeploy). Empty files are left alone: a writer may have
+    just created one and not yet taken its lock. Returns the sealed paths.
+    """
+    sealed: List[Path] = []
+    for _, path in _segments(Path(directory)):
+        if not path.name.endswith(ACTIVE_SUFFIX):
+            continue
+        try:
+            fd = os.open(path, os.O_RDONLY)
+        except FileNotFoundError:
+            continue  # sealed meanwhile by its writer
+        try:
+            try:
+                fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                continue  # a live process is writing it
+            if not path.exists():
+                continue
+            if os.fstat(fd).st_size == 0:
+                continue
+            sealed.append(seal_segment(path))
+        finally:
+            os.close(fd)
+    return sealed
+
+
+def _segments(directory: Path) -> List[Tuple[float, Path]]:
+    out = []
+    for p in directory.glob(f"{SEGMENT_PREFIX}*"):
+        if p.name.endswith(ACTIVE_SUFFIX) or p.name.endswith(SEALED_SUFFIX):
+            first_ms = p.name[len(SEGMENT_PREFIX):].split("-", 1)[0]
+            out.append((int(first_ms) / 1000.0, p))
+    return sorted(out)
+
+
+def read_events(directory: Path, start: float, end: float) -> Iterator[Dict[str, Any]]:
+    """
+    Yield events with start <= ts_epoch <= end, in write order per segment. Segments outside
+    the range are skipped by name/index alone; inside a segment the sparse index seeks to the
+    last block starting at or before `start`, so only the blocks overlapping the range are read.
+    """
+    for first_ts, path in _segments(Path(directory)):
+        if first_ts > end:
+            break
+        blocks, last_ts = _read_index(path)
+        if last_ts is not None and last_ts < start:
+            continue
+        pos = bisect.bisect_right([ts for ts, _ in blocks], start - REORDER_SLACK_S) - 1
+        offset = blocks[pos][1] if pos >= 0 else 0
+        with path.open("rb") as f:
+            f.seek(offset)
+            stream = gzip.GzipFile(fileobj=f, mode="rb") if path.name.endswith(SEALED_SUFFIX) else f
+            for raw in stream:
+                if not raw.strip():
+                    continue
+                try:
+                    event = json.loads(raw)
+                    ts = event_epoch(event)
+                except (ValueError, KeyError):
+                    continue  # torn write at the tail of an active segment
+                if ts > end + REORDER_SLACK_S:
+                    break
+                if start <= ts <= end:
+                    yield event
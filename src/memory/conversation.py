@@ -0,0 +1,148 @@
+# Project: braintransplant-ai — File: src/memory/conversation.py
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Dict, List
+
+import db.memory
+from config.routing import TASK_SUMMARIZE
+from llm.adapter import call_llm
+from llm.admission import BACKGROUND
+from utils.logger import get_logger
+from utils.tokens import CHARS_PER_TOKEN, estimate_tokens
+
+# ---- Explicit constants (no defaults) ----
+KEEP_VERBATIM_TURNS = 4        # newest turns sent word-for-word
+FOLD_EVERY_TURNS = 2           # summarise once this many turns have left the verbatim window
+HISTORY_TOKEN_BUDGET = 6000    # summary + verbatim turns in the prompt
+SUMMARY_TOKEN_BUDGET = 1200    # cap for the rolling summary itself
+TURN_TOKEN_CAP = 1500          # a single verbatim turn (long table answers) is clipped to this
+SUMMARY_MAX_WORDS = 600        # asked of the model; SUMMARY_TOKEN_BUDGET is the hard cap
+SUMMARY_TIMEOUT_S = 60
+FOLD_WORKERS = 2               # background summarisation threads per process
+
+SUMMARY_SYSTEM_PROMPT = (
+    "You maintain a running summary of a conversation between a user and the BC2 AI Assistant. "
+    "Merge the new turns into the existing summary. Keep the user's goals, the entities, systems and "
+    "documents discussed, and key facts or numbers from the answers; drop pleasantries and formatting. "
+    f"Reply with the updated summary only, at most {SUMMARY_MAX_WORDS} words."
+)
+
+# Folds run off the request thread; one in flight per session (see schedule_memory_update)
+_fold_lock = threading.Lock()
+_fold_pool = ThreadPoolExecutor(max_workers=FOLD_WORKERS, thread_name_prefix="memory-fold")
+_pending_folds: Dict[str, "Future[Dict[str, Any]]"] = {}
+
+
+def new_memory() -> Dict[str, Any]:
+    return {"summary": "", "summarized_turns": 0}
+
+
+def load_memory(session_id: str) -> Dict[str, Any]:
+    """Stored memory for the session, or an empty one."""
+    return db.memory.load_memory(session_id) or new_memory()
+
+
+def _clip(text: str, max_tokens: int) -> str:
+    max_chars = max_tokens * CHARS_PER_TOKEN
+    if len(text) <= max_chars:
+        return text
+    return text[:max_chars].rstrip() + " […]"
+
+
+def _format_turn(turn: Dict[str, str]) -> str:
+    return f"User: {turn['user']}\nAssistant: {_clip(turn['assistant'], TURN_TOKEN_CAP)}\n"
+
+
+def build_history_block(history: List[Dict[str, str]], memory: Dict[str, Any], offset: int = 0) -> str:
+    """
+    Prompt block for prior turns: the rolling summary followed by as many of the newest
+    not-yet-summarised turns as fit into HISTORY_TOKEN_BUDGET (newest kept first).
+    offset is the number of session turns before history[0] (resumed sessions load only
+    the newest turns). Returns "" for a fresh conversation.
+    """
+    summary = _clip(memory.get("summary", ""), SUMMARY_TOKEN_BUDGET)
+    budget = HISTORY_TOKEN_BUDGET - estimate_tokens(summary)
+
+    recent: List[str] = []
+    for turn in reversed(history[max(0, memory.get("summarized_turns", 0) - offset):]):
+        block = _format_turn(turn)
+        cost = estimate_tokens(block)
+        if cost > budget:
+            break
+        recent.append(block)
+        budget -= cost
+    recent.reverse()
+
+    parts: List[str] = []
+    if summary:
+        parts.append(f"Summary of earlier conversation:\n{summary}\n")
+    if recent:
+        parts.append("Most recent turns:\n" + "\n".join(recent))
+    return "\n".join(parts)
+
+
+def update_memory(
+    session_id: str, history: List[Dict[str, str]], memory: Dict[str, Any], offset: int = 0
+) -> Dict[str, Any]:
+    """
+    Fold turns that have left the verbatim window into the rolling summary (one background
+    LLM call per FOLD_EVERY_TURNS turns, only over the new turns) and persist it.
+    offset: see build_history_block(). Returns the memory to keep in session state;
+    unchanged on failure.
+    """
+    logger = get_logger("btai.memory")
+    start = max(memory.get("summarized_turns", 0), offset)
+    end = offset + len(history) - KEEP_VERBATIM_TURNS
+    if end - start < FOLD_EVERY_TURNS:
+        return memory
+
+    new_turns = "\n".join(_format_turn(t) for t in history[start - offset:end - offset])
+    prompt = f"EXISTING SUMMARY:\n{memory.get('summary') or '(none)'}\n\nNEW TURNS:\n{new_turns}"
+    try:
+        summary = call_llm(
+            SUMMARY_SYSTEM_PROMPT, prompt, timeout_s=SUMMARY_TIMEOUT_S,
+            session_id=session_id, priority=BACKGROUND, task=TASK_SUMMARIZE,
+        ).strip()
+    except Exception as e:
+        logger.error(f"memory summarise failed | session={session_id} | {e}")
+        return memory
+
+    updated = {"summary": _clip(summary, SUMMARY_TOKEN_BUDGET), "summarized_turns": end}
+    db.memory.save_memory(session_id, updated["summary"], updated["summarized_turns"])
+    logger.info(f"memory updated | session={session_id} | summarized_turns={end} | summary_chars={len(updated['summary'])}")
+    return updated
+
+
+def schedule_memory_update(
+    session_id: str, history: List[Dict[str, str]], memory: Dict[str, Any], offset: int = 0
+) -> None:
+    """
+    Run update_memory() in the background so the user never waits on the summarisation
+    call. Skipped while a fold for the session is still running: the next turn schedules
+    it again, and until then the unsummarised turns stay in the prompt verbatim.
+    """
+    with _fold_lock:
+        pending = _pending_folds.get(session_id)
+        if pending is not None and not pending.done():
+            return
+        _pending_folds[session_id] = _fold_pool.submit(update_memory, session_id, list(history), dict(memory), offset)
+
+
+def collect_memory(session_id: str, memory: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    The session's memory with a finished background fold applied (call before building the
+    prompt). Returns memory unchanged while the fold is still running.
+    """
+    with _fold_lock:
+        pending = _pending_folds.get(session_id)
+        if pending is None or not pending.done():
+            return memory
+        del _pending_folds[session_id]
+    try:
+        folded = pending.result()
+    except Exception as e:
+        get_logger("btai.memory").error(f"memory fold failed | session={session_id} | {e}")
+        return memory
+    if folded.get("summarized_turns", 0) > memory.get("summarized_turns", 0):
+        return folded
+    return memory
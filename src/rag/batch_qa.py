@@ -0,0 +1,193 @@
+# Project: braintransplant-ai — File: src/rag/batch_qa.py
+"""
+Batch question answering (evaluation sets, FAQ refreshes) through the chat pipeline:
+aget_grounded_snippets -> build_context -> acall_llm, same system prompt as the chat page.
+
+    python -m rag.batch_qa --input questions.jsonl --output outputs/batch/answers.jsonl
+
+Input: JSONL ({"question": ..., "id": optional}) or CSV (columns question[, id]).
+Output: one JSONL record per question, appended as soon as it finishes; the output file is
+the checkpoint, so re-running the same command skips every id already answered and retries
+the failed ones (the last record per id wins). Calls go through this process's admission
+controller in the background lane. That controller is per process: it does not see the app's
+calls, so the batch's concurrency and LLM_TOKENS_PER_MINUTE come on top of live chat traffic
+against the same project quota. Keep --concurrency low (or run off-hours) while users are active.
+"""
+import csv
+import json
+import time
+import random
+import asyncio
+import hashlib
+import argparse
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Set
+
+from llm.adapter import acall_llm
+from llm.admission import BACKGROUND, INTERACTIVE_RESERVED_SLOTS, MAX_CONCURRENT_CALLS
+from llm.prompts import CHAT_SYSTEM_PROMPT, chat_prompt, sources_block
+from rag.vertex_client import NO_DOCUMENTS_MSG, aget_grounded_snippets, build_context
+from utils.logger import get_logger
+
+# ---- Explicit constants ----
+DEFAULT_CONCURRENCY = MAX_CONCURRENT_CALLS - INTERACTIVE_RESERVED_SLOTS  # slots the background lane may use
+DEFAULT_RETRIES = 3
+RETRY_BASE_S = 2.0          # exponential backoff with jitter: 2s, 4s, 8s, ...
+RETRY_MAX_S = 60.0
+LLM_TIMEOUT_S = 120
+PROGRESS_EVERY = 10         # log a progress line every N finished questions
+
+
+def question_id(question: str) -> str:
+    return hashlib.sha256(" ".join(question.split()).encode("utf-8")).hexdigest()[:16]
+
+
+def read_questions(path: Path) -> List[Dict[str, str]]:
+    """[{"id", "question"}] from JSONL or CSV; ids default to a hash of the question."""
+    rows: List[Dict[str, Any]] = []
+    with path.open(encoding="utf-8", newline="") as f:
+        if path.suffix.lower() == ".csv":
+            rows = list(csv.DictReader(f))
+        else:
+            rows = [json.loads(line) for line in f if line.strip()]
+    out, seen = [], set()
+    for row in rows:
+        question = (row.get("question") or "").strip()
+        if not question:
+            continue
+        qid = str(row.get("id") or question_id(question))
+        if qid not in seen:
+            seen.add(qid)
+            out.append({"id": qid, "question": question})
+    return out
+
+
+def completed_ids(output: Path) -> Set[str]:
+    """Ids with an "ok" record in an existing output file (the checkpoint)."""
+    done: Set[str] = set()
+    if not output.exists():
+        return done
+    with output.open(encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue  # torn last line of an interrupted run
+            if record.get("status") == "ok":
+                done.add(record["id"])
+    return done
+
+
+async def _answer(item: Dict[str, str]) -> Dict[str, Any]:
+    """Retrieval errors propagate (retried by _run_one); no snippets is a real "no documents" answer."""
+    t0 = time.perf_counter()
+    snippets = await aget_grounded_snippets(item["question"])
+    context, citations = build_context(snippets, item["question"]) if snippets else (NO_DOCUMENTS_MSG, [])
+    t_rag = time.perf_counter() - t0
+    answer = await acall_llm(
+        CHAT_SYSTEM_PROMPT, chat_prompt(context, item["question"]),
+        timeout_s=LLM_TIMEOUT_S, priority=BACKGROUND, question=item["question"],
+    )
+    answer, _ = sources_block(answer, citations)
+    return {
+        "answer": answer,
+        "context": context,
+        "citations": citations,
+        "timings": {
+            "retrieval_s": round(t_rag, 3),
+            "llm_s": round(time.perf_counter() - t0 - t_rag, 3),
+        },
+    }
+
+
+async def _run_one(logger, item: Dict[str, str], retries: int) -> Dict[str, Any]:
+    t0 = time.perf_counter()
+    error = ""
+    for attempt in range(1, retries + 2):
+        try:
+            result = await _answer(item)
+            result["timings"]["total_s"] = round(time.perf_counter() - t0, 3)
+            return {**item, "status": "ok", "attempts": attempt, **result}
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            error = f"{type(e).__name__}: {e}"
+            if attempt > retries:
+                break
+            delay = min(RETRY_MAX_S, RETRY_BASE_S * 2 ** (attempt - 1)) * random.uniform(0.5, 1.0)
+            logger.warning(f"batch | id={item['id']} | attempt {attempt} failed ({error}); retry in {delay:.1f}s")
+            await asyncio.sleep(delay)
+    return {
+        **item, "status": "error", "attempts": retries + 1, "error": error,
+        "timings": {"total_s": round(time.perf_counter() - t0, 3)},
+    }
+
+
+async def run_batch(
+    questions: List[Dict[str, str]],
+    output: Path,
+    concurrency: int = DEFAULT_CONCURRENCY,
+    retries: int = DEFAULT_RETRIES,
+    include_context: bool = True,
+) -> Dict[str, int]:
+    """Answer every question not yet in `output`; returns {"skipped", "ok", "error"}."""
+    logger = get_logger("btai.rag.batch")
+    done = completed_ids(output)
+    todo = [q for q in questions if q["id"] not in done]
+    stats = {"skipped": len(questions) - len(todo), "ok": 0, "error": 0}
+    logger.info(f"batch start | questions={len(questions)} | todo={len(todo)} | concurrency={concurrency}")
+    output.parent.mkdir(parents=True, exist_ok=True)
+
+    queue: "asyncio.Queue[Dict[str, str]]" = asyncio.Queue()
+    for item in todo:
+        queue.put_nowait(item)
+    t0 = time.perf_counter()
+
+    with output.open("a", encoding="utf-8") as out:
+        async def worker() -> None:
+            while True:
+                try:
+                    item = queue.get_nowait()
+                except asyncio.QueueEmpty:
+                    return
+                record = await _run_one(logger, item, retries)
+                if not include_context:
+                    record.pop("context", None)
+                out.write(json.dumps(record, ensure_ascii=False) + "\n")
+                out.flush()  # checkpoint: a finished answer survives an interrupted run
+                stats[record["status"]] += 1
+                finished = stats["ok"] + stats["error"]
+                if finished % PROGRESS_EVERY == 0 or finished == len(todo):
+                    rate = finished / max(time.perf_counter() - t0, 1e-9) * 60
+                    logger.info(f"batch progress | {finished}/{len(todo)} | ok={stats['ok']} | error={stats['error']} | {rate:.1f}/min")
+
+        await asyncio.gather(*(worker() for _ in range(max(1, min(concurrency, len(todo) or 1)))))
+
+    logger.info(f"batch done | {stats} | dt={(time.perf_counter() - t0):.1f}s")
+    return stats
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Answer a JSONL/CSV question set through retrieval + LLM.")
+    parser.add_argument("--input", required=True, type=Path, help="questions (.jsonl or .csv)")
+    parser.add_argument("--output", required=True, type=Path, help="answers .jsonl (also the resume checkpoint)")
+    parser.add_argument("--concurrency", type=int, default=DEFAULT_CONCURRENCY)
+    parser.add_argument("--retries", type=int, default=DEFAULT_RETRIES)
+    parser.add_argument("--no-context", action="store_true", help="omit retrieved context from the output")
+    args = parser.parse_args(argv)
+
+    if not args.input.exists():
+        print(f"[batch_qa] input not found: {args.input}")
+        return 1
+    questions = read_questions(args.input)
+    stats = asyncio.run(run_batch(
+        questions, args.output, concurrency=args.concurrency, retries=args.retries,
+        include_context=not args.no_context,
+    ))
+    print(f"[batch_qa] {len(questions)} questions: {stats['ok']} answered, {stats['error']} failed, "
+          f"{stats['skipped']} already done -> {args.output}")
+    return 1 if stats["error"] else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
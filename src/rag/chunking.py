@@ -0,0 +1,246 @@
+# Project: braintransplant-ai — File: src/rag/chunking.py
+"""
+In-process text extraction and chunking for the admin import (see ui/admin/app_admin.py).
+Each chunk id is the sha256 of its text, so re-ingesting an edited document only adds and
+removes the chunks that actually changed. Chunk boundaries are content-defined (a unit closes
+a chunk when its hash says so, once the chunk is large enough), so an edit shifts boundaries
+only locally instead of re-cutting everything after it.
+Runs in worker processes: module-level functions only, SDK-free.
+"""
+import os
+import re
+import csv
+import time
+import hashlib
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from utils.tokens import CHARS_PER_TOKEN, estimate_tokens_upper
+
+# ---- Explicit constants ----
+# Sizes are estimated tokens (utils.tokens.estimate_tokens_upper), so dense or CJK text gets
+# proportionally shorter chunks and every chunk stays below MAX_CHUNK_TOKENS_WITH_OVERLAP.
+CHUNK_TOKENS = 1024                # target size, same as the former Vertex-side chunking
+CHUNK_OVERLAP_TOKENS = 200
+MAX_CHUNK_TOKENS_WITH_OVERLAP = CHUNK_TOKENS + CHUNK_OVERLAP_TOKENS + 1  # +1: the joining newline
+MIN_CHUNK_TOKENS = CHUNK_TOKENS // 4
+BOUNDARY_MODULUS = 4               # past MIN_CHUNK_TOKENS, ~1 in 4 units ends a chunk
+EXTRACT_WORKERS = max(1, min(4, (os.cpu_count() or 2) - 1))
+
+_SENTENCE_END = re.compile(r"(?<=[.!?])\s+")
+_BLANK_LINES = re.compile(r"\n\s*\n")
+
+Chunk = Tuple[str, str]  # (chunk_id, text)
+
+
+def chunk_id(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()[:32]
+
+
+# ========== Extraction: file -> text units (paragraphs, rows, slides) ==========
+def _paragraphs(text: str) -> List[str]:
+    return [" ".join(p.split()) for p in _BLANK_LINES.split(text) if p.strip()]
+
+
+def _extract_txt(path: str) -> List[str]:
+    with open(path, encoding="utf-8", errors="replace") as f:
+        return _paragraphs(f.read())
+
+
+def _rows_as_units(rows: List[List[Any]]) -> List[str]:
+    """Tabular rows as "header: value | ..." lines so each row stands alone in a chunk."""
+    rows = [["" if v is None else str(v).strip() for v in row] for row in rows]
+    rows = [row for row in rows if any(row)]
+    if not rows:
+        return []
+    header, units = rows[0], []
+    for row in rows[1:]:
+        cells = [f"{h}: {v}" if h else v for h, v in zip(header + [""] * len(row), row) if v]
+        units.append(" | ".join(cells))
+    return units or [" | ".join(header)]
+
+
+def _extract_csv(path: str) -> List[str]:
+    with open(path, encoding="utf-8", errors="replace", newline="") as f:
+        return _rows_as_units(list(csv.reader(f)))
+
+
+def _extract_xlsx(path: str) -> List[str]:
+    from openpyxl import load_workbook
+
+    wb = load_workbook(path, read_only=True, data_only=True)
+    units: List[str] = []
+    for ws in wb.worksheets:
+        rows = [list(r) for r in ws.iter_rows(values_only=True)]
+        sheet_units = _rows_as_units(rows)
+        if sheet_units:
+            units.append(f"Sheet: {ws.title}")
+            units.extend(sheet_units)
+    wb.close()
+    return units
+
+
+def _extract_pdf(path: str) -> List[str]:
+    from pypdf import PdfReader
+
+    units: List[str] = []
+    for page in PdfReader(path).pages:
+        units.extend(_paragraphs(page.extract_text() or ""))
+    return units
+
+
+def _extract_docx(path: str) -> List[str]:
+    import docx
+
+    document = docx.Document(path)
+    units = [" ".join(p.text.split()) for p in document.paragraphs if p.text.strip()]
+    for table in document.tables:
+        units.extend(_rows_as_units([[cell.text for cell in row.cells] for row in table.rows]))
+    return units
+
+
+def _extract_pptx(path: str) -> List[str]:
+    from pptx import Presentation
+
+    units: List[str] = []
+    for i, slide in enumerate(Presentation(path).slides, 1):
+        texts = [
+            " ".join(shape.text_frame.text.split())
+            for shape in slide.shapes
+            if getattr(shape, "has_text_frame", False) and shape.text_frame.text.strip()
+        ]
+        if texts:
+            units.append(f"Slide {i}: " + " ".join(texts))
+    return units
+
+
+# Extensions not listed here (e.g. legacy .ppt) keep Vertex-side chunking of the whole file.
+EXTRACTORS: Dict[str, Callable[[str], List[str]]] = {
+    ".txt": _extract_txt,
+    ".csv": _extract_csv,
+    ".xlsx": _extract_xlsx,
+    ".pdf": _extract_pdf,
+    ".docx": _extract_docx,
+    ".pptx": _extract_pptx,
+}
+
+
+# ========== Chunking: units -> chunks ==========
+def _fit_prefix(text: str, max_tokens: int) -> int:
+    """Length of the longest-ish prefix of text within max_tokens (never 0 for non-empty text)."""
+    n = min(len(text), max_tokens * CHARS_PER_TOKEN)
+    while n > 1:
+        tokens = estimate_tokens_upper(text[:n])
+        if tokens <= max_tokens:
+            break
+        n = max(1, n * max_tokens // tokens)
+    return n
+
+
+def _split_unit(unit: str) -> List[str]:
+    """Units above CHUNK_TOKENS split by sentence, then hard-cut."""
+    if estimate_tokens_upper(unit) <= CHUNK_TOKENS:
+        return [unit]
+    pieces: List[str] = []
+    current, size = "", 0
+    for sentence in _SENTENCE_END.split(unit):
+        while estimate_tokens_upper(sentence) > CHUNK_TOKENS:
+            cut = _fit_prefix(sentence, CHUNK_TOKENS)
+            pieces.append(sentence[:cut])
+            sentence = sentence[cut:]
+        tokens = estimate_tokens_upper(sentence)
+        if current and size + 1 + tokens > CHUNK_TOKENS:
+            pieces.append(current)
+            current, size = sentence, tokens
+        else:
+            current, size = (f"{current} {sentence}", size + 1 + tokens) if current else (sentence, tokens)
+    if current:
+        pieces.append(current)
+    return pieces
+
+
+def _is_boundary(unit: str) -> bool:
+    return int(hashlib.md5(unit.encode("utf-8")).hexdigest()[:8], 16) % BOUNDARY_MODULUS == 0
+
+
+def _overlap_tail(body: str) -> str:
+    if estimate_tokens_upper(body) <= CHUNK_OVERLAP_TOKENS:
+        return body
+    reversed_body = body[::-1]
+    tail = reversed_body[:_fit_prefix(reversed_body, CHUNK_OVERLAP_TOKENS)][::-1]
+    space = tail.find(" ")
+    return tail[space + 1:] if 0 <= space < len(tail) - 1 else tail
+
+
+def chunk_units(units: List[str]) -> List[Chunk]:
+    """Content-defined chunks of whole units, each prefixed with the previous chunk's tail."""
+    bodies: List[str] = []
+    current: List[str] = []
+    size = 0
+    for unit in (piece for u in units for piece in _split_unit(u)):
+        tokens = estimate_tokens_upper(unit)
+        if current and size + 1 + tokens > CHUNK_TOKENS:
+            bodies.append("\n".join(current))
+            current, size = [], 0
+        current.append(unit)
+        size += tokens + (1 if size else 0)
+        if size >= MIN_CHUNK_TOKENS and _is_boundary(unit):
+            bodies.append("\n".join(current))
+            current, size = [], 0
+    if current:
+        bodies.append("\n".join(current))
+
+    chunks: List[Chunk] = []
+    previous = ""
+    for body in bodies:
+        text = f"{_overlap_tail(previous)}\n{body}" if previous else body
+        chunks.append((chunk_id(text), text))
+        previous = body
+    return chunks
+
+
+# ========== Worker entry points ==========
+def extract_and_chunk(path: str) -> Dict[str, Any]:
+    """
+    One document -> {"document", "method", "chunks", "units", "chars", "seconds", "error"}.
+    method "local": chunks were produced here; "vertex": no extractor (or it failed), so the
+    whole file is imported and chunked by Vertex as before.
+    """
+    t0 = time.perf_counter()
+    result: Dict[str, Any] = {
+        "document": os.path.basename(path),
+        "method": "vertex",
+        "chunks": [],
+        "units": 0,
+        "chars": 0,
+        "error": None,
+    }
+    extractor = EXTRACTORS.get(os.path.splitext(path)[1].lower())
+    if extractor is not None:
+        try:
+            units = extractor(path)
+            result.update(
+                method="local",
+                chunks=chunk_units(units),
+                units=len(units),
+                chars=sum(len(u) for u in units),
+            )
+        except Exception as e:  # missing optional parser or unreadable file
+            result["error"] = f"{type(e).__name__}: {e}"
+    result["seconds"] = round(time.perf_counter() - t0, 3)
+    return result
+
+
+def chunk_documents(paths: List[str], workers: Optional[int] = None) -> List[Dict[str, Any]]:
+    """
+    extract_and_chunk() for every path in a process pool; results in input order.
+    Workers are spawned, not forked: the admin process already runs gRPC threads.
+    """
+    if not paths:
+        return []
+    with ProcessPoolExecutor(
+        max_workers=min(workers or EXTRACT_WORKERS, len(paths)),
+        mp_context=multiprocessing.get_context("spawn"),
+    ) as pool:
+        return list(pool.map(extract_and_chunk, paths))
@@ -0,0 +1,125 @@
+# Project: braintransplant-ai — File: src/rag/precompute.py
+"""
+Precompute answers for the curated example questions (ui/web/examples.py) against the
+current corpus generation (python -m rag.precompute [--force]).
+The admin panel bumps the generation and calls start_rebuild() after imports/deletes.
+"""
+import argparse
+import threading
+import traceback
+from typing import List, Optional, Tuple
+
+from db.precomputed import (
+    corpus_generation,
+    current_question_keys,
+    delete_precomputed_except,
+    normalise_question,
+    save_precomputed_answer,
+)
+from llm.adapter import call_llm
+from llm.admission import BACKGROUND
+from llm.prompts import CHAT_SYSTEM_PROMPT, chat_prompt, sources_block
+from rag.vertex_client import build_context, get_grounded_snippets
+from ui.web.examples import EXAMPLE_QUESTIONS
+from utils.logger import get_logger
+
+# ---- Explicit constants ----
+PRECOMPUTE_TIMEOUT_S = 120  # per answer; background lane, nobody is waiting on it
+
+_rebuild_lock = threading.Lock()
+_rebuild_thread: Optional[threading.Thread] = None
+_rebuild_again = False
+
+
+def precompute_answer(logger, question: str) -> Tuple[str, str]:
+    """
+    (answer with sources, retrieved context) through the same retrieval + prompt as the chat
+    page. Raises on a retrieval error or when nothing is retrieved, so a stored answer is never
+    built from an error message or an empty context; rebuild() retries the question next run.
+    """
+    snippets = get_grounded_snippets(question)
+    context, citations = build_context(snippets, question) if snippets else ("", [])
+    if not context:
+        raise RuntimeError("retrieval returned no documents")
+    answer = call_llm(
+        CHAT_SYSTEM_PROMPT, chat_prompt(context, question),
+        timeout_s=PRECOMPUTE_TIMEOUT_S, priority=BACKGROUND, question=question,
+    )
+    answer_with_sources, _ = sources_block(answer, citations)
+    return answer_with_sources, context
+
+
+def rebuild(questions: List[str] = EXAMPLE_QUESTIONS, force: bool = False) -> Tuple[int, int]:
+    """
+    Build answers for every curated question missing one for the current generation (all of
+    them with force=True). Answers are tagged with the generation read before building, so a
+    corpus change mid-run leaves them unserved rather than stale. Returns (built, failed).
+    """
+    logger = get_logger("btai.rag.precompute")
+    generation = corpus_generation()
+    if generation is None:
+        raise RuntimeError("corpus generation unavailable (database down?)")
+
+    done = set() if force else current_question_keys(generation)
+    todo = [q for q in questions if normalise_question(q) not in done]
+    logger.info(f"precompute start | generation={generation} | questions={len(questions)} | todo={len(todo)}")
+
+    built, failed = 0, 0
+    for question in todo:
+        try:
+            answer, context = precompute_answer(logger, question)
+            save_precomputed_answer(question, answer, context, generation)
+            built += 1
+            logger.info(f"precompute ok | generation={generation} | q={question[:80]} | ans_chars={len(answer)}")
+        except Exception as e:
+            failed += 1
+            logger.error(f"precompute failed | q={question[:80]} | {e}\n{traceback.format_exc()}")
+
+    removed = delete_precomputed_except({normalise_question(q) for q in questions})
+    logger.info(f"precompute done | generation={generation} | built={built} | failed={failed} | removed={removed}")
+    return built, failed
+
+
+def _rebuild_loop() -> None:
+    global _rebuild_again, _rebuild_thread
+    while True:
+        try:
+            rebuild()
+        except Exception as e:
+            get_logger("btai.rag.precompute").error(f"precompute rebuild failed: {e}")
+        with _rebuild_lock:
+            if not _rebuild_again:
+                _rebuild_thread = None
+                return
+            _rebuild_again = False
+
+
+def start_rebuild() -> None:
+    """
+    Rebuild in a background thread. A request arriving while one runs schedules exactly one
+    more pass afterwards (it will see the newer generation).
+    """
+    global _rebuild_again, _rebuild_thread
+    with _rebuild_lock:
+        if _rebuild_thread is not None:
+            _rebuild_again = True
+            return
+        _rebuild_thread = threading.Thread(target=_rebuild_loop, name="precompute", daemon=True)
+        _rebuild_thread.start()
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Precompute answers for the curated example questions.")
+    parser.add_argument("--force", action="store_true", help="rebuild all answers, not just missing/stale ones")
+    args = parser.parse_args(argv)
+    try:
+        built, failed = rebuild(force=args.force)
+    except Exception:
+        traceback.print_exc()
+        return 1
+    print(f"[precompute] built {built}, failed {failed}.")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -2,14 +2,19 @@
 import os
 import re
 import json
+import asyncio
+import threading
 import traceback
-from typing import List, Tuple
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
 
 import time
-import vertexai
-from vertexai.preview import rag
 from utils.logger import get_logger
-from llm.adapter import call_llm  # For Gemini reranking
+from utils.vertex import init_vertex
+from llm.adapter import call_llm, acall_llm, llm_degraded  # For Gemini reranking
+from llm.admission import BACKGROUND
+from config.routing import TASK_RERANK
+from utils.circuit_breaker import CircuitBreaker, CircuitOpenError, get_breaker
 
 # ======= Explicit config (no defaults) =======
 PROJECT_ID = "fresh-myth-471317-j9"
@@ -27,18 +32,81 @@ MAX_CONTEXT_CHARS = 120_000
 # Reranking config
 ENABLE_SECOND_PASS = False
 ENABLE_RERANK = False
-RERANK_MODEL = "gemini-2.5-pro"  # Env override to "gemini-2.5-flash" for speed
 RERANK_BATCH_SIZE = 5  # Reduced from 10 for faster batches
 RERANK_TIMEOUT_S = 60  # Increased from 30
 RERANK_MAX_RETRIES = 2  # New: retries per batch
 RERANK_FAILED_BATCH_THRESHOLD = 0.5  # New: if >50% batches fail, skip rerank
+RERANK_CONCURRENCY = 4  # async rerank: batches scored in parallel
+
+# Async retrieval (REST retrieveContexts; the SDK has no async retrieval_query)
+RAG_API_BASE_URL = f"https://{LOCATION}-aiplatform.googleapis.com/v1beta1"
+RAG_RETRIEVAL_TIMEOUT_S = 30
+GCP_AUTH_SCOPES = ["https://www.googleapis.com/auth/cloud-platform"]
+
+# Circuit breaker + degraded mode: when retrieval is tripped/slow or the LLM is degraded,
+# shrink top_k, skip rerank/second pass, and serve the last context built for the same query.
+RAG_BREAKER_SETTINGS = {
+    "window_s": 60.0,
+    "min_calls": 5,
+    "error_rate": 0.5,
+    "slow_call_s": 10.0,
+    "slow_rate": 0.6,
+    "open_s": 20.0,
+}
+DEGRADED_TOP_K_SNIPPETS = 10
+CONTEXT_CACHE_SIZE = 256
+RAG_UNAVAILABLE_MSG = "Document search is temporarily unavailable. Please try again shortly."
+NO_DOCUMENTS_MSG = "No relevant documents found."
+
+_credentials = None
+_credentials_lock = threading.Lock()
+_context_cache: "OrderedDict[str, Tuple[str, List[str]]]" = OrderedDict()
+_context_cache_lock = threading.Lock()
 
 
 def _init_vertex(logger) -> None:
     if not PROJECT_ID:
         raise ValueError("GCP_PROJECT_ID is not set correctly.")
-    vertexai.init(project=PROJECT_ID, location=LOCATION)
-    logger.info(f"vertexai.init(project={PROJECT_ID}, location={LOCATION})")
+    init_vertex(logger, PROJECT_ID, LOCATION)
+
+
+def _rag_breaker() -> CircuitBreaker:
+    return get_breaker("rag.retrieval", **RAG_BREAKER_SETTINGS)
+
+
+def _cache_key(user_query: str) -> str:
+    return " ".join(user_query.lower().split())
+
+
+def _cache_context(user_query: str, context: str, citations: List[str]) -> None:
+    key = _cache_key(user_query)
+    with _context_cache_lock:
+        _context_cache[key] = (context, citations)
+        _context_cache.move_to_end(key)
+        while len(_context_cache) > CONTEXT_CACHE_SIZE:
+            _context_cache.popitem(last=False)
+
+
+def _fallback_context(logger, user_query: str, default_msg: str) -> Tuple[str, List[str]]:
+    """Degraded mode: reuse the last context built for this query, else return default_msg."""
+    with _context_cache_lock:
+        cached = _context_cache.get(_cache_key(user_query))
+    if cached is not None:
+        logger.warning("retrieval unavailable; serving cached context")
+        return cached
+    return default_msg, []
+
+
+def _retrieval_plan(logger) -> Tuple[int, bool, bool]:
+    """(top_k, rerank, second_pass) for this call, trimmed while a backend is degraded."""
+    rag_degraded = _rag_breaker().is_degraded()
+    rerank_ok = ENABLE_RERANK and not rag_degraded and not llm_degraded()
+    if rag_degraded:
+        logger.warning(f"degraded mode | top_k={DEGRADED_TOP_K_SNIPPETS} | rerank=off | second_pass=off")
+        return DEGRADED_TOP_K_SNIPPETS, False, False
+    if ENABLE_RERANK and not rerank_ok:
+        logger.warning("LLM degraded; skipping rerank")
+    return TOP_K_SNIPPETS, rerank_ok, ENABLE_SECOND_PASS
 
 
 def _retrieve_snippets_rag(logger, user_query: str, top_k: int) -> List[str]:
@@ -46,20 +114,25 @@ def _retrieve_snippets_rag(logger, user_query: str, top_k: int) -> List[str]:
     Use retrieval_query which is the actual function available in the SDK.
     This matches your original working implementation.
     """
+    from vertexai.preview import rag  # heavy SDK import, deferred to first retrieval
+
     _init_vertex(logger)
     logger.info(f"RAG retrieval_query start | top_k={top_k} | query={user_query[:200]}")
 
     try:
-        response = rag.retrieval_query(
-            rag_resources=[
-                rag.RagResource(
-                    rag_corpus=RAG_CORPUS_NAME,
-                )
-            ],
-            text=user_query,
-            similarity_top_k=top_k,
-        )
+        with _rag_breaker().guard():
+            response = rag.retrieval_query(
+                rag_resources=[
+                    rag.RagResource(
+                        rag_corpus=RAG_CORPUS_NAME,
+                    )
+                ],
+                text=user_query,
+                similarity_top_k=top_k,
+            )
         logger.info("RAG retrieval_query succeeded")
+    except CircuitOpenError:
+        raise
     except Exception as e:
         logger.error(f"RAG retrieval_query failed: {e}\n{traceback.format_exc()}")
         raise
@@ -108,6 +181,79 @@ def _retrieve_snippets_rag(logger, user_query: str, top_k: int) -> List[str]:
     return snippets
 
 
+def _access_token() -> str:
+    """Cached ADC token for REST calls; refreshes (blocking, ~hourly) only when expired."""
+    global _credentials
+    import google.auth
+    from google.auth.transport.requests import Request
+
+    with _credentials_lock:
+        if _credentials is None:
+            _credentials, _ = google.auth.default(scopes=GCP_AUTH_SCOPES)
+        if not _credentials.valid:
+            _credentials.refresh(Request())
+        return _credentials.token
+
+
+def _valid_token() -> Optional[str]:
+    """The cached token if it is still valid (no lock, no I/O), else None."""
+    creds = _credentials
+    return creds.token if creds is not None and creds.valid else None
+
+
+def warm_up(logger) -> None:
+    """Process-start warm-up: RAG SDK import, vertexai.init and an ADC token for REST retrieval."""
+    from vertexai.preview import rag  # noqa: F401  (import cost only)
+
+    _init_vertex(logger)
+    _access_token()
+
+
+def _snippets_from_rest(data: Dict[str, Any]) -> List[str]:
+    contexts_list = (data.get("contexts") or {}).get("contexts") or []
+    snippets: List[str] = []
+    for context in contexts_list:
+        content = (context.get("text") or "").replace("\n", " ")
+        if content and len(content) >= MIN_SNIPPET_LEN:
+            snippets.append(content.strip())
+    return snippets
+
+
+async def _aretrieve_snippets_rag(
+    logger, user_query: str, top_k: int, timeout_s: float = RAG_RETRIEVAL_TIMEOUT_S
+) -> List[str]:
+    """
+    Async counterpart of _retrieve_snippets_rag() using the retrieveContexts REST endpoint.
+    Bounded by timeout_s; cancellation aborts the HTTP request.
+    """
+    logger.info(f"RAG retrieveContexts (async) start | top_k={top_k} | query={user_query[:200]}")
+    url = f"{RAG_API_BASE_URL}/projects/{PROJECT_ID}/locations/{LOCATION}:retrieveContexts"
+    body = {
+        "vertex_rag_store": {"rag_resources": [{"rag_corpus": RAG_CORPUS_NAME}]},
+        "query": {"text": user_query, "similarity_top_k": top_k},
+    }
+    # ADC lookup/refresh is blocking HTTP under a lock: keep it off the event loop
+    token = _valid_token() or await asyncio.to_thread(_access_token)
+    headers = {"Authorization": f"Bearer {token}"}
+    import httpx
+
+    try:
+        with _rag_breaker().guard():
+            async with httpx.AsyncClient(timeout=timeout_s) as client:
+                r = await asyncio.wait_for(client.post(url, json=body, headers=headers), timeout=timeout_s)
+            r.raise_for_status()
+        data = r.json()
+    except CircuitOpenError:
+        raise
+    except Exception as e:
+        logger.error(f"RAG retrieveContexts (async) failed: {e!r}")
+        raise
+
+    snippets = _snippets_from_rest(data)
+    logger.info(f"RAG retrieveContexts (async) done | snippets={len(snippets)}")
+    return snippets
+
+
 def _decompose_query(logger, user_query: str) -> List[str]:
     """Decompose multi-entity query into sub-queries (e.g., 'compare A B C' -> ['A', 'B', 'C'])."""
     lower_q = user_query.lower()
@@ -117,6 +263,35 @@ def _decompose_query(logger, user_query: str) -> List[str]:
     return sub_queries[:MAX_SUB_QUERIES]
 
 
+RERANK_SYSTEM_PROMPT = (
+    "You are a reranker. For each snippet, score its relevance to the query on a scale of 1-10. "
+    "Output strict JSON array of scores only, matching the order of snippets."
+)
+
+
+def _rerank_prompt(user_query: str, batch: List[str]) -> str:
+    return f"Query: {user_query}\nSnippets:\n" + "\n".join(f"[{i+1}] {s[:200]}" for i, s in enumerate(batch))
+
+
+def _parse_rerank_scores(raw: str, batch: List[str]) -> list:
+    if not raw.strip():
+        raise ValueError("Empty response from LLM")
+    scores = json.loads(raw)
+    if len(scores) != len(batch):
+        raise ValueError("Score length mismatch")
+    return scores
+
+
+def _finish_rerank(logger, snippets: List[str], ranked_snippets: list, failed_batches: int, n_batches: int) -> List[str]:
+    # Fallback: If too many failures, return original order (disable rerank)
+    if failed_batches / n_batches > RERANK_FAILED_BATCH_THRESHOLD:
+        logger.warning("Too many rerank failures; falling back to no reranking")
+        return snippets  # Original order
+
+    ranked_snippets.sort(key=lambda x: x[0], reverse=True)
+    return [s for score, s in ranked_snippets]
+
+
 def _gemini_rerank(logger, user_query: str, snippets: List[str]) -> List[str]:
     """Rerank snippets using Gemini (Pro or Flash). Returns sorted snippets high-to-low score."""
     if not snippets:
@@ -127,20 +302,14 @@ def _gemini_rerank(logger, user_query: str, snippets: List[str]) -> List[str]:
     failed_batches = 0
 
     for batch_idx, batch in enumerate(batches):
-        system_prompt = (
-            "You are a reranker. For each snippet, score its relevance to the query on a scale of 1-10. "
-            "Output strict JSON array of scores only, matching the order of snippets."
-        )
-        prompt = f"Query: {user_query}\nSnippets:\n" + "\n".join(f"[{i+1}] {s[:200]}" for i, s in enumerate(batch))
+        prompt = _rerank_prompt(user_query, batch)
 
         for attempt in range(RERANK_MAX_RETRIES + 1):
             try:
-                raw = call_llm(system_prompt, prompt, timeout_s=RERANK_TIMEOUT_S)
-                if not raw.strip():
-                    raise ValueError("Empty response from LLM")
-                scores = json.loads(raw)
-                if len(scores) != len(batch):
-                    raise ValueError("Score length mismatch")
+                raw = call_llm(
+                    RERANK_SYSTEM_PROMPT, prompt, timeout_s=RERANK_TIMEOUT_S, priority=BACKGROUND, task=TASK_RERANK
+                )
+                scores = _parse_rerank_scores(raw, batch)
                 ranked_snippets.extend(zip(scores, batch))
                 break  # Success
             except Exception as e:
@@ -151,38 +320,60 @@ def _gemini_rerank(logger, user_query: str, snippets: List[str]) -> List[str]:
                     failed_batches += 1
                     ranked_snippets.extend([(0, s) for s in batch])  # Fallback
 
-    # Fallback: If too many failures, return original order (disable rerank)
-    if failed_batches / len(batches) > RERANK_FAILED_BATCH_THRESHOLD:
-        logger.warning("Too many rerank failures; falling back to no reranking")
-        return snippets  # Original order
+    return _finish_rerank(logger, snippets, ranked_snippets, failed_batches, len(batches))
 
-    ranked_snippets.sort(key=lambda x: x[0], reverse=True)
-    return [s for score, s in ranked_snippets]
 
+async def _agemini_rerank(logger, user_query: str, snippets: List[str]) -> List[str]:
+    """Async _gemini_rerank(): batches are scored concurrently (at most RERANK_CONCURRENCY at once)."""
+    if not snippets:
+        return []
 
-def get_grounded_context(user_query: str) -> Tuple[str, List[str]]:
+    batches = [snippets[i:i + RERANK_BATCH_SIZE] for i in range(0, len(snippets), RERANK_BATCH_SIZE)]
+    sem = asyncio.Semaphore(RERANK_CONCURRENCY)
+
+    async def _score(batch_idx: int, batch: List[str]) -> Tuple[list, bool]:
+        prompt = _rerank_prompt(user_query, batch)
+        for attempt in range(RERANK_MAX_RETRIES + 1):
+            try:
+                async with sem:
+                    raw = await acall_llm(
+                        RERANK_SYSTEM_PROMPT, prompt, timeout_s=RERANK_TIMEOUT_S, priority=BACKGROUND, task=TASK_RERANK
+                    )
+                scores = _parse_rerank_scores(raw, batch)
+                return list(zip(scores, batch)), True
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Rerank batch {batch_idx+1} failed (attempt {attempt+1}): {e!r}")
+                if attempt < RERANK_MAX_RETRIES:
+                    await asyncio.sleep(2 ** attempt)
+        return [(0, s) for s in batch], False
+
+    results = await asyncio.gather(*(_score(i, b) for i, b in enumerate(batches)))
+    ranked_snippets = [pair for pairs, _ in results for pair in pairs]
+    failed_batches = sum(1 for _, ok in results if not ok)
+    return _finish_rerank(logger, snippets, ranked_snippets, failed_batches, len(batches))
+
+
+def get_grounded_snippets(user_query: str) -> List[str]:
     """
-    Retrieval with second RAG pass for multi-entity queries and reranking for quality.
-    Returns (context_text, citations).
+    The retrieval half of get_grounded_context(): retrieve, rerank and second pass, returning
+    the ordered snippets (possibly empty). Raises CircuitOpenError / the retrieval error if the
+    first-pass retrieval fails; the caller decides on the fallback.
     """
     logger = get_logger("btai.rag.client")
+    top_k, use_rerank, use_second_pass = _retrieval_plan(logger)
 
-    try:
-        snippets = _retrieve_snippets_rag(logger, user_query, TOP_K_SNIPPETS)
-    except Exception as e:
-        logger.error(f"Failed to retrieve snippets: {e}")
-        return "Error retrieving documents. Please try again.", []
-
+    snippets = _retrieve_snippets_rag(logger, user_query, top_k)
     if not snippets:
-        logger.info("no snippets returned")
-        return "No relevant documents found.", []
+        return snippets
 
     # Rerank snippets (second evaluating model with Gemini)
-    if ENABLE_RERANK:
+    if use_rerank:
         snippets = _gemini_rerank(logger, user_query, snippets)
 
     # Second RAG pass for multi-entity queries
-    if ENABLE_SECOND_PASS and 'compare' in user_query.lower():
+    if use_second_pass and 'compare' in user_query.lower():
         sub_queries = _decompose_query(logger, user_query)
         for sub_q in sub_queries:
             try:
@@ -194,6 +385,103 @@ def get_grounded_context(user_query: str) -> Tuple[str, List[str]]:
         # Dedup after second pass
         snippets = list(set(snippets))  # Simple dedup by exact match
 
+    return snippets
+
+
+def _context_or_fallback(logger, user_query: str, snippets: List[str], error: Optional[Exception] = None) -> Tuple[str, List[str]]:
+    """Shared tail of get_grounded_context()/aget_grounded_context(): fallback, empty result or built context."""
+    if error is not None:
+        if isinstance(error, CircuitOpenError):
+            logger.warning(f"Retrieval skipped: {error}")
+        else:
+            logger.error(f"Failed to retrieve snippets: {error!r}")
+        return fallback_context(user_query, error)
+    if not snippets:
+        logger.info("no snippets returned")
+        return NO_DOCUMENTS_MSG, []
+    context, citations = _build_context(logger, snippets)
+    _cache_context(user_query, context, citations)
+    return context, citations
+
+
+def get_grounded_context(user_query: str) -> Tuple[str, List[str]]:
+    """
+    Retrieval with second RAG pass for multi-entity queries and reranking for quality.
+    Returns (context_text, citations).
+    """
+    logger = get_logger("btai.rag.client")
+    try:
+        snippets = get_grounded_snippets(user_query)
+    except Exception as e:
+        return _context_or_fallback(logger, user_query, [], e)
+    return _context_or_fallback(logger, user_query, snippets)
+
+
+async def aget_grounded_snippets(user_query: str) -> List[str]:
+    """
+    Async get_grounded_snippets(): same plan, rerank and second pass on the async
+    retrieval/LLM calls, so concurrent conversations do not hold a thread each.
+    """
+    logger = get_logger("btai.rag.client")
+    top_k, use_rerank, use_second_pass = _retrieval_plan(logger)
+
+    snippets = await _aretrieve_snippets_rag(logger, user_query, top_k)
+    if not snippets:
+        return snippets
+
+    if use_rerank:
+        snippets = await _agemini_rerank(logger, user_query, snippets)
+
+    if use_second_pass and 'compare' in user_query.lower():
+        sub_queries = _decompose_query(logger, user_query)
+        results = await asyncio.gather(
+            *(_aretrieve_snippets_rag(logger, q, TOP_K_SNIPPETS_SECOND) for q in sub_queries),
+            return_exceptions=True,
+        )
+        for sub_q, res in zip(sub_queries, results):
+            if isinstance(res, BaseException):
+                logger.error(f"Second pass failed for sub-query '{sub_q}': {res!r}")
+                continue
+            snippets.extend(res)
+
+        snippets = list(set(snippets))
+
+    return snippets
+
+
+async def aget_grounded_context(user_query: str) -> Tuple[str, List[str]]:
+    """Async get_grounded_context(): same return shape, via aget_grounded_snippets()."""
+    logger = get_logger("btai.rag.client")
+    try:
+        snippets = await aget_grounded_snippets(user_query)
+    except asyncio.CancelledError:
+        raise
+    except Exception as e:
+        return _context_or_fallback(logger, user_query, [], e)
+    return _context_or_fallback(logger, user_query, snippets)
+
+
+def build_context(snippets: List[str], user_query: str = "") -> Tuple[str, List[str]]:
+    """
+    Public form of _build_context() for callers that assemble their own snippet list;
+    with user_query, the result also backs degraded-mode fallback for that query.
+    """
+    context, citations = _build_context(get_logger("btai.rag.client"), snippets)
+    if user_query:
+        _cache_context(user_query, context, citations)
+    return context, citations
+
+
+def fallback_context(user_query: str, error: Exception) -> Tuple[str, List[str]]:
+    """What get_grounded_context() returns when retrieval failed with `error`."""
+    logger = get_logger("btai.rag.client")
+    if isinstance(error, CircuitOpenError):
+        return _fallback_context(logger, user_query, RAG_UNAVAILABLE_MSG)
+    return _fallback_context(logger, user_query, "Error retrieving documents. Please try again.")
+
+
+def _build_context(logger, snippets: List[str]) -> Tuple[str, List[str]]:
+    """Order snippets (head/tail emphasis), number them and cap at MAX_CONTEXT_CHARS."""
     # Head/tail emphasis: Top 3 first, 2 strong at end, middle in between
     head = snippets[:3]
     tail = snippets[-2:] if len(snippets) > 5 else []
@@ -0,0 +1,135 @@
+# Project: braintransplant-ai — File: src/rag/working_set.py
+import os
+import re
+import math
+from collections import OrderedDict
+from typing import Dict, FrozenSet, List, Tuple
+
+from rag.vertex_client import build_context, fallback_context, get_grounded_snippets
+from utils.logger import get_logger
+
+# ---- Explicit constants ----
+# "local_first": answer follow-ups from the session's snippets when they cover the question,
+#                retrieving only below the threshold;
+# "merge":       always retrieve, and merge the best local snippets into the result.
+SESSION_RETRIEVAL_MODE = os.getenv("SESSION_RETRIEVAL_MODE", "local_first").strip().lower()
+MAX_WORKING_SET = 90          # snippets kept per session (LRU by last use)
+COVERAGE_THRESHOLD = 0.8      # share of the question's (idf-weighted) terms found in the best single snippet
+MIN_SNIPPET_COVERAGE = 0.5    # a snippet covering at least this share counts as a local hit
+MIN_LOCAL_HITS = 3            # and at least this many hits
+LOCAL_TOP_K = 20              # snippets used for a local answer / merged into a retrieval
+MIN_TERM_LEN = 3
+
+_WORD = re.compile(r"[a-zA-Z0-9äöüÄÖÜß][\w\-.]*")
+_STOPWORDS = frozenset(
+    "the and for are but not you all any can had her was one our out has him his how its may new now "
+    "see two who did get let say she too use what when where which while with this that these those "
+    "from they them then than there their about also into more most some such only over other "
+    "tell show give does do is it of to in on at by an or as be if me my we us please explain "
+    "describe".split()
+)
+
+
+def _terms(text: str) -> FrozenSet[str]:
+    out = set()
+    for w in _WORD.findall(text.lower()):
+        w = w.strip(".-")
+        if len(w) < MIN_TERM_LEN or w in _STOPWORDS:
+            continue
+        out.add(w[:-1] if len(w) > 4 and w.endswith("s") else w)  # crude plural folding
+    return frozenset(out)
+
+
+class SnippetWorkingSet:
+    """
+    Per-session set of retrieved snippets with their term sets. Follow-up questions are
+    scored against it locally (idf-weighted share of the question's terms in each snippet)
+    before going back to Vertex RAG.
+    Kept in st.session_state, one per chat session.
+    """
+
+    def __init__(self, max_snippets: int = MAX_WORKING_SET) -> None:
+        self.max_snippets = max_snippets
+        self._snippets: "OrderedDict[str, FrozenSet[str]]" = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._snippets)
+
+    def add(self, snippets: List[str]) -> None:
+        for s in snippets:
+            self._snippets[s] = self._snippets.get(s) or _terms(s)
+            self._snippets.move_to_end(s)
+        while len(self._snippets) > self.max_snippets:
+            self._snippets.popitem(last=False)
+
+    def _idf(self, term: str) -> float:
+        df = sum(1 for t in self._snippets.values() if term in t)
+        return math.log(1 + (len(self._snippets) + 1) / (df + 1))
+
+    def match(self, question: str, top_k: int = LOCAL_TOP_K) -> Tuple[float, List[str]]:
+        """
+        (coverage in [0, 1], best-matching snippets high-to-low) for the question. Coverage is
+        the best single snippet's share of the question's idf-weighted terms, so terms
+        scattered over unrelated snippets do not add up to a local answer; it is capped below
+        COVERAGE_THRESHOLD unless MIN_LOCAL_HITS snippets each cover MIN_SNIPPET_COVERAGE.
+        """
+        q_terms = _terms(question)
+        if not q_terms or not self._snippets:
+            return 0.0, []
+        idf: Dict[str, float] = {t: self._idf(t) for t in q_terms}
+        total = sum(idf.values())
+        scored = []
+        for snippet, terms in self._snippets.items():
+            score = sum(w for t, w in idf.items() if t in terms) / total
+            if score > 0:
+                scored.append((score, snippet))
+        if not scored:
+            return 0.0, []
+        scored.sort(key=lambda x: x[0], reverse=True)
+        ranked = [s for _, s in scored[:top_k]]
+
+        coverage = scored[0][0]
+        hits = sum(1 for score, _ in scored if score >= MIN_SNIPPET_COVERAGE)
+        if hits < MIN_LOCAL_HITS:
+            coverage = min(coverage, COVERAGE_THRESHOLD - 1e-6)
+        for s in ranked:
+            self._snippets.move_to_end(s)  # recently useful snippets survive eviction
+        return coverage, ranked
+
+
+def get_session_context(user_query: str, working_set: SnippetWorkingSet) -> Tuple[str, List[str], str]:
+    """
+    get_grounded_context() for a chat session. Returns (context, citations, source) where
+    source is "session" (no retrieval call), "retrieval" or "merged".
+    Retrieved snippets are added to the working set for later follow-ups.
+    """
+    logger = get_logger("btai.rag.session")
+    coverage, local = working_set.match(user_query)
+    logger.info(f"session snippets | size={len(working_set)} | coverage={coverage:.2f} | hits={len(local)}")
+
+    if SESSION_RETRIEVAL_MODE != "merge" and coverage >= COVERAGE_THRESHOLD:
+        context, citations = build_context(local)
+        return context, citations, "session"
+
+    try:
+        retrieved = get_grounded_snippets(user_query)
+    except Exception as e:
+        logger.warning(f"session retrieval failed ({e}); falling back")
+        if local:
+            context, citations = build_context(local)
+            return context, citations, "session"
+        context, citations = fallback_context(user_query, e)
+        return context, citations, "retrieval"
+
+    if not retrieved and not local:
+        return "No relevant documents found.", [], "retrieval"
+
+    working_set.add(retrieved)
+    if SESSION_RETRIEVAL_MODE == "merge" and local:
+        seen = set(retrieved)
+        merged = retrieved + [s for s in local if s not in seen]
+        context, citations = build_context(merged, user_query)
+        return context, citations, "merged"
+
+    context, citations = build_context(retrieved or local, user_query)
+    return context, citations, "retrieval"
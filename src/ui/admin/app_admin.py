@@ -1,5 +1,6 @@
 # Project: braintransplant-ai — File: src/ui/admin/app_admin.py
 import os
+import re
 import shutil
 import time
 import uuid
@@ -9,6 +10,10 @@ import streamlit as st
 from google.cloud import storage
 import vertexai
 from vertexai.preview import rag
+from db.precomputed import bump_corpus_generation
+from db.rag_chunks import chunk_counts, clear_chunks, load_document_chunks, save_document_chunks
+from rag.chunking import chunk_documents
+from rag.precompute import start_rebuild
 from utils.logger import get_logger
 
 # ========== Explicit configuration ==========
@@ -23,6 +28,11 @@ GCS_PREFIX = "imports"
 
 ALLOWED_EXTS = {".pdf", ".docx", ".txt", ".pptx", ".ppt", ".xlsx", ".csv"}
 
+# Local chunking (rag/chunking.py): one GCS text file + one RAG file per chunk.
+GCS_CHUNK_PREFIX = "chunks"
+IMPORT_CHUNK_TOKENS = 2048   # above MAX_CHUNK_TOKENS_WITH_OVERLAP (estimated), so Vertex keeps each chunk file whole
+IMPORT_BATCH_URIS = 25       # URIs per import_files call
+
 
 # ========== Vertex + GCS ==========
 def _init_vertex(logger) -> None:
@@ -72,56 +82,61 @@ def _staging_files(logger) -> list[str]:
 
 
 # ========== RAG ops ==========
-def _import_single_gcs_uri(logger, gs_uri: str) -> None:
+def _import_gcs_uris(logger, uris: list[str], chunk_size: int = 1024, chunk_overlap: int = 200) -> None:
     """
-    Import a single GCS URI to RAG corpus.
+    Import GCS URIs to RAG corpus.
     On this SDK build, import_files returns a response directly (not an LRO).
     """
     _init_vertex(logger)
-    logger.info(f"RAG import_files start: uri={gs_uri}")
+    logger.info(f"RAG import_files start: uris={len(uris)} first={uris[0]} chunk_size={chunk_size}")
 
     resp = None
     last_err = None
 
     # Try known signatures by age; stop on first success.
     try:
-        resp = rag.import_files(RAG_CORPUS_NAME, [gs_uri], chunk_size=1024, chunk_overlap=200)
+        resp = rag.import_files(RAG_CORPUS_NAME, uris, chunk_size=chunk_size, chunk_overlap=chunk_overlap)
         logger.info("import_files variant=positional")
     except TypeError as e:
         last_err = e
 
     if resp is None:
         try:
-            resp = rag.import_files(corpus_name=RAG_CORPUS_NAME, uris=[gs_uri], chunk_size=1024, chunk_overlap=200)
+            resp = rag.import_files(corpus_name=RAG_CORPUS_NAME, uris=uris, chunk_size=chunk_size, chunk_overlap=chunk_overlap)
             logger.info("import_files variant=corpus_name+uris")
         except TypeError as e:
             last_err = e
 
     if resp is None:
         try:
-            resp = rag.import_files(corpus_name=RAG_CORPUS_NAME, gcs_uris=[gs_uri], chunk_size=1024, chunk_overlap=200)
+            resp = rag.import_files(corpus_name=RAG_CORPUS_NAME, gcs_uris=uris, chunk_size=chunk_size, chunk_overlap=chunk_overlap)
             logger.info("import_files variant=corpus_name+gcs_uris")
         except TypeError as e:
             last_err = e
 
     if resp is None:
         try:
-            resp = rag.import_files(rag_corpus=RAG_CORPUS_NAME, gcs_source_uris=[gs_uri], chunk_size=1024, chunk_overlap=200)
+            resp = rag.import_files(rag_corpus=RAG_CORPUS_NAME, gcs_source_uris=uris, chunk_size=chunk_size, chunk_overlap=chunk_overlap)
             logger.info("import_files variant=rag_corpus+gcs_source_uris")
         except TypeError as e:
             last_err = e
 
     if resp is None:
         try:
-            resp = rag.import_files(parent=RAG_CORPUS_NAME, gcs_source_uris=[gs_uri], chunk_size=1024, chunk_overlap=200)
+            resp = rag.import_files(parent=RAG_CORPUS_NAME, gcs_source_uris=uris, chunk_size=chunk_size, chunk_overlap=chunk_overlap)
             logger.info("import_files variant=parent+gcs_source_uris")
         except TypeError as e:
             last_err = e
 
     if resp is None:
-        raise TypeError(f"All import_files signatures failed for {gs_uri}. Last error: {last_err}")
+        raise TypeError(f"All import_files signatures failed for {uris[0]}. Last error: {last_err}")
 
-    logger.info(f"RAG import_files completed: uri={gs_uri}, response={resp}")
+    logger.info(f"RAG import_files completed: uris={len(uris)}, response={resp}")
+
+
+def _import_single_gcs_uri(logger, gs_uri: str) -> None:
+    """Import one whole file; Vertex does the chunking."""
+    _import_gcs_uris(logger, [gs_uri])
 
 
 def _list_rag_files(logger):
@@ -154,29 +169,146 @@ def _delete_all_rag_files(logger) -> int:
     return deleted
 
 
+# ========== Local chunking (incremental) ==========
+def _doc_key(document: str) -> str:
+    return re.sub(r"[^A-Za-z0-9._-]+", "_", document)
+
+
+def _chunk_blob_name(document: str, chunk_id: str) -> str:
+    # The file name becomes the RAG file's display name: unique per (document, chunk).
+    return f"{GCS_CHUNK_PREFIX}/{_doc_key(document)}/{_doc_key(document)}--{chunk_id}.txt"
+
+
+def _plan_staging(logger) -> list[dict]:
+    """
+    Extract + chunk every staging file in a process pool and diff each locally chunked
+    document against the chunks already in the corpus (added / removed chunk ids).
+    """
+    files = _staging_files(logger)
+    t0 = time.perf_counter()
+    plans = chunk_documents([os.path.join(STAGING_DIR, f) for f in files])
+    for plan in plans:
+        plan["existing"], plan["added"], plan["removed"] = {}, [], []
+        if plan["method"] != "local":
+            continue
+        current = list(dict.fromkeys(cid for cid, _ in plan["chunks"]))
+        plan["existing"] = load_document_chunks(plan["document"])
+        plan["added"] = [cid for cid in current if cid not in plan["existing"]]
+        plan["removed"] = [cid for cid in plan["existing"] if cid not in set(current)]
+    logger.info(f"chunk plan: docs={len(plans)} dt={(time.perf_counter() - t0):.2f}s")
+    return plans
+
+
+def _plan_stats(plans: list[dict]) -> list[dict]:
+    rows = []
+    for p in plans:
+        sizes = [len(text) for _, text in p["chunks"]]
+        distinct = len({cid for cid, _ in p["chunks"]})
+        rows.append({
+            "document": p["document"],
+            "chunking": p["method"],
+            "units": p["units"],
+            "chars": p["chars"],
+            "chunks": len(sizes),
+            "avg_chunk_chars": round(sum(sizes) / len(sizes)) if sizes else 0,
+            "max_chunk_chars": max(sizes, default=0),
+            "added": len(p["added"]),
+            "removed": len(p["removed"]),
+            "unchanged": distinct - len(p["added"]),
+            "extract_s": p["seconds"],
+            "note": p["error"] or "",
+        })
+    return rows
+
+
+def _delete_chunk_files(logger, bucket, uris: list[str], rag_files: dict[str, str]) -> None:
+    """Delete the RAG files and GCS objects behind the given chunk (or whole-file) URIs."""
+    for uri in uris:
+        display_name = os.path.basename(uri)
+        if display_name in rag_files:
+            _delete_rag_file(logger, rag_files[display_name])
+        try:
+            bucket.blob(uri[len(f"gs://{GCS_BUCKET}/"):]).delete()
+        except Exception as e:
+            logger.warning(f"GCS delete failed for {uri} (continuing): {e}")
+
+
+def _apply_chunk_plan(logger, bucket, plan: dict, rag_files: dict[str, str]) -> None:
+    """
+    Upload + import the added chunks, then delete the removed ones (RAG file and GCS object).
+    rag_chunks rows are saved after every import batch, so a failure mid-way never leaves
+    imported chunks unrecorded (they would be imported again as duplicates next run).
+    """
+    document = plan["document"]
+    rows: dict[str, tuple] = {}
+    for idx, (cid, text) in enumerate(plan["chunks"]):
+        if cid not in rows:
+            uri = plan["existing"].get(cid) or f"gs://{GCS_BUCKET}/{_chunk_blob_name(document, cid)}"
+            rows[cid] = (cid, idx, len(text), uri)
+    texts = dict(plan["chunks"])
+
+    for i in range(0, len(plan["added"]), IMPORT_BATCH_URIS):
+        batch = plan["added"][i:i + IMPORT_BATCH_URIS]
+        for cid in batch:
+            bucket.blob(_chunk_blob_name(document, cid)).upload_from_string(
+                texts[cid], content_type="text/plain; charset=utf-8"
+            )
+        _import_gcs_uris(logger, [rows[cid][3] for cid in batch], chunk_size=IMPORT_CHUNK_TOKENS, chunk_overlap=0)
+        save_document_chunks(document, [rows[cid] for cid in batch], [])
+
+    stale = [plan["existing"][cid] for cid in plan["removed"]]
+    if document in rag_files:
+        stale.append(_gcs_uri(document))  # whole-file import from before local chunking
+    _delete_chunk_files(logger, bucket, stale, rag_files)
+
+    save_document_chunks(document, list(rows.values()), plan["removed"])
+    logger.info(
+        f"chunks applied: {document} chunks={len(rows)} added={len(plan['added'])} removed={len(stale)}"
+    )
+
+
+def _drop_document_chunks(logger, bucket, document: str, rag_files: dict[str, str]) -> None:
+    """Remove a previously chunked document's chunks before it is imported as a whole file."""
+    existing = load_document_chunks(document)
+    if not existing:
+        return
+    _delete_chunk_files(logger, bucket, list(existing.values()), rag_files)
+    save_document_chunks(document, [], list(existing))
+    logger.info(f"chunks dropped before whole-file import: {document} chunks={len(existing)}")
+
+
 # ========== Upload pipeline ==========
 def _upload_all_from_staging(logger) -> tuple[int, int]:
     os.makedirs(STAGING_DIR, exist_ok=True)
     os.makedirs(INGESTED_DIR, exist_ok=True)
 
-    files = _staging_files(logger)
-    if not files:
+    plans = _plan_staging(logger)
+    if not plans:
         return 0, 0
 
     bucket = _ensure_gcs_bucket(logger)
+    rag_files = {getattr(f, "display_name", None) or f.name: f.name for f in _list_rag_files(logger)}
     ok, bad = 0, 0
 
-    for fname in files:
+    for plan in plans:
+        fname = plan["document"]
         src = os.path.join(STAGING_DIR, fname)
         try:
-            # 1) Upload to GCS
-            blob_name = f"{GCS_PREFIX}/{fname}"
-            logger.info(f"GCS upload: {src} -> gs://{GCS_BUCKET}/{blob_name}")
-            bucket.blob(blob_name).upload_from_filename(src)
-            gs_uri = _gcs_uri(fname)
-
-            # 2) Import to RAG
-            _import_single_gcs_uri(logger, gs_uri)
+            if plan["method"] == "local":
+                # 1+2) Changed chunks only: upload to GCS, import to RAG, drop stale chunks
+                _apply_chunk_plan(logger, bucket, plan, rag_files)
+            else:
+                # 0) A document chunked locally before is replaced, not duplicated
+                _drop_document_chunks(logger, bucket, fname, rag_files)
+
+                # 1) Upload to GCS
+                blob_name = f"{GCS_PREFIX}/{fname}"
+                logger.info(f"GCS upload: {src} -> gs://{GCS_BUCKET}/{blob_name}")
+                bucket.blob(blob_name).upload_from_filename(src)
+                gs_uri = _gcs_uri(fname)
+
+                # 2) Import to RAG (Vertex-side chunking)
+                _import_single_gcs_uri(logger, gs_uri)
 
             # 3) Move to ingested locally
             dst = os.path.join(INGESTED_DIR, fname)
@@ -190,10 +322,17 @@ def _upload_all_from_staging(logger) -> tuple[int, int]:
             logger.error(f"Upload/import failed for {fname}: {e}\n{traceback.format_exc()}")
             bad += 1
 
-    logger.info(f"upload summary: ok={ok}, bad={bad}, total={len(files)}")
+    logger.info(f"upload summary: ok={ok}, bad={bad}, total={len(plans)}")
     return ok, bad
 
 
+def _corpus_changed(logger) -> None:
+    """New corpus generation: precomputed answers stop being served and are rebuilt in the background."""
+    generation = bump_corpus_generation()
+    logger.info(f"corpus changed | generation={generation} | precompute rebuild started")
+    start_rebuild()
+
+
 # ========== Admin UI ==========
 def render_admin() -> None:
     logger = get_logger("btai.admin")
@@ -205,7 +344,11 @@ def render_admin() -> None:
     # Current RAG files
     st.subheader("Current RAG Files")
     files = _list_rag_files(logger)
-    st.write(f"Files in corpus: {len(files)}")
+    counts = chunk_counts()
+    st.write(f"Files in corpus: {len(files)}  (locally chunked: {len(counts)} documents, {sum(counts.values())} chunks)")
+    if counts:
+        with st.expander("Show chunk counts"):
+            st.dataframe([{"document": d, "chunks": n} for d, n in counts.items()], use_container_width=True)
     if files:
         with st.expander("Show files"):
             for f in files:
@@ -218,6 +361,9 @@ def render_admin() -> None:
         with st.expander("Show staging files"):
             for n in staging:
                 st.write(f"- {n}")
+        if st.button("🔍 Analyse staging (extract + chunk)", use_container_width=True):
+            with st.spinner("Extracting and chunking…"):
+                st.dataframe(_plan_stats(_plan_staging(logger)), use_container_width=True)
 
     # Actions
     col1, col2 = st.columns(2)
@@ -225,6 +371,8 @@ def render_admin() -> None:
         if st.button("📤 Upload ALL from staging → RAG", type="primary", use_container_width=True):
             with st.spinner("Uploading…"):
                 ok, bad = _upload_all_from_staging(logger)
+                if ok:
+                    _corpus_changed(logger)
                 st.success(f"Imported {ok}, Failed {bad}")
                 st.rerun()
 
@@ -232,5 +380,8 @@ def render_admin() -> None:
         if st.button("🗑️ Remove ALL files from RAG", type="secondary", use_container_width=True):
             with st.spinner("Deleting…"):
                 n = _delete_all_rag_files(logger)
+                clear_chunks()
+                if n:
+                    _corpus_changed(logger)
                 st.success(f"Deleted {n} files")
                 st.rerun()
@@ -2,13 +2,21 @@
 import os
 import streamlit as st
 
-# Route: Admin by token => Admin UI; else Chat
-from ui.admin.app_admin import render_admin
-from ui.web.view_chat import view_chat
+from utils.warmup import start_warmup
+
+# Route: Admin by token => Admin UI; else Chat.
+# Both views are imported inside main(): chat visitors never load the admin-only
+# dependencies (google.cloud.storage, the RAG import APIs).
 
 ADMIN_QUERY_KEY = "admin"  # routing only
 
 
+@st.cache_resource(show_spinner=False)
+def _warmup_once() -> bool:
+    """Once per process: pre-warm Vertex, the DB pool and HTTP sessions off the request path."""
+    return start_warmup() is not None
+
+
 def main() -> None:
     """
     Entry point for the BrainTransplant web app.
@@ -16,6 +24,7 @@ def main() -> None:
     - If ?admin=<ADMIN_TOKEN>, renders admin UI.
     - Else, renders chat UI.
     """
+    _warmup_once()
     qp = getattr(st, "query_params", None)
 
 
@@ -27,8 +36,12 @@ def main() -> None:
         admin_param = qp.get(ADMIN_QUERY_KEY, None)
 
     if admin_param and admin_param == os.getenv("ADMIN_TOKEN"):
+        from ui.admin.app_admin import render_admin
+
         render_admin()
     else:
+        from ui.web.view_chat import view_chat
+
         view_chat()
 
 
@@ -1,4 +1,6 @@
 # Project: logs-ai-reporting-model-train — File: src/ui/chat_skin.py
+import html
+import functools
 import streamlit as st
 
 def inject_chat_css():
@@ -20,8 +22,12 @@ def inject_chat_css():
         unsafe_allow_html=True,
     )
 
+@functools.lru_cache(maxsize=1024)
+def user_bubble_html(text: str) -> str:
+    return f"<div class='user-row'><div class='user-bubble'>{html.escape(text)}</div></div>"
+
 def user_bubble(text: str):
     st.markdown(
-        f"<div class='user-row'><div class='user-bubble'>{text}</div></div>",
+        user_bubble_html(text),
         unsafe_allow_html=True,
     )
\ No newline at end of file
@@ -1,10 +1,16 @@
 # Project: braintransplant-ai — File: src/ui/web/examples_basecamp.py
+# Curated example questions: advertised in the intro and answered ahead of time by
+# rag/precompute.py (served from precomputed_answers while the corpus is unchanged).
+EXAMPLE_QUESTIONS = [
+    "Tell me what Basecamp 2.0 is all about.",
+    "How does Basecamp 2.0 architecture integrate different reporting and data access solutions?",
+    "How to fill the materials table?",
+]
+
 EXAMPLES_MD = (
     "Hello! I'm Sabrina, your Basecamp 2.0 AI Assistant.\n\n"
     "Basecamp 2.0 is Roche's Product Lifecycle Management (PLM) system, designed to manage manufacturing process specifications across the network, "
     "including steps, activities, parameters, and materials. I can provide insights and explanations on its core functions.\n\n"
     "**You can ask such questions as:**\n"
-    "- Tell me what Basecamp 2.0 is all about.\n"
-    "- How does Basecamp 2.0 architecture integrate different reporting and data access solutions?\n"
-    "- How to fill the materials table?\n"
+    + "".join(f"- {q}\n" for q in EXAMPLE_QUESTIONS)
 )
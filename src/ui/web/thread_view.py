@@ -0,0 +1,80 @@
+# Project: braintransplant-ai — File: src/ui/web/thread_view.py
+import os
+import time
+from typing import Dict, List, Tuple
+
+import streamlit as st
+
+from ui.web.chat_skin import user_bubble
+from utils.logger import get_logger
+
+# ---- Explicit constants ----
+# "incremental": newest turns rendered individually, older ones collapsed and paged;
+# "full": legacy loop over every turn (kept for render-time comparisons).
+RENDER_MODE = os.getenv("CHAT_RENDER_MODE", "incremental").strip().lower()
+RECENT_TURNS_EXPANDED = 6   # newest turns rendered in full on every rerun
+OLDER_PAGE_SIZE = 10        # collapsed older turns revealed per "Show more" click
+OLDER_SHOWN_KEY = "thread_older_shown"  # (thread_id, shown): the count resets for another thread
+
+# st.fragment (1.37+) reruns only the decorated function on widget interaction.
+_fragment = getattr(st, "fragment", None) or getattr(st, "experimental_fragment", None) or (lambda f: f)
+
+Turn = Tuple[str, str]  # (user, assistant)
+
+
+def _render_turn(turn: Dict[str, str]) -> None:
+    user_bubble(turn["user"])
+    st.markdown(turn["assistant"])  # model output: plain markdown, never raw HTML
+
+
+def _shown(thread_id: str) -> int:
+    owner, shown = st.session_state.get(OLDER_SHOWN_KEY, (None, 0))
+    return shown if owner == thread_id else 0
+
+
+def _show_more(thread_id: str) -> None:
+    st.session_state[OLDER_SHOWN_KEY] = (thread_id, _shown(thread_id) + OLDER_PAGE_SIZE)
+
+
+@_fragment
+def _older_turns(older: Tuple[Turn, ...], thread_id: str) -> None:
+    """
+    Collapsed block of older turns. Only the newest `shown` of them are materialised;
+    "Show more" reruns just this fragment, not the whole chat page.
+    """
+    shown = min(_shown(thread_id), len(older))
+    with st.expander(f"Earlier messages ({len(older)})", expanded=shown > 0):
+        if shown < len(older):
+            st.button(
+                f"Show {min(OLDER_PAGE_SIZE, len(older) - shown)} more",
+                key="thread_show_more", on_click=_show_more, args=(thread_id,),
+            )
+        for i, (user, assistant) in enumerate(older[len(older) - shown:]):
+            if i:
+                st.divider()
+            _render_turn({"user": user, "assistant": assistant})
+
+
+def render_thread(history: List[Dict[str, str]], thread_id: str) -> None:
+    """
+    Render the prior conversation and log per-rerun render time against thread length
+    ("render | mode=… | turns=… | expanded=… | dt_ms=…") for comparing modes.
+    thread_id (the chat session) scopes the "Show more" state.
+    """
+    logger = get_logger("btai.ui.thread")
+    t0 = time.perf_counter()
+
+    if RENDER_MODE == "full":
+        for turn in history:
+            _render_turn(turn)
+        expanded = len(history)
+    else:
+        split = max(0, len(history) - RECENT_TURNS_EXPANDED)
+        if split:
+            _older_turns(tuple((t["user"], t["assistant"]) for t in history[:split]), thread_id)
+        for turn in history[split:]:
+            _render_turn(turn)
+        expanded = len(history) - split
+
+    dt_ms = (time.perf_counter() - t0) * 1000
+    logger.info(f"render | mode={RENDER_MODE} | turns={len(history)} | expanded={expanded} | dt_ms={dt_ms:.1f}")
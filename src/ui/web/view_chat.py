@@ -3,16 +3,136 @@ import os
 import uuid
 import time
 import traceback
+from typing import Optional
 import streamlit as st
 from dotenv import load_dotenv
 from llm.adapter import call_llm
+from llm.fanout import FANOUT_POLICY, fan_out
+from llm.prompts import CHAT_SYSTEM_PROMPT, chat_prompt, sources_block
 from ui.web.chat_skin import inject_chat_css, user_bubble
-from db.history import save_chat_turn
-from rag.vertex_client import get_grounded_context
+from ui.web.thread_view import render_thread
+from db.history import save_chat_turn, find_cached_answer, load_session_turns
+from db.precomputed import load_precomputed_answer
+from memory.conversation import build_history_block, collect_memory, load_memory, new_memory, schedule_memory_update
+from rag.working_set import SnippetWorkingSet, get_session_context
+from utils.circuit_breaker import CircuitOpenError
 from utils.logger import get_logger
 
 load_dotenv()
 
+SESSION_QUERY_KEY = "sid"  # ?sid=<session_id> keeps the thread across refreshes/replicas
+RESUME_TURNS = 20          # newest turns loaded on resume
+OLDER_PAGE_TURNS = 20      # turns per "Load older messages" click
+# Request header carrying the signed-in user's id, set by the authenticating proxy in front of
+# the app (IAP, oauth2-proxy). Never taken from the URL. Unset/absent: anonymous sessions.
+USER_ID_HEADER = os.getenv("USER_ID_HEADER", "X-Forwarded-Email")
+
+
+def _query_param(key: str):
+    qp = getattr(st, "query_params", None)
+    if qp is None:
+        params = st.experimental_get_query_params()
+        return (params.get(key, [None]) or [None])[0]
+    return qp.get(key, None)
+
+
+def _set_query_param(key: str, value: str) -> None:
+    qp = getattr(st, "query_params", None)
+    if qp is None:
+        params = st.experimental_get_query_params()
+        params[key] = value
+        st.experimental_set_query_params(**params)
+    else:
+        qp[key] = value
+
+
+def _current_user_id() -> Optional[str]:
+    headers = getattr(getattr(st, "context", None), "headers", None)
+    value = headers.get(USER_ID_HEADER) if headers else None
+    if not value:
+        return None
+    return value.split(":", 1)[-1].strip() or None  # IAP prefixes "accounts.google.com:"
+
+
+def _init_session(logger) -> None:
+    """
+    Start a new session, or resume the one named by ?sid= from chat_history: the newest
+    RESUME_TURNS turns in one indexed query, older ones on demand (see _load_older_turns).
+    Only the current user's turns are loaded; a ?sid= with none of them (unknown, empty or
+    someone else's session) starts a new session instead.
+    """
+    if "session_id" in st.session_state:
+        return
+    user_id = _current_user_id()
+    st.session_state["user_id"] = user_id
+    st.session_state["history"] = []
+    st.session_state["history_offset"] = 0  # session turns before history[0]
+    st.session_state["older_cursor"] = None
+    st.session_state["working_set"] = SnippetWorkingSet()  # snippets reused by follow-ups
+
+    t0 = time.perf_counter()
+    sess = _query_param(SESSION_QUERY_KEY)
+    turns, cursor = load_session_turns(sess, RESUME_TURNS, user_id=user_id) if sess else ([], None)
+    if not turns:
+        if sess:
+            logger.info(f"Session not resumable for this user; starting a new one | sid={sess}")
+        sess = str(uuid.uuid4())
+        _set_query_param(SESSION_QUERY_KEY, sess)
+        st.session_state["session_id"] = sess
+        st.session_state["memory"] = new_memory()
+        return
+
+    st.session_state["session_id"] = sess
+    st.session_state["memory"] = load_memory(sess)
+    st.session_state["history"] = [{"user": t["user"], "assistant": t["assistant"]} for t in turns]
+    st.session_state["older_cursor"] = cursor
+    if cursor is not None:
+        total = st.session_state["memory"].get("total_turns", 0)
+        st.session_state["history_offset"] = max(0, total - len(turns))
+    logger.info(f"Session resumed | session={sess} | turns={len(turns)} | more={cursor is not None} | dt={(time.perf_counter() - t0):.2f}s")
+
+
+def _load_older_turns(logger) -> None:
+    sess = st.session_state["session_id"]
+    turns, cursor = load_session_turns(
+        sess, OLDER_PAGE_TURNS, before=st.session_state["older_cursor"], user_id=st.session_state["user_id"]
+    )
+    st.session_state["history"] = [{"user": t["user"], "assistant": t["assistant"]} for t in turns] + st.session_state["history"]
+    st.session_state["history_offset"] = max(0, st.session_state["history_offset"] - len(turns))
+    st.session_state["older_cursor"] = cursor
+    logger.info(f"Older turns loaded | session={sess} | turns={len(turns)} | more={cursor is not None}")
+
+
+def _serve_precomputed(logger, sess: str, user_q: str, t0: float) -> bool:
+    """
+    Answer a curated example question from precomputed_answers (built for the current
+    corpus generation by rag/precompute.py). Returns False when there is no such answer.
+    """
+    pre = load_precomputed_answer(user_q)
+    if pre is None:
+        return False
+    st.markdown(pre["answer"])
+    st.markdown(f"**Response generated in {(time.perf_counter() - t0):.2f} seconds.**")
+    logger.info(f"Precomputed answer served | generation={pre['corpus_generation']} | built_at={pre['built_at']}")
+
+    st.session_state["history"].append({"user": user_q, "assistant": pre["answer"]})
+    try:
+        save_chat_turn(
+            session_id=sess,
+            user_id=st.session_state["user_id"],
+            user_query=user_q,
+            retrieved_context=pre["retrieved_context"],
+            model_response=pre["answer"],
+        )
+    except Exception as e:
+        logger.error(f"DB save error | {e}\n{traceback.format_exc()}")
+    st.session_state["memory"] = collect_memory(sess, st.session_state["memory"])
+    schedule_memory_update(
+        sess, st.session_state["history"], st.session_state["memory"], st.session_state["history_offset"]
+    )
+    return True
+
+
 def view_chat() -> None:
     """
     Render chat UI with verbose response and response time display; logs to /app/outputs/logs/braintransplant.log.
@@ -57,16 +177,14 @@ def view_chat() -> None:
             logger.error(f"Dynamic intro failed: {e}")
             st.markdown("Hello! I'm Sabrina, your Basecamp 2.0 AI Assistant. Ask me about manufacturing specs or processes.")
 
-    # --- Session State Initialization ---
-    if "history" not in st.session_state:
-        st.session_state["history"] = []
-    if "session_id" not in st.session_state:
-        st.session_state["session_id"] = str(uuid.uuid4())
+    # --- Session State Initialization (new or resumed via ?sid=) ---
+    _init_session(logger)
 
     # --- Render Prior Conversation ---
-    for turn in st.session_state["history"]:
-        user_bubble(turn["user"])
-        st.markdown(turn["assistant"])
+    if st.session_state["older_cursor"] is not None:
+        if st.button("Load older messages"):
+            _load_older_turns(logger)
+    render_thread(st.session_state["history"], st.session_state["session_id"])
 
     # --- Handle New User Input ---
     user_q = st.chat_input("Ask a question...")
@@ -78,36 +196,66 @@ def view_chat() -> None:
     logger.info(f"Q start | session={sess} | len={len(user_q)} | text={user_q[:200]}")
     user_bubble(user_q)
 
+    # 0) PRECOMPUTED: curated example questions are answered ahead of time
+    if _serve_precomputed(logger, sess, user_q, t0):
+        logger.info(f"Q end | session={sess} | total_dt={(time.perf_counter()-t0):.2f}s")
+        return
+
     with st.spinner("Searching documents and thinking..."):
-        # 1) RETRIEVE: Vertex RAG
+        # 1) RETRIEVE: session snippets first, Vertex RAG when they don't cover the question
         try:
             t_rag0 = time.perf_counter()
-            context_for_llm, citations = get_grounded_context(user_q)
+            context_for_llm, citations, ctx_source = get_session_context(user_q, st.session_state["working_set"])
             t_rag = time.perf_counter() - t_rag0
-            logger.info(f"RAG ok | ctx_chars={len(context_for_llm)} | cites={len(citations)} | dt={t_rag:.2f}s")
+            logger.info(f"RAG ok | source={ctx_source} | ctx_chars={len(context_for_llm)} | cites={len(citations)} | dt={t_rag:.2f}s")
         except Exception as e:
             logger.error(f"RAG error | {e}\n{traceback.format_exc()}")
             st.error(f"Error retrieving documents: {e}")
             return
 
         # 2) AUGMENT & GENERATE: LLM call with verbose mode
-        system_prompt = (
-            "You are a helpful assistant named 'BC2 AI Assistant'. Based ONLY on the provided context snippets, "
-            "answer the user's question in sufficient detail so that user probably wouldn't even go to the source file, including breakdowns and explanations where needed and relevant. "
-            "Be comprehensive enough so users have enough information without needing to open sources—provide tables or lists if data allows. "
-            "If the context does not contain the answer, state that you do not have enough information from the provided documents."
+        system_prompt = CHAT_SYSTEM_PROMPT
+        st.session_state["memory"] = collect_memory(sess, st.session_state["memory"])
+        history_block = build_history_block(
+            st.session_state["history"], st.session_state["memory"], st.session_state["history_offset"]
         )
-        prompt = f"CONTEXT:\n{context_for_llm}\n\nUSER QUESTION:\n{user_q}"
+        prompt = chat_prompt(context_for_llm, user_q, history_block)
 
         try:
             t_llm0 = time.perf_counter()
-            final_answer = call_llm(system_prompt, prompt, timeout_s=60)  # Removed stream=True
+            if FANOUT_POLICY == "off":
+                final_answer = call_llm(system_prompt, prompt, timeout_s=60, session_id=sess, question=user_q)  # Removed stream=True
+            else:
+                fanned = fan_out(system_prompt, prompt, session_id=sess, question=user_q)
+                final_answer = fanned["text"]
+                logger.info(f"LLM fan-out | policy={fanned['policy']} | models={[a['model'] for a in fanned['answers']]}")
             t_llm = time.perf_counter() - t_llm0
             # Simulate partial progress (fallback for no streaming)
             st.write("Generating response... Initializing analysis.")
             time.sleep(1)  # Simulate first chunk delay (~1s for user feedback)
             st.write(final_answer)  # Full response
             logger.info(f"LLM ok | ans_chars={len(final_answer)} | dt={t_llm:.2f}s")
+        except CircuitOpenError as e:
+            # Degraded mode: fail fast and serve a previously stored answer if we have one
+            logger.warning(f"LLM unavailable | {e}")
+            cached = find_cached_answer(user_q, sess, st.session_state["user_id"])
+            if cached is None:
+                st.error("The language model is temporarily unavailable. Please try again in a minute.")
+                return
+            st.info("The language model is temporarily unavailable; showing a previously generated answer.")
+            st.markdown(cached)
+            st.session_state["history"].append({"user": user_q, "assistant": cached})
+            try:
+                save_chat_turn(
+                    session_id=sess,
+                    user_id=st.session_state["user_id"],
+                    user_query=user_q,
+                    retrieved_context=context_for_llm,
+                    model_response=cached,
+                )
+            except Exception as e:
+                logger.error(f"DB save error | {e}\n{traceback.format_exc()}")
+            return
         except Exception as e:
             logger.error(f"LLM error | {e}\n{traceback.format_exc()}")
             st.error(f"Error communicating with the language model: {e}")
@@ -115,10 +263,8 @@ def view_chat() -> None:
 
         # 3) DISPLAY: Finalize with sources (if not streamed) and response time
         total_time = time.perf_counter() - t0
-        final_answer_with_sources = final_answer
-        if citations and not any(c in final_answer for c in citations):  # Add sources if LLM didn't
-            sources_md = "\n\n**Sources:**\n" + "\n".join(f"- {c}" for c in sorted(citations))
-            final_answer_with_sources += sources_md
+        final_answer_with_sources, sources_md = sources_block(final_answer, citations)  # Add sources if LLM didn't
+        if sources_md:
             st.markdown(sources_md)
 
         # Display response time
@@ -129,6 +275,7 @@ def view_chat() -> None:
         try:
             save_chat_turn(
                 session_id=sess,
+                user_id=st.session_state["user_id"],
                 user_query=user_q,
                 retrieved_context=context_for_llm,
                 model_response=final_answer_with_sources
@@ -137,6 +284,12 @@ def view_chat() -> None:
         except Exception as e:
             logger.error(f"DB save error | {e}\n{traceback.format_exc()}")
 
+        # 5) MEMORY: fold turns leaving the verbatim window into the rolling summary (in the
+        #    background; picked up by collect_memory() on a later turn)
+        schedule_memory_update(
+            sess, st.session_state["history"], st.session_state["memory"], st.session_state["history_offset"]
+        )
+
     logger.info(f"Q end | session={sess} | total_dt={(time.perf_counter()-t0):.2f}s")
 
 if __name__ == "__main__":
@@ -0,0 +1,172 @@
+# Project: braintransplant-ai — File: src/utils/circuit_breaker.py
+import time
+import threading
+from collections import deque
+from contextlib import contextmanager
+from typing import Deque, Dict, Iterator, Tuple
+
+from utils.logger import get_logger
+
+# ---- Breaker states ----
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+# Internal registry state
+_lock = threading.Lock()
+_breakers: Dict[str, "CircuitBreaker"] = {}
+
+
+class CircuitOpenError(RuntimeError):
+    """Raised instead of calling a backend whose breaker is open (fail fast)."""
+
+
+class CircuitBreaker:
+    """
+    Per-backend circuit breaker over a rolling time window of (ok, latency) outcomes.
+
+    - CLOSED: calls pass; trips to OPEN when, with at least min_calls in the window, the
+      error rate or the slow-call rate (latency >= slow_call_s) reaches its threshold.
+    - OPEN: calls fail immediately with CircuitOpenError for open_s seconds.
+    - HALF_OPEN: up to half_open_probes calls pass; a success closes the breaker,
+      a failure re-opens it.
+    is_degraded() reports early trouble (half the trip thresholds) so callers can shed work.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        window_s: float = 60.0,
+        min_calls: int = 10,
+        error_rate: float = 0.5,
+        slow_call_s: float = 30.0,
+        slow_rate: float = 0.8,
+        open_s: float = 30.0,
+        half_open_probes: int = 1,
+    ) -> None:
+        self.name = name
+        self.window_s = window_s
+        self.min_calls = min_calls
+        self.error_rate = error_rate
+        self.slow_call_s = slow_call_s
+        self.slow_rate = slow_rate
+        self.open_s = open_s
+        self.half_open_probes = half_open_probes
+
+        self._lock = threading.Lock()
+        self._outcomes: Deque[Tuple[float, bool, float]] = deque()  # (ts, ok, latency_s)
+        self._state = CLOSED
+        self._opened_at = 0.0
+        self._probes_in_flight = 0
+        self._logger = get_logger("btai.breaker")
+
+    # ----- state -----
+    def _prune(self, now: float) -> None:
+        while self._outcomes and now - self._outcomes[0][0] > self.window_s:
+            self._outcomes.popleft()
+
+    def _rates(self) -> Tuple[int, float, float]:
+        n = len(self._outcomes)
+        if n == 0:
+            return 0, 0.0, 0.0
+        errors = sum(1 for _, ok, _ in self._outcomes if not ok)
+        slow = sum(1 for _, _, lat in self._outcomes if lat >= self.slow_call_s)
+        return n, errors / n, slow / n
+
+    def _transition(self, state: str) -> None:
+        if state != self._state:
+            self._logger.warning(f"breaker {self.name}: {self._state} -> {state}")
+        self._state = state
+        if state == OPEN:
+            self._opened_at = time.monotonic()
+        if state != HALF_OPEN:
+            self._probes_in_flight = 0
+        if state == CLOSED:
+            self._outcomes.clear()
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            if self._state == OPEN and time.monotonic() - self._opened_at >= self.open_s:
+                self._transition(HALF_OPEN)
+            return self._state
+
+    def is_degraded(self) -> bool:
+        if self.state != CLOSED:
+            return True
+        with self._lock:
+            self._prune(time.monotonic())
+            n, err, slow = self._rates()
+        return n >= self.min_calls and (err >= self.error_rate / 2 or slow >= self.slow_rate / 2)
+
+    # ----- call accounting -----
+    def before_call(self) -> None:
+        """Admit a call or raise CircuitOpenError."""
+        state = self.state
+        with self._lock:
+            if state == OPEN:
+                raise CircuitOpenError(f"{self.name} circuit is open; failing fast")
+            if state == HALF_OPEN:
+                if self._probes_in_flight >= self.half_open_probes:
+                    raise CircuitOpenError(f"{self.name} circuit is half-open; probe already in flight")
+                self._probes_in_flight += 1
+
+    def record(self, ok: bool, latency_s: float) -> None:
+        now = time.monotonic()
+        with self._lock:
+            if self._state == HALF_OPEN:
+                self._transition(CLOSED if ok and latency_s < self.slow_call_s else OPEN)
+                return
+            self._outcomes.append((now, ok, latency_s))
+            self._prune(now)
+            n, err, slow = self._rates()
+            if self._state == CLOSED and n >= self.min_calls and (err >= self.error_rate or slow >= self.slow_rate):
+                self._logger.warning(f"breaker {self.name} tripping | n={n} | err={err:.2f} | slow={slow:.2f}")
+                self._transition(OPEN)
+
+    def release(self) -> None:
+        """Forget an admitted call that ended without an outcome (e.g. cancelled)."""
+        with self._lock:
+            if self._state == HALF_OPEN and self._probes_in_flight > 0:
+                self._probes_in_flight -= 1
+
+    @contextmanager
+    def guard(self) -> Iterator[None]:
+        """
+        Wrap one backend call (sync or inside a coroutine). Exceptions count as failures;
+        cancellation (BaseException) is not counted against the backend.
+        """
+        self.before_call()
+        t0 = time.perf_counter()
+        try:
+            yield
+        except Exception:
+            self.record(False, time.perf_counter() - t0)
+            raise
+        except BaseException:
+            self.release()
+            raise
+        else:
+            self.record(True, time.perf_counter() - t0)
+
+    def snapshot(self) -> Dict[str, object]:
+        state = self.state
+        with self._lock:
+            self._prune(time.monotonic())
+            n, err, slow = self._rates()
+        return {"state": state, "calls": n, "error_rate": round(err, 3), "slow_rate": round(slow, 3)}
+
+
+def get_breaker(name: str, **settings) -> CircuitBreaker:
+    """Return the process-wide breaker for name; settings apply only on first creation."""
+    with _lock:
+        b = _breakers.get(name)
+        if b is None:
+            b = _breakers[name] = CircuitBreaker(name, **settings)
+        return b
+
+
+def breakers_snapshot() -> Dict[str, Dict[str, object]]:
+    with _lock:
+        items = list(_breakers.items())
+    return {k: b.snapshot() for k, b in sorted(items)}
@@ -0,0 +1,81 @@
+# Project: braintransplant-ai — File: src/utils/cold_start.py
+"""
+Cold-start measurement (python -m utils.cold_start [--warmup] [--top N]).
+Each measurement runs in a fresh interpreter so nothing is already imported:
+  - wall time to import each entry module (chat page, admin page, app router),
+  - the slowest modules by cumulative import time (python -X importtime) for the chat page,
+  - with --warmup, seconds per warm-up step (Vertex init, ADC token, DB pool, ...).
+"""
+import os
+import sys
+import json
+import argparse
+import subprocess
+from typing import Dict, List, Optional, Tuple
+
+# ---- Explicit constants ----
+ENTRY_MODULES = ["ui.web.app", "ui.web.view_chat", "ui.admin.app_admin"]
+IMPORTTIME_MODULE = "ui.web.view_chat"
+DEFAULT_TOP = 15
+
+
+def _python(args: List[str]) -> subprocess.CompletedProcess:
+    return subprocess.run([sys.executable, *args], capture_output=True, text=True, env=os.environ.copy())
+
+
+def _import_wall_time(module: str) -> Tuple[float, str]:
+    code = f"import time; t0 = time.perf_counter(); import {module}; print(time.perf_counter() - t0)"
+    proc = _python(["-c", code])
+    if proc.returncode != 0:
+        return -1.0, (proc.stderr.strip().splitlines() or ["failed"])[-1]
+    return float(proc.stdout.strip().splitlines()[-1]), ""
+
+
+def _slowest_imports(module: str, top: int) -> List[Tuple[float, str]]:
+    """(cumulative seconds, module) from -X importtime, slowest first."""
+    proc = _python(["-X", "importtime", "-c", f"import {module}"])
+    rows: List[Tuple[float, str]] = []
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = (part.strip() for part in line[len("import time:"):].split("|", 2))
+        rows.append((int(cumulative) / 1e6, name.strip()))
+    rows.sort(reverse=True)
+    return rows[:top]
+
+
+def _warmup_timings() -> Dict[str, Optional[float]]:
+    code = "import json; from utils.warmup import warm_up; print(json.dumps(warm_up()))"
+    proc = _python(["-c", code])
+    if proc.returncode != 0:
+        raise RuntimeError((proc.stderr.strip().splitlines() or ["warm-up failed"])[-1])
+    return json.loads(proc.stdout.strip().splitlines()[-1])
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Measure import time and cold-start cost of the web app.")
+    parser.add_argument("--warmup", action="store_true", help="also time each warm-up step (needs GCP + DB)")
+    parser.add_argument("--top", type=int, default=DEFAULT_TOP, help="slowest imports to list")
+    args = parser.parse_args(argv)
+
+    for module in ENTRY_MODULES:
+        seconds, error = _import_wall_time(module)
+        status = f"{seconds:.2f}s" if not error else f"failed ({error})"
+        print(f"[cold_start] import {module}: {status}")
+
+    print(f"[cold_start] slowest imports under {IMPORTTIME_MODULE} (cumulative):")
+    for seconds, name in _slowest_imports(IMPORTTIME_MODULE, args.top):
+        print(f"[cold_start]   {seconds:7.3f}s  {name}")
+
+    if args.warmup:
+        try:
+            for step, seconds in _warmup_timings().items():
+                print(f"[cold_start] warm-up {step}: {'failed' if seconds is None else f'{seconds:.2f}s'}")
+        except Exception as e:
+            print(f"[cold_start] warm-up failed: {e}")
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,23 @@
+# Project: braintransplant-ai — File: src/utils/tokens.py
+import re
+
+# ---- Explicit constants (no defaults) ----
+CHARS_PER_TOKEN = 4  # rough average for Gemini tokenisation of English/German prose
+
+# Characters that usually cost a whole token each: digits and anything non-ASCII (CJK, symbols)
+_DENSE_CHARS = re.compile(r"[0-9]|[^\x00-\x7f]")
+
+
+def estimate_tokens(*texts: str) -> int:
+    """Cheap, tokenizer-free token estimate for budgeting (not for billing)."""
+    chars = sum(len(t) for t in texts if t)
+    return (chars + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+
+def estimate_tokens_upper(text: str) -> int:
+    """
+    Pessimistic estimate for hard size limits: digits and non-ASCII characters count as one
+    token each, the remaining text at CHARS_PER_TOKEN. Never below estimate_tokens(text).
+    """
+    dense = len(_DENSE_CHARS.findall(text))
+    return dense + (len(text) - dense + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
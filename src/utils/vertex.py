@@ -0,0 +1,22 @@
+# Project: braintransplant-ai — File: src/utils/vertex.py
+import threading
+from typing import Optional, Tuple
+
+# vertexai is imported on first use: the SDK import alone costs seconds on a cold container.
+_initialized: Optional[Tuple[str, str]] = None
+_init_lock = threading.Lock()
+
+
+def init_vertex(logger, project: str, location: str) -> None:
+    """vertexai.init() once per process (again only if project/location change)."""
+    global _initialized
+    if _initialized == (project, location):
+        return
+    with _init_lock:
+        if _initialized == (project, location):
+            return
+        import vertexai
+
+        vertexai.init(project=project, location=location)
+        _initialized = (project, location)
+        logger.info(f"vertexai.init(project={project}, location={location})")
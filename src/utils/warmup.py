@@ -0,0 +1,69 @@
+# Project: braintransplant-ai — File: src/utils/warmup.py
+import os
+import time
+import threading
+from typing import Callable, Dict, List, Optional, Tuple
+
+from utils.logger import get_logger
+
+# ---- Explicit constants ----
+# "on": warm clients in a background thread when the web process starts; "off": first request pays.
+WARMUP_MODE = os.getenv("APP_WARMUP", "on").strip().lower()
+
+
+def _warm_llm(logger) -> None:
+    from llm.adapter import warm_up
+
+    warm_up(logger)
+
+
+def _warm_rag(logger) -> None:
+    from rag.vertex_client import warm_up
+
+    warm_up(logger)
+
+
+def _warm_db(logger) -> None:
+    from db.connection import get_pool
+
+    get_pool(wait=True)
+
+
+def _warm_chat_ui(logger) -> None:
+    import ui.web.view_chat  # noqa: F401  (module graph of the chat page)
+
+
+STEPS: List[Tuple[str, Callable]] = [
+    ("llm", _warm_llm),
+    ("rag", _warm_rag),
+    ("db_pool", _warm_db),
+    ("chat_ui", _warm_chat_ui),
+]
+
+
+def warm_up() -> Dict[str, Optional[float]]:
+    """
+    Run every warm-up step; returns seconds per step (None if it failed).
+    Failures are logged and never raised: the request path retries the same work lazily.
+    """
+    logger = get_logger("btai.warmup")
+    timings: Dict[str, Optional[float]] = {}
+    for name, step in STEPS:
+        t0 = time.perf_counter()
+        try:
+            step(logger)
+            timings[name] = round(time.perf_counter() - t0, 3)
+        except Exception as e:
+            timings[name] = None
+            logger.warning(f"warm-up step '{name}' failed: {e!r}")
+    logger.info("warm-up done | " + " | ".join(f"{k}={v}" for k, v in timings.items()))
+    return timings
+
+
+def start_warmup() -> Optional[threading.Thread]:
+    """Start warm_up() in a daemon thread (APP_WARMUP=on); call once per process."""
+    if WARMUP_MODE != "on":
+        return None
+    thread = threading.Thread(target=warm_up, name="warmup", daemon=True)
+    thread.start()
+    return thread
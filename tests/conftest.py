@@ -0,0 +1,7 @@
+# Project: braintransplant-ai — File: tests/conftest.py
+import os
+import sys
+
+# Same import roots as the container (PYTHONPATH=/app:/app/src)
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path[:0] = [ROOT, os.path.join(ROOT, "src")]
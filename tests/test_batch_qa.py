@@ -0,0 +1,43 @@
+# Project: braintransplant-ai — File: tests/test_batch_qa.py
+import asyncio
+
+from rag import batch_qa
+from rag.vertex_client import NO_DOCUMENTS_MSG
+
+
+def _run(monkeypatch, retrieve, retries=1):
+    prompts = []
+
+    async def fake_acall_llm(system_prompt, user_query, **kwargs):
+        prompts.append(user_query)
+        return "an answer"
+
+    async def no_sleep(_):
+        return None
+
+    monkeypatch.setattr(batch_qa, "aget_grounded_snippets", retrieve)
+    monkeypatch.setattr(batch_qa, "acall_llm", fake_acall_llm)
+    monkeypatch.setattr(batch_qa.asyncio, "sleep", no_sleep)
+    item = {"id": "q1", "question": "What is BC2?"}
+    return asyncio.run(batch_qa._run_one(batch_qa.get_logger(), item, retries)), prompts
+
+
+def test_retrieval_errors_are_retried_and_recorded_as_errors(monkeypatch):
+    calls = []
+
+    async def failing(question):
+        calls.append(question)
+        raise RuntimeError("429 Too Many Requests")
+
+    record, prompts = _run(monkeypatch, failing)
+    assert record["status"] == "error" and "429" in record["error"]
+    assert len(calls) == 2 and prompts == []
+
+
+def test_no_snippets_is_a_no_documents_answer(monkeypatch):
+    async def empty(question):
+        return []
+
+    record, prompts = _run(monkeypatch, empty)
+    assert record["status"] == "ok" and record["context"] == NO_DOCUMENTS_MSG
+    assert NO_DOCUMENTS_MSG in prompts[0]
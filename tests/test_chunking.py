@@ -0,0 +1,23 @@
+# Project: braintransplant-ai — File: tests/test_chunking.py
+from rag.chunking import MAX_CHUNK_TOKENS_WITH_OVERLAP, chunk_documents, chunk_units
+from utils.tokens import estimate_tokens_upper
+
+
+def test_dense_and_cjk_chunks_stay_under_the_token_cap():
+    units = [
+        "設備の校正記録は毎月確認します。" * 400,
+        " | ".join(f"lot {i}: 4711.0815/{i * 97}" for i in range(3000)),
+        "Plain English prose about the deviation process. " * 300,
+    ]
+    chunks = chunk_units(units)
+    assert len(chunks) > 3
+    assert max(estimate_tokens_upper(text) for _, text in chunks) <= MAX_CHUNK_TOKENS_WITH_OVERLAP
+
+
+def test_chunk_documents_runs_in_spawned_workers(tmp_path):
+    path = tmp_path / "sop.txt"
+    path.write_text("First paragraph.\n\nSecond paragraph.", encoding="utf-8")
+    (result,) = chunk_documents([str(path)], workers=1)
+    assert result["method"] == "local"
+    assert result["error"] is None
+    assert [text for _, text in result["chunks"]] == ["First paragraph.\nSecond paragraph."]
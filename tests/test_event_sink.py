@@ -0,0 +1,38 @@
+# Project: braintransplant-ai — File: tests/test_event_sink.py
+import time
+
+from log.sink import ACTIVE_SUFFIX, SEALED_SUFFIX, EventSink, read_events, seal_abandoned_segments
+
+
+def _names(directory):
+    return sorted(p.name for p in directory.iterdir())
+
+
+def test_close_seals_the_current_segment(tmp_path):
+    sink = EventSink(tmp_path)
+    sink.emit({"kind": "q", "ts": "2025-01-01T00:00:00Z"})
+    sink.emit({"kind": "a", "ts": "2025-01-01T00:00:01Z"})
+    sink.close()
+    names = _names(tmp_path)
+    assert any(n.endswith(SEALED_SUFFIX) for n in names)
+    assert not any(n.endswith(ACTIVE_SUFFIX) for n in names)
+    assert [e["kind"] for e in read_events(tmp_path, 0, 2e9)] == ["q", "a"]
+
+
+def test_leftover_segment_is_sealed_at_start(tmp_path):
+    leftover = tmp_path / f"seg-1735689600000-4242-1{ACTIVE_SUFFIX}"
+    leftover.write_text('{"kind": "q", "ts": "2025-01-01T00:00:00Z"}\n{"kind": "tor', encoding="utf-8")
+    (sealed,) = seal_abandoned_segments(tmp_path)
+    assert sealed.name.endswith(SEALED_SUFFIX) and not leftover.exists()
+    assert open(str(sealed) + ".idx", encoding="utf-8").read().splitlines()[-1].startswith("end 1735689600")
+    assert [e["kind"] for e in read_events(tmp_path, 0, 2e9)] == ["q"]
+
+
+def test_live_segment_is_not_sealed(tmp_path):
+    sink = EventSink(tmp_path)
+    sink.emit({"kind": "q"})
+    deadline = time.time() + 5
+    while not any(n.endswith(ACTIVE_SUFFIX) for n in _names(tmp_path)) and time.time() < deadline:
+        time.sleep(0.05)
+    assert seal_abandoned_segments(tmp_path) == []
+    sink.close()
@@ -0,0 +1,24 @@
+# Project: braintransplant-ai — File: tests/test_export_transcripts.py
+import datetime
+
+import pytest
+
+pytest.importorskip("psycopg")
+
+from db.export_transcripts import _SessionWriter, _file_stem
+
+
+def test_sanitised_session_ids_get_distinct_files():
+    assert _file_stem("a/b") != _file_stem("a:b")
+    assert _file_stem("a/b").startswith("a_b-")
+
+
+def test_context_with_backticks_stays_inside_its_fence(tmp_path):
+    writer = _SessionWriter(str(tmp_path), "s1", ["md"], compress=False)
+    writer.write({
+        "user_id": None, "ts": datetime.datetime(2025, 1, 2, 3, 4, 5), "user_query": "q",
+        "model_response": "a", "retrieved_context": "[1] use ```code``` blocks",
+    })
+    (path,) = writer.close()
+    text = open(path, encoding="utf-8").read()
+    assert "\n````\n[1] use ```code``` blocks\n````\n" in text
@@ -0,0 +1,66 @@
+# Project: braintransplant-ai — File: tests/test_llm_breaker.py
+import asyncio
+
+import pytest
+
+from llm import adapter
+from utils.circuit_breaker import OPEN, CircuitBreaker, CircuitOpenError
+
+
+@pytest.fixture
+def breaker(monkeypatch):
+    b = CircuitBreaker("llm.test", window_s=60.0, min_calls=3, error_rate=0.5, open_s=60.0)
+    monkeypatch.setattr(adapter, "_breaker", lambda backend: b)
+    return b
+
+
+def test_async_timeouts_open_the_breaker(monkeypatch, breaker):
+    async def hang(*args, **kwargs):
+        await asyncio.sleep(10)
+
+    monkeypatch.setattr(adapter, "_acall_vertex", hang)
+
+    async def call():
+        return await adapter._acall_backend(adapter.get_logger(), "vertex", "m", "sys", "q", 0.01, 16)
+
+    for _ in range(3):
+        with pytest.raises(asyncio.TimeoutError):
+            asyncio.run(call())
+    assert breaker.state == OPEN
+    with pytest.raises(CircuitOpenError):
+        asyncio.run(call())
+
+
+def test_cancellation_is_not_counted(monkeypatch, breaker):
+    async def hang(*args, **kwargs):
+        await asyncio.sleep(10)
+
+    monkeypatch.setattr(adapter, "_acall_vertex", hang)
+
+    async def cancelled_call():
+        task = asyncio.ensure_future(
+            adapter._acall_backend(adapter.get_logger(), "vertex", "m", "sys", "q", 5, 16)
+        )
+        await asyncio.sleep(0.01)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    for _ in range(3):
+        asyncio.run(cancelled_call())
+    assert breaker.snapshot()["calls"] == 0
+
+
+def test_sync_vertex_timeout_opens_the_breaker(monkeypatch, breaker):
+    class SlowModel:
+        def generate_content(self, **kwargs):
+            import time
+            time.sleep(0.5)
+
+    monkeypatch.setattr(adapter, "_vertex_model", lambda model_id, system_prompt: SlowModel())
+    monkeypatch.setattr(adapter, "route_model", lambda *args: (adapter.GEMINI_2_5_PRO, 16))
+
+    for _ in range(3):
+        with pytest.raises(TimeoutError):
+            adapter.call_llm("sys", "q", timeout_s=0.01, hedge=False)
+    assert breaker.state == OPEN
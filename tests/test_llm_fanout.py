@@ -0,0 +1,32 @@
+# Project: braintransplant-ai — File: tests/test_llm_fanout.py
+import threading
+
+from config.keys import GEMINI_1_5_PRO, GEMINI_2_5_PRO
+from llm import fanout
+
+
+def test_aggregate_sends_question_and_answers_only(monkeypatch):
+    calls = []
+    loops = set()
+
+    async def fake_acall_llm(system_prompt, user_query, **kwargs):
+        loops.add(threading.current_thread().name)
+        calls.append((system_prompt, user_query, kwargs))
+        if system_prompt == fanout.AGGREGATE_SYSTEM_PROMPT:
+            return "merged answer from both models"
+        return f"answer from {kwargs['model_id']} with enough text"
+
+    monkeypatch.setattr(fanout, "acall_llm", fake_acall_llm)
+    prompt = "CONTEXT:\n" + "x" * 1000 + "\n\nQUESTION:\nWhat is BC2?"
+
+    for _ in range(2):
+        calls.clear()
+        result = fanout.fan_out("sys", prompt, policy="aggregate", models=[GEMINI_2_5_PRO, GEMINI_1_5_PRO],
+                                min_answers=2, question="What is BC2?")
+        assert result["text"] == "merged answer from both models"
+        aggregate_query = calls[-1][1]
+        assert "What is BC2?" in aggregate_query
+        assert "x" * 100 not in aggregate_query
+        assert aggregate_query.count("with enough text") == 2
+
+    assert loops == {"llm-async"}  # every sync entry runs on the one shared loop
@@ -0,0 +1,28 @@
+# Project: braintransplant-ai — File: tests/test_llm_routing.py
+from config.keys import GEMINI_2_5_PRO
+from config.routing import FAST_MODEL, ROUTES, TASK_CHAT, TASK_RERANK, TASK_SUMMARIZE
+from llm import adapter
+
+
+def test_curated_table_question_is_simple(monkeypatch):
+    monkeypatch.setattr(adapter, "ROUTING_ENABLED", True)
+    monkeypatch.setenv("LLM_PROVIDER", "gemini")
+    monkeypatch.setenv("LLM_MODEL", GEMINI_2_5_PRO)
+    model_id, cap = adapter.route_model(
+        adapter.get_logger(), TASK_CHAT, "sys", "short context", question="How to fill the materials table?"
+    )
+    assert model_id == ROUTES[TASK_CHAT]["simple_model"]
+    assert cap == ROUTES[TASK_CHAT]["max_output_tokens"]
+    assert not adapter._is_simple_question("Show the deviations in a table", 10)
+
+
+def test_auxiliary_tasks_are_routed_with_chat_routing_off(monkeypatch):
+    monkeypatch.setattr(adapter, "ROUTING_ENABLED", False)
+    monkeypatch.setenv("LLM_PROVIDER", "gemini")
+    monkeypatch.setenv("LLM_MODEL", GEMINI_2_5_PRO)
+    logger = adapter.get_logger()
+    for task in (TASK_RERANK, TASK_SUMMARIZE):
+        assert adapter.route_model(logger, task, "sys", "q") == (FAST_MODEL, ROUTES[task]["max_output_tokens"])
+    assert adapter.route_model(logger, TASK_CHAT, "sys", "q", question="What is BC2?") == (
+        GEMINI_2_5_PRO, adapter.MAX_OUTPUT_TOKENS,
+    )
@@ -0,0 +1,31 @@
+# Project: braintransplant-ai — File: tests/test_rag_token.py
+import asyncio
+import threading
+
+import pytest
+
+from rag import vertex_client
+
+
+class _Stop(Exception):
+    pass
+
+
+def test_token_refresh_runs_off_the_event_loop(monkeypatch):
+    loop_thread = []
+    refresh_thread = []
+
+    def slow_access_token():
+        refresh_thread.append(threading.get_ident())
+        raise _Stop()
+
+    monkeypatch.setattr(vertex_client, "_credentials", None)
+    monkeypatch.setattr(vertex_client, "_access_token", slow_access_token)
+
+    async def call():
+        loop_thread.append(threading.get_ident())
+        await vertex_client._aretrieve_snippets_rag(vertex_client.get_logger(), "q", 1)
+
+    with pytest.raises(_Stop):
+        asyncio.run(call())
+    assert refresh_thread and refresh_thread != loop_thread
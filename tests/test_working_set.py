@@ -0,0 +1,53 @@
+# Project: braintransplant-ai — File: tests/test_working_set.py
+import pytest
+
+from rag import working_set
+from rag.working_set import COVERAGE_THRESHOLD, SnippetWorkingSet, get_session_context
+
+BATCH_RECORDS = [
+    "Batch records in Basecamp capture the material lot, the process step and the operator signature.",
+    "Each batch record links the material lot to its process step; the operator signature closes it.",
+    "Operator signature on a batch record is required before the material lot moves to the next process step.",
+    "A batch record lists every material lot consumed by a process step together with the operator signature.",
+]
+OTHER = [
+    "Equipment calibration intervals are maintained per site in the equipment master.",
+    "Recipe versions are approved in the change control workflow before release.",
+    "Parameter limits define the acceptable range for each critical process parameter.",
+]
+
+
+@pytest.fixture
+def ws():
+    ws = SnippetWorkingSet()
+    ws.add(BATCH_RECORDS + OTHER)
+    return ws
+
+
+def test_follow_up_on_same_topic_is_covered_locally(ws):
+    coverage, ranked = ws.match("Which operator signature closes the batch record for a material lot?")
+    assert coverage >= COVERAGE_THRESHOLD
+    assert ranked[0] in BATCH_RECORDS
+
+
+def test_new_topic_in_corpus_vocabulary_is_not_covered(ws):
+    # Every term occurs somewhere in the working set, but no snippet is about this question.
+    coverage, _ = ws.match("Equipment calibration recipe limits per site?")
+    assert coverage < COVERAGE_THRESHOLD
+
+
+def test_new_topic_forces_retrieval(ws, monkeypatch):
+    calls = []
+
+    def retrieve(query):
+        calls.append(query)
+        return ["Cleaning validation covers equipment calibration, recipe and parameter limits per site."]
+
+    monkeypatch.setattr(working_set, "get_grounded_snippets", retrieve)
+    monkeypatch.setattr(working_set, "build_context", lambda snippets, query="": ("ctx", []))
+
+    _, _, source = get_session_context("Which operator signature closes the batch record for a material lot?", ws)
+    assert source == "session" and not calls
+
+    _, _, source = get_session_context("Equipment calibration recipe limits per site?", ws)
+    assert source == "retrieval" and len(calls) == 1